@@ -5,6 +5,7 @@ from fastapi import (BackgroundTasks, FastAPI, Form, Header, HTTPException,
                      UploadFile, WebSocket, WebSocketDisconnect)
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
+from midi.decode import validate_file
 
 from app.db import create_database
 from app.dto import models as m
@@ -44,6 +45,7 @@ def get_models() -> m.ModelVariants:
               410: {"description": "Model is no longer supported", "model": EndpointError},
               413: {"description": "Uploaded files are too large", "model": EndpointError},
               415: {"description": "Incorrect mimetype of uploaded files", "model": EndpointError},
+              422: {"description": "Uploaded files are not valid MIDI files", "model": EndpointError},
               500: {"description": "Failed to create training session", "model": EndpointError},
           })
 async def register_training(background_tasks: BackgroundTasks, files: list[UploadFile], model_id: str = Form(), content_length: int = Header()) -> m.TrainingSessionCreated:
@@ -63,6 +65,15 @@ async def register_training(background_tasks: BackgroundTasks, files: list[Uploa
                 status_code=415,
                 detail="Uploaded files have to be of mimetype audio/midi")
 
+    for file in files:
+        try:
+            validate_file(await file.read())
+        except (ImportError, ValueError) as e:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Uploaded file {file.filename} cannot be used for training: {e}")
+        await file.seek(0)
+
     model = SupportedModels.from_model_id(model_id)
     if model is None:
         raise HTTPException(
@@ -212,17 +223,7 @@ async def get_training_progress(websocket: WebSocket, session_id: str) -> None:
         await websocket.close(code=1011, reason=str(ex))
 
 
-@app.get("/generate/{session_id}/{seed}",
-         response_class=StreamingResponse,
-         description="Generates a single MIDI sample for an already trained model given some seed.",
-         responses={
-             200: {"content": {"audio/midi": {}}},
-             404: {"description": "Session id does not exist or model has not completed training",
-                   "model": EndpointError},
-             410: {"description": "Model is no longer supported",
-                   "model": EndpointError},
-         })
-async def generate_sample(session_id: str, seed: int) -> Any:
+def get_trained_model(session_id: str) -> SupportedModels:
     session = training_sessions.get_session(session_id)
     if session is None:
         raise HTTPException(
@@ -239,6 +240,47 @@ async def generate_sample(session_id: str, seed: int) -> Any:
             status_code=410,
             detail=f"Model with an ID {session.model_id} is not supported")
 
+    return model
+
+
+@app.get("/generate/{session_id}/{seed}",
+         response_class=StreamingResponse,
+         description="Generates a single MIDI sample for an already trained model given some seed.",
+         responses={
+             200: {"content": {"audio/midi": {}}},
+             404: {"description": "Session id does not exist or model has not completed training",
+                   "model": EndpointError},
+             410: {"description": "Model is no longer supported",
+                   "model": EndpointError},
+         })
+async def generate_sample(session_id: str, seed: int) -> Any:
+    model = get_trained_model(session_id)
     midi_bytes = training_manager.generate_sample(session_id, model.get_model(), seed)
 
     return StreamingResponse(chunked(midi_bytes, 512), media_type="audio/midi")
+
+
+@app.get("/generate/{session_id}/{seed}/track",
+         response_class=StreamingResponse,
+         description="Generates a single MIDI sample like /generate/{session_id}/{seed}, but streams the content "
+                     "of its track of notes (delta times and messages) as each step is generated, "
+                     "e.g. for live playback.",
+         responses={
+             200: {"content": {"application/octet-stream": {}}},
+             404: {"description": "Session id does not exist or model has not completed training",
+                   "model": EndpointError},
+             410: {"description": "Model is no longer supported",
+                   "model": EndpointError},
+             501: {"description": "Model generates whole samples only",
+                   "model": EndpointError},
+         })
+async def generate_sample_track(session_id: str, seed: int) -> Any:
+    model = get_trained_model(session_id)
+    try:
+        chunks = training_manager.generate_sample_stream(session_id, model.get_model(), seed)
+    except NotImplementedError:
+        raise HTTPException(
+            status_code=501,
+            detail=f"Model {model.value.name} generates whole samples only")
+
+    return StreamingResponse(chunks, media_type="application/octet-stream")
@@ -1,8 +1,5 @@
-import shutil
-import tempfile
-import uuid
 from pathlib import Path
-from typing import AsyncIterable
+from typing import AsyncIterable, Iterator
 
 from models.music_model import MusicModel, TrainingProgress
 
@@ -39,18 +36,8 @@ class TrainingManager:
                 nonlocal last_progress_event
                 last_progress_event = event
 
-        # midi package does not support in-memory midi. Midi has to be
-        # materialized into files in the real file system.
-        dir = Path(tempfile.mkdtemp())
         try:
-            files: list[Path] = []
-            for b in midi_bytes:
-                p = dir.joinpath(f'{uuid.uuid4()}.mid')
-                with open(p, 'wb') as f:
-                    f.write(b)
-                files.append(p)
-
-            model.train_on_files(files, None, on_progress)
+            model.train_on_files(midi_bytes, None, on_progress)
 
             self._ensure_save_path_exists()
             model.save(self._weights_path_for(session_id))
@@ -60,8 +47,6 @@ class TrainingManager:
             msg = str(ex)
             self._progress_repo.publish_error(session_id, msg)
             self._sessions_repo.mark_training_as_failed(session_id, msg)
-        finally:
-            shutil.rmtree(dir)
 
     def generate_sample(self, session_id: str, model: MusicModel, seed: int) -> bytes:
         """
@@ -69,23 +54,15 @@ class TrainingManager:
         is generated based on a seed. Returns bytes of the midi file.
         """
         model.load(self._weights_path_for(session_id))
+        return model.generate_bytes(seed)
 
-        midi_bytes: bytes
-
-        # midi package does not support in-memory midi. Midi has to be
-        # materialized into files in the real file system.
-        dir = Path(tempfile.mkdtemp())
-        try:
-            p = dir.joinpath('out.mid')
-            model.generate(p, seed)
-
-            with open(p, mode="rb") as f:
-                midi_bytes = f.read()
-
-        finally:
-            shutil.rmtree(dir)
-
-        return midi_bytes
+    def generate_sample_stream(self, session_id: str, model: MusicModel, seed: int) -> Iterator[bytes]:
+        """
+        As `generate_sample`, but returns bytes of the track of the sample as they are generated
+        (see `MusicModel.generate_stream`). Raises `NotImplementedError` for models generating whole samples.
+        """
+        model.load(self._weights_path_for(session_id))
+        return model.generate_stream(model.create_writer(), seed)
 
     async def subscribe(self, session_id: str) -> AsyncIterable[ProgressList]:
         return self._progress_repo.subscribe(session_id)
@@ -15,3 +15,16 @@ def test_get_models():
 
     ids = [d['id'] for d in data]
     assert len(set(ids)) == len(ids), 'IDs are not unique'
+
+
+def test_register_training_rejects_invalid_files():
+    corrupt_file = b'MThd\x00\x00\x00\x06\x00\x01'
+    type_0_file = b'MThd\x00\x00\x00\x06\x00\x00\x00\x01\x00\x60' \
+        b'MTrk\x00\x00\x00\x0c\x00\x90\x3c\x40\x60\x80\x3c\x40\x00\xff\x2f\x00'
+
+    for content in [corrupt_file, type_0_file]:
+        response = client.post("/training/register",
+                               data={'model_id': SupportedModels.MARKOV.value.id},
+                               files=[('files', ('input.mid', content, 'audio/midi'))])
+        assert response.status_code == 422
+        assert 'input.mid' in response.json()['detail']
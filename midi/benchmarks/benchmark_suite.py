@@ -0,0 +1,166 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import numpy as np
+
+from typing import *
+from midi.decode import get_array_of_notes, get_sequence_of_notes
+from midi.encode import get_bytes_from_standard_features, get_file_from_standard_features
+from midi.music_21 import get_midi_features, get_tonal_features
+from prepare_file_memory import get_synthetic_file, get_peak_memory
+
+THRESHOLDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'thresholds.json')
+TIME_MARGIN = 2.0     # thresholds written with --update, as multiples of measured values
+MEMORY_MARGIN = 1.25
+MIN_TIME_MARGIN = 0.01  # in seconds, as times of small files vary more than twice
+
+# arguments of get_synthetic_file: tracks, notes in each track, polyphony, tempo changes and use_note_off
+SIZES = {
+    'small': (2, 100, 2, 4, True),
+    'medium': (4, 1000, 3, 16, False),
+    'large': (16, 4000, 3, 64, True),
+}
+MUSIC21_SIZES = ['small']  # music21 parsing of larger files takes minutes
+
+# a function of file content and a temporary directory for outputs
+Benchmark = Callable[[bytes, str], Any]
+
+decoded_arrays = dict[bytes, np.ndarray]()  # inputs of encoding, by file content
+
+
+def encode_array(content: bytes,
+                 directory: str) -> None:
+    """
+    encodes an array of notes of a file, decoded beforehand, so that only encoding is measured
+
+    :param content:
+    :param directory:
+    :return:
+    """
+    array = decoded_arrays[content]
+    get_file_from_standard_features(array, 500000, os.path.join(directory, 'output.mid'), False, False, False)
+
+
+BENCHMARKS: dict[str, Tuple[Benchmark, list[str]]] = {
+    'get_array_of_notes[mido]':
+        (lambda content, _: get_array_of_notes(content, False, False, backend='mido'), list(SIZES)),
+    'get_array_of_notes[numpy]':
+        (lambda content, _: get_array_of_notes(content, False, False, backend='numpy'), list(SIZES)),
+    'get_array_of_notes[packed]':
+        (lambda content, _: get_array_of_notes(content, False, True, backend='numpy', packed=True), list(SIZES)),
+    'get_sequence_of_notes':
+        (lambda content, _: get_sequence_of_notes(content, True, False, True), list(SIZES)),
+    'get_file_from_standard_features': (encode_array, list(SIZES)),
+    'get_bytes_from_standard_features':
+        (lambda content, _: get_bytes_from_standard_features(decoded_arrays[content], 500000, False, False, False),
+         list(SIZES)),
+    'get_midi_features': (lambda content, _: get_midi_features(content), MUSIC21_SIZES),
+    'get_tonal_features': (lambda content, _: get_tonal_features(content), MUSIC21_SIZES),
+}
+
+
+def measure(benchmark: Benchmark,
+            content: bytes,
+            repeats: int) -> Tuple[float, int]:
+    """
+    returns the lowest wall time of a given number of runs of a benchmark, in seconds,
+    and the peak memory allocated in a separate run, in bytes
+
+    :param benchmark:
+    :param content:
+    :param repeats:
+    :return:
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        times = list[float]()
+        for _ in range(repeats):
+            start = time.perf_counter()
+            benchmark(content, directory)
+            times.append(time.perf_counter() - start)
+        peak = get_peak_memory(lambda: benchmark(content, directory))
+
+    return min(times), peak
+
+
+def run_benchmarks(sizes: list[str],
+                   repeats: int,
+                   pattern: str = '') -> dict[str, dict[str, float]]:
+    """
+    runs benchmarks whose names contain a given pattern on synthetic files of given sizes,
+    returns their time (in seconds) and peak memory (in MiB) by 'benchmark/size'
+
+    :param sizes:
+    :param repeats:
+    :param pattern:
+    :return:
+    """
+    results = dict[str, dict[str, float]]()
+    for size in sizes:
+        tracks, notes, polyphony, tempo_changes, use_note_off = SIZES[size]
+        content = get_synthetic_file(tracks, notes, 0, polyphony, tempo_changes, use_note_off)
+        decoded_arrays[content] = get_array_of_notes(content, False, False)
+
+        for name, (benchmark, benchmark_sizes) in BENCHMARKS.items():
+            if size not in benchmark_sizes or pattern not in name:
+                continue
+            seconds, peak = measure(benchmark, content, repeats)
+            results[f'{name}/{size}'] = {'time': seconds, 'memory': peak / 2 ** 20}
+            print(f'{name + "/" + size:45} {seconds * 1000:10.1f} ms {peak / 2 ** 20:8.1f} MiB', flush=True)
+
+    return results
+
+
+def check_thresholds(results: dict[str, dict[str, float]],
+                     thresholds: dict[str, dict[str, float]]) -> list[str]:
+    """
+    returns descriptions of results exceeding their thresholds
+
+    :param results:
+    :param thresholds:
+    :return:
+    """
+    regressions = list[str]()
+    for key, result in results.items():
+        for measure_name, unit in [('time', 's'), ('memory', 'MiB')]:
+            limit = thresholds.get(key, {}).get(measure_name)
+            if limit is not None and result[measure_name] > limit:
+                regressions.append(f'{key}: {measure_name} {result[measure_name]:.3f} {unit} > {limit:.3f} {unit}')
+
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='times and memory-profiles decoding and encoding '
+                                                 'of synthetic MIDI files, comparing results with thresholds')
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=list(SIZES))
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--filter', default='', help='runs only benchmarks whose names contain it')
+    parser.add_argument('--thresholds', default=THRESHOLDS_PATH)
+    parser.add_argument('--update', action='store_true', help='writes thresholds from results with margins')
+    arguments = parser.parse_args()
+
+    benchmark_results = run_benchmarks(arguments.sizes, arguments.repeats, arguments.filter)
+
+    if arguments.update:
+        benchmark_thresholds = dict[str, dict[str, float]]()
+        if os.path.exists(arguments.thresholds):
+            with open(arguments.thresholds) as file:
+                benchmark_thresholds = json.load(file)
+        for result_key, benchmark_result in benchmark_results.items():
+            result_time = benchmark_result['time']
+            benchmark_thresholds[result_key] = {'time': round(max(result_time * TIME_MARGIN,
+                                                                  result_time + MIN_TIME_MARGIN), 4),
+                                                'memory': round(benchmark_result['memory'] * MEMORY_MARGIN, 2)}
+        with open(arguments.thresholds, 'w') as file:
+            json.dump(dict(sorted(benchmark_thresholds.items())), file, indent=2)
+            file.write('\n')
+        sys.exit(0)
+
+    with open(arguments.thresholds) as file:
+        found_regressions = check_thresholds(benchmark_results, json.load(file))
+    for regression in found_regressions:
+        print('regression:', regression)
+    sys.exit(1 if found_regressions else 0)
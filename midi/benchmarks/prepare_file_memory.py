@@ -0,0 +1,88 @@
+import io
+import sys
+import random
+import tracemalloc
+
+from typing import *
+from mido import MidiFile, MidiTrack, MetaMessage, Message
+from midi.decode import open_file, prepare_file
+
+SYNTHETIC_TRACKS = 16
+SYNTHETIC_NOTES = 4000  # in each track
+
+
+def get_synthetic_file(tracks: int,
+                       notes: int,
+                       seed: int = 0,
+                       polyphony: int = 1,
+                       tempo_changes: int = 0,
+                       use_note_off: bool = True) -> bytes:
+    """
+    generates content of a type 1 MIDI file with a given number of tracks, each with random notes;
+    notes begin in chords of a given polyphony, 'Track 0' has a given number of tempo changes
+    spread evenly over the file and without use_note_off, notes end with 'note_on' messages of velocity 0
+
+    :param tracks:
+    :param notes: in each track
+    :param seed:
+    :param polyphony:
+    :param tempo_changes:
+    :param use_note_off:
+    :return:
+    """
+    generator = random.Random(seed)
+    file = MidiFile(type=1, ticks_per_beat=480)
+    file.tracks.append(MidiTrack([MetaMessage('set_tempo', tempo=500000, time=0)]))
+    off_type = 'note_off' if use_note_off else 'note_on'
+
+    for channel in range(tracks):
+        track = MidiTrack()
+        for first_note in range(0, notes, polyphony):
+            chord = list[int]()
+            for index in range(min(polyphony, notes - first_note)):
+                note = generator.randint(21, 108)
+                chord.append(note)
+                track.append(Message('note_on', channel=channel % 16, note=note, velocity=generator.randint(1, 127),
+                                     time=generator.choice([0, 0, 60, 120, 240]) if index == 0 else 0))
+            for index, note in enumerate(chord):
+                track.append(Message(off_type, channel=channel % 16, note=note, velocity=0,
+                                     time=generator.choice([60, 120, 240, 480]) if index == 0 else 0))
+        file.tracks.append(track)
+
+    length = max((sum(msg.time for msg in track) for track in file.tracks[1:]), default=0)
+    for _ in range(tempo_changes):
+        file.tracks[0].append(MetaMessage('set_tempo', tempo=generator.randint(300000, 900000),
+                                          time=length // (tempo_changes + 1)))
+
+    output = io.BytesIO()
+    file.save(file=output)
+    return output.getvalue()
+
+
+def get_peak_memory(function: Callable[[], Any]) -> int:
+    """
+    returns the peak memory allocated while calling a function, in bytes
+
+    :param function:
+    :return:
+    """
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], 'rb') as file:
+            content = file.read()
+    else:
+        content = get_synthetic_file(SYNTHETIC_TRACKS, SYNTHETIC_NOTES)
+
+    open_peak = get_peak_memory(lambda: open_file(content))
+    prepare_peak = get_peak_memory(lambda: prepare_file(content, False))
+    print(f'open_file:    {open_peak / 2 ** 20:8.1f} MiB')
+    print(f'prepare_file: {prepare_peak / 2 ** 20:8.1f} MiB ({prepare_peak / open_peak:.2f}x of open_file)')
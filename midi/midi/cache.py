@@ -0,0 +1,202 @@
+import os
+import time
+import hashlib
+import numpy as np
+
+from typing import *
+
+CACHE_VERSION = 1                   # changes invalidate all previously cached outputs
+DEFAULT_CACHE_SIZE = 1024 ** 3      # in bytes
+CACHE_EXTENSIONS = ('.npy', '.npz')  # a single array and a dictionary of arrays, respectively
+
+CachedOutput = Union[np.ndarray, dict[str, np.ndarray]]
+
+
+class DecodeCache:
+    """
+    stores decoded outputs in a directory as '.npy' / '.npz' files, addressed by MIDI file content and
+    decoding parameters; the least recently used entries are removed when the directory exceeds its size limit
+    """
+    directory: str
+    max_size: int  # in bytes
+    hits: int
+    misses: int
+
+    def __init__(
+            self,
+            directory: Union[str, 'os.PathLike[str]'],
+            max_size: int = DEFAULT_CACHE_SIZE
+    ):
+        self.directory = os.fspath(directory)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def __repr__(self) -> str:
+        return f'DecodeCache({self.directory!r}, max_size={self.max_size}, hits={self.hits}, misses={self.misses})'
+
+    def get_key(self,
+                content: bytes,
+                function: str,
+                *parameters: Union[bool, int]) -> str:
+        """
+        returns a key of an output of a decoding function for a given file content and parameters
+
+        :param content:
+        :param function:
+        :param parameters:
+        :return:
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        return '-'.join([digest, function, *[str(int(parameter)) for parameter in parameters], f'v{CACHE_VERSION}'])
+
+    def get_path(self,
+                 key: str,
+                 extension: str) -> str:
+        """
+        returns the path of a cache entry
+
+        :param key:
+        :param extension:
+        :return:
+        """
+        return os.path.join(self.directory, key + extension)
+
+    def load(self,
+             key: str) -> Union[CachedOutput, None]:
+        """
+        returns a cached output and marks it as recently used, or None if there is none;
+        unreadable entries are removed and counted as misses
+
+        :param key:
+        :return:
+        """
+        for extension in CACHE_EXTENSIONS:
+            path = self.get_path(key, extension)
+            try:
+                with open(path, 'rb') as file:
+                    output: CachedOutput
+                    if extension == '.npz':
+                        with np.load(file, allow_pickle=False) as arrays:
+                            output = {name: arrays[name] for name in arrays.files}
+                    else:
+                        output = np.load(file, allow_pickle=False)
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError, EOFError):
+                self.remove(path)
+                continue
+
+            now = time.time_ns()
+            try:
+                os.utime(path, ns=(now, now))
+            except FileNotFoundError:  # removed by another process in the meantime
+                pass
+            self.hits += 1
+            return output
+
+        self.misses += 1
+        return None
+
+    def store(self,
+              key: str,
+              output: CachedOutput) -> None:
+        """
+        saves an output under a given key, then removes the least recently used entries above the size limit
+
+        :param key:
+        :param output:
+        :return:
+        """
+        extension = '.npz' if isinstance(output, dict) else '.npy'
+        path = self.get_path(key, extension)
+        temporary_path = f'{path}.{os.getpid()}.tmp'  # written files are renamed, so readers never see partial ones
+
+        with open(temporary_path, 'wb') as file:
+            if isinstance(output, dict):
+                np.savez(file, **output)
+            else:
+                np.save(file, output, allow_pickle=False)
+        os.replace(temporary_path, path)
+
+        self.evict()
+
+    def get_entries(self) -> list[Tuple[int, int, str]]:
+        """
+        returns (last use time, size, path) of all cache entries, from the least recently used
+
+        :return:
+        """
+        entries = list[Tuple[int, int, str]]()
+        with os.scandir(self.directory) as iterator:
+            for entry in iterator:
+                if entry.name.endswith(CACHE_EXTENSIONS):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+        entries.sort()
+        return entries
+
+    def get_size(self) -> int:
+        """
+        returns the total size of cache entries, in bytes
+
+        :return:
+        """
+        return sum(size for _, size, _ in self.get_entries())
+
+    def evict(self) -> None:
+        """
+        removes the least recently used entries until the cache fits its size limit
+
+        :return:
+        """
+        entries = self.get_entries()
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, path in entries:
+            if size <= self.max_size:
+                break
+            self.remove(path)
+            size -= entry_size
+
+    def remove(self,
+               path: str) -> None:
+        """
+        removes a cache entry, if it still exists
+
+        :param path:
+        :return:
+        """
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def clear(self) -> None:
+        """
+        removes all cache entries and resets statistics
+
+        :return:
+        """
+        for _, _, path in self.get_entries():
+            self.remove(path)
+        self.hits = 0
+        self.misses = 0
+
+    def get_stats(self) -> dict[str, int]:
+        """
+        returns hit / miss counts of this cache object together with the current number and size of entries
+
+        :return:
+        """
+        entries = self.get_entries()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(entries),
+            'size': sum(size for _, size, _ in entries),
+        }
@@ -0,0 +1,101 @@
+import os
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import *
+try:
+    from decode import MidiSource, load_source, is_path
+except ImportError:
+    from .decode import MidiSource, load_source, is_path
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+# a function translating a single MIDI source, e.g. functools.partial(get_array_of_notes, use_velocities=False,
+# join_tracks=True); it is sent to worker processes, so it has to be picklable (no lambdas or local functions)
+Decoder = Callable[[MidiSource], Any]
+ErrorCallback = Callable[[int, MidiSource, Exception], None]
+
+
+def decode_source(decoder: Decoder,
+                  index: int,
+                  source: MidiSource) -> Tuple[int, Any, Union[Exception, None]]:
+    """
+    decodes a single MIDI source in a worker process, returning an exception instead of raising it
+
+    :param decoder:
+    :param index:
+    :param source:
+    :return:
+    """
+    try:
+        return index, decoder(source), None
+    except Exception as ex:
+        return index, None, ex
+
+
+def report_error(index: int,
+                 source: MidiSource,
+                 exception: Exception) -> None:
+    """
+    default handler of files which could not be decoded, prints a warning
+
+    :param index:
+    :param source:
+    :param exception:
+    :return:
+    """
+    name = os.fspath(cast(Union[str, 'os.PathLike[str]'], source)) if is_path(source) else f'in-memory file #{index}'
+    print(Warning(f'skipped {name}: {exception}'))
+
+
+def get_decoded(results: Iterable[Tuple[int, Any, Union[Exception, None]]],
+                sources: list[Union[str, 'os.PathLike[str]', bytes]],
+                on_error: ErrorCallback) -> Iterator[Tuple[int, Any]]:
+    """
+    passes outputs of decode_source on, reporting the ones which failed
+
+    :param results:
+    :param sources:
+    :param on_error:
+    :return:
+    """
+    for index, output, exception in results:
+        if exception is not None:
+            on_error(index, sources[index], exception)
+        else:
+            yield index, output
+
+
+def decode_corpus(sources: Iterable[MidiSource],
+                  decoder: Decoder,
+                  workers: int = DEFAULT_WORKERS,
+                  ordered: bool = True,
+                  on_error: ErrorCallback = report_error) -> Iterator[Tuple[int, Any]]:
+    """
+    decodes MIDI sources in a pool of worker processes, yielding (index of a source, decoder output) tuples
+    either in the order of sources or as soon as they are decoded; sources which cannot be decoded
+    (e.g. corrupted or empty files) are skipped and passed to on_error together with the raised exception;
+    with a single worker, sources are decoded in the calling process
+
+    :param sources:
+    :param decoder:
+    :param workers:
+    :param ordered:
+    :param on_error:
+    :return:
+    """
+    loaded_sources = [load_source(source) for source in sources]  # streams cannot be sent to other processes
+
+    results: Iterable[Tuple[int, Any, Union[Exception, None]]]
+    if workers <= 1 or len(loaded_sources) <= 1:
+        results = (decode_source(decoder, index, source) for index, source in enumerate(loaded_sources))
+        yield from get_decoded(results, loaded_sources, on_error)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(loaded_sources))) as executor:
+        futures = [executor.submit(decode_source, decoder, index, source)
+                   for index, source in enumerate(loaded_sources)]
+        if ordered:
+            results = (future.result() for future in futures)
+        else:
+            results = (future.result() for future in as_completed(futures))
+        yield from get_decoded(results, loaded_sources, on_error)
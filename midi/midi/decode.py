@@ -1,13 +1,37 @@
+import io
 import os
-import copy
+import operator
+import itertools
 import numpy as np
 
 from typing import *
 from mido import MidiTrack, MidiFile
 from mido.messages import Message
+try:
+    from smf import SmfFile, SmfTrackReader, read_smf, scan_smf, EVENT_DTYPE, EVENT_NOTE_ON, EVENT_NOTE_OFF, \
+        EVENT_SET_TEMPO, DEFAULT_TEMPO
+    from cache import DecodeCache
+    from roll import SparseRoll, PACKED_NOTES, pack_roll
+    from tempo import TempoMap
+    from instrument import instrumented, instrumented_file, record_stage
+    from source import MidiSource, is_path, get_source_name
+except ImportError:
+    from .smf import SmfFile, SmfTrackReader, read_smf, scan_smf, EVENT_DTYPE, EVENT_NOTE_ON, EVENT_NOTE_OFF, \
+        EVENT_SET_TEMPO, DEFAULT_TEMPO
+    from .cache import DecodeCache
+    from .roll import SparseRoll, PACKED_NOTES, pack_roll
+    from .tempo import TempoMap
+    from .instrument import instrumented, instrumented_file, record_stage
+    from .source import MidiSource, is_path, get_source_name
 
 GRID_ACCURACY = 64  # sets accuracy to 1 / GRID_ACCURACY of a measure, best if it's a power of 2
 TRACK_LENGTH_THRESHOLD = 10  # number of messages in a standard track above which it is included in output
+DECODE_BACKENDS = ['mido', 'numpy']  # 'numpy' parses files into structured arrays, without mido Messages
+DEFAULT_BACKEND = 'mido'
+SEQUENCE_DTYPES = [np.dtype(np.bool_), np.dtype(np.uint8), np.dtype(np.float16)]  # of get_sequence_of_notes matrices
+
+# event lengths and a matrix of notes of size events x 128, as returned by get_sequence_of_notes(..., dtype=...)
+NotesMatrices = Union[Tuple[np.ndarray, np.ndarray], list[Tuple[np.ndarray, np.ndarray]]]
 
 
 class EventNote:
@@ -19,6 +43,8 @@ class EventNote:
     tone: int        # from 'height', [1, 12]
     octave: int      # from 'height', [-1, 9] possible, with [0, 8] being on the piano
 
+    __slots__ = ('velocity', 'height', 'tone', 'octave')
+
     def __init__(
             self,
             velocity: Union[int, float],
@@ -58,6 +84,8 @@ class ActiveElement:
     value: Union[bool, float]
     use_velocities: bool
 
+    __slots__ = ('height', 'value', 'use_velocities')
+
     def __init__(
             self,
             height: int,
@@ -98,6 +126,8 @@ class Event:
     all_notes: Union[list[float], list[bool]]  # of size 128
     use_velocities: bool
 
+    __slots__ = ('time', 'length', 'offset', 'track', 'tempo', 'active_notes', 'all_notes', 'use_velocities')
+
     def __init__(
             self,
             time: int,
@@ -186,6 +216,496 @@ class Event:
             self.all_notes = float_list
 
 
+class EventSequence:
+    """
+    stores a sequence of Events from a single track as arrays, one row for each Event (struct of arrays),
+    used instead of lists of Event objects, which take a list of 128 values and an ActiveElement per note each;
+    Event objects are only created on access, e.g. by indexing or iterating
+    """
+    track: int                                # omits 'Track 0'
+    use_velocities: bool
+    times: np.ndarray                         # as Event.time
+    lengths: np.ndarray                       # as Event.length
+    offsets: np.ndarray                       # as Event.offset
+    tempos: np.ndarray                        # as Event.tempo
+    active: np.ndarray                        # of size events x 128, np.bool_, as Event.active_notes
+    velocities: Union[np.ndarray, None]       # of size events x 128, e.g. np.uint8 MIDI velocities, if use_velocities
+    divisors: list[float]                     # from normalise, applied to velocities only when notes are accessed
+
+    __slots__ = ('track', 'use_velocities', 'times', 'lengths', 'offsets', 'tempos', 'active', 'velocities',
+                 'divisors')
+
+    def __init__(
+            self,
+            track: int,
+            use_velocities: bool,
+            times: np.ndarray,
+            lengths: np.ndarray,
+            offsets: np.ndarray,
+            tempos: np.ndarray,
+            active: np.ndarray,
+            velocities: Union[np.ndarray, None] = None
+    ):
+        if use_velocities and velocities is None:
+            raise ValueError('velocities are required if use_velocities == True')
+
+        self.track = track
+        self.use_velocities = use_velocities
+        self.times = times
+        self.lengths = lengths
+        self.offsets = offsets
+        self.tempos = tempos
+        self.active = active
+        self.velocities = velocities if use_velocities else None
+        self.divisors = list[float]()
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def __getitem__(self,
+                    index: int) -> Event:
+        if self.use_velocities:
+            velocities = self.get_velocities(index)
+            notes = {height: EventNote(velocities[height], height)
+                     for height in np.flatnonzero(self.active[index]).tolist()}
+        else:
+            notes = {height: EventNote(0, height) for height in np.flatnonzero(self.active[index]).tolist()}
+
+        return Event(int(self.times[index]), int(self.lengths[index]), int(self.offsets[index]), self.track,
+                     int(self.tempos[index]), notes, self.use_velocities)
+
+    def __iter__(self) -> Iterator[Event]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def __eq__(self,
+               other: Any) -> bool:
+        return isinstance(other, EventSequence) and \
+            self.track == other.track and \
+            self.use_velocities == other.use_velocities and \
+            np.array_equal(self.times, other.times) and \
+            np.array_equal(self.lengths, other.lengths) and \
+            np.array_equal(self.offsets, other.offsets) and \
+            np.array_equal(self.tempos, other.tempos) and \
+            np.array_equal(self.active, other.active) and \
+            np.array_equal(self.get_notes(), other.get_notes())
+
+    def __repr__(self) -> str:
+        return f'EventSequence(track={self.track}, events={len(self)}, use_velocities={self.use_velocities})'
+
+    def get_velocities(self,
+                       index: Union[int, slice] = slice(None)) -> np.ndarray:
+        """
+        returns normalised velocities of given Events, with divisors applied in the same order as Event.normalise does
+
+        :param index:
+        :return:
+        """
+        if self.velocities is None:
+            raise ValueError('no velocities in a sequence with use_velocities == False')
+
+        velocities = self.velocities[index].astype(np.float_)
+        for divisor in self.divisors:
+            velocities /= divisor
+        return velocities
+
+    def get_active_notes(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        returns Event indices, heights and values (True or normalised velocities) of all active notes,
+        ordered by Events, then by heights
+
+        :return:
+        """
+        event_indices, heights = np.nonzero(self.active)
+        if self.velocities is None:
+            return event_indices, heights, np.ones(len(heights), dtype=np.bool_)
+
+        values = self.velocities[event_indices, heights].astype(np.float_)
+        for divisor in self.divisors:
+            values /= divisor
+        return event_indices, heights, values
+
+    def get_notes(self) -> np.ndarray:
+        """
+        returns notes of all Events as Event.all_notes would hold them, one row for each Event
+
+        :return:
+        """
+        return self.get_velocities() if self.use_velocities else self.active
+
+    def normalise(self,
+                  max_velocity: Union[int, float]) -> None:
+        """
+        as Event.normalise, divides note velocities of all Events by a given value
+
+        :param max_velocity:
+        :return:
+        """
+        if self.use_velocities:
+            self.divisors.append(float(max_velocity))
+
+    def to_events(self) -> list[Event]:
+        """
+        translates the sequence into a list of Event objects
+
+        :return:
+        """
+        return list(self)
+
+    @staticmethod
+    def from_events(sequence: list[Event],
+                    track: int,
+                    use_velocities: bool) -> 'EventSequence':
+        """
+        translates a list of Event objects into a sequence
+
+        :param sequence:
+        :param track:
+        :param use_velocities:
+        :return:
+        """
+        active = np.zeros((len(sequence), 128), dtype=np.bool_)
+        for index, event in enumerate(sequence):
+            active[index, [element.height for element in event.active_notes]] = True
+        velocities = np.array([event.all_notes for event in sequence],
+                              dtype=np.float_).reshape(len(sequence), 128) if use_velocities else None
+
+        return EventSequence(track, use_velocities,
+                             np.array([event.time for event in sequence], dtype=np.int64),
+                             np.array([event.length for event in sequence], dtype=np.int64),
+                             np.array([event.offset for event in sequence], dtype=np.int64),
+                             np.array([event.tempo for event in sequence], dtype=np.int64),
+                             active, velocities)
+
+
+class TickEvents:
+    """
+    stores cleaned note events of a MIDI file at its own resolution of MIDI ticks, before they are quantised to a grid;
+    a file parsed once by prepare_tick_events can be translated to any grid accuracy without parsing it again
+    """
+    tracks: list[np.ndarray]  # of EVENT_DTYPE, after combine_and_clean_events, with notes beginning at tick 0
+    tempo_events: np.ndarray  # 'set_tempo' events of 'Track 0', with their original ticks
+    filename: str
+    ticks_per_beat: int
+    beat_amount: int          # notated 32nd notes per beat
+    initial_ticks: int        # beginning offset of notes, removed from tracks
+    truncated: np.ndarray     # tracks which were not parsed to their end, see prepare_tick_events
+
+    def __init__(
+            self,
+            tracks: list[np.ndarray],
+            tempo_events: np.ndarray,
+            filename: str,
+            ticks_per_beat: int,
+            beat_amount: int,
+            initial_ticks: int,
+            truncated: Union[np.ndarray, None] = None
+    ):
+        self.tracks = tracks
+        self.tempo_events = tempo_events
+        self.filename = filename
+        self.ticks_per_beat = ticks_per_beat
+        self.beat_amount = beat_amount
+        self.initial_ticks = initial_ticks
+        self.truncated = truncated if truncated is not None else np.zeros(len(tracks), dtype=np.bool_)
+
+    def __repr__(self) -> str:
+        return f'TickEvents(tracks={len(self.tracks)}, events={sum(len(track) for track in self.tracks)}, ' \
+               f'ticks_per_beat={self.ticks_per_beat})'
+
+    def get_accuracy(self,
+                     grid_accuracy: int = GRID_ACCURACY) -> float:
+        """
+        returns the amount of MIDI ticks in a grid time unit, as open_events does
+
+        :param grid_accuracy:
+        :return:
+        """
+        return get_accuracy(self.ticks_per_beat, self.beat_amount, grid_accuracy)
+
+    def get_arrays(self) -> dict[str, np.ndarray]:
+        """
+        returns arrays defining the events, e.g. to save them with np.savez
+
+        :return:
+        """
+        return {'events': np.concatenate(self.tracks),
+                'track_sizes': np.array([len(track) for track in self.tracks], dtype=np.int64),
+                'tempo_events': self.tempo_events,
+                'truncated': self.truncated,
+                'parameters': np.array([self.ticks_per_beat, self.beat_amount, self.initial_ticks], dtype=np.int64)}
+
+    @staticmethod
+    def from_arrays(arrays: Mapping[str, np.ndarray],
+                    filename: str = '') -> 'TickEvents':
+        """
+        creates events from arrays returned by get_arrays
+
+        :param arrays:
+        :param filename:
+        :return:
+        """
+        track_ends = np.cumsum(arrays['track_sizes']).tolist()
+        tracks = [arrays['events'][end - size:end] for size, end in zip(arrays['track_sizes'].tolist(), track_ends)]
+        ticks_per_beat, beat_amount, initial_ticks = arrays['parameters'].tolist()
+        truncated = arrays['truncated'] if 'truncated' in arrays else None
+        return TickEvents(tracks, arrays['tempo_events'], filename, ticks_per_beat, beat_amount, initial_ticks,
+                          truncated)
+
+
+class TrackEventsReader:
+    """
+    reads cleaned note events of a single track in parts, equal to combine_and_clean_events([track]) of the whole
+    track: numbers of active instances of notes and the time of omitted events are carried between parts,
+    kept events are returned in order of time once no events of later parts can precede them
+    """
+    reader: SmfTrackReader
+    note_off_found: bool   # whether the whole track has 'note_off' events, see combine_and_clean_events
+    note_grid: np.ndarray  # numbers of active instances of notes, see get_kept_notes_mask
+    last_tick: int         # time of the last read note event
+    omitted_time: int      # time of events omitted since the last kept one
+    pending: np.ndarray    # kept events, ordered by time, which may still be preceded by events of later parts
+
+    def __init__(
+            self,
+            reader: SmfTrackReader,
+            note_off_found: bool
+    ):
+        self.reader = reader
+        self.note_off_found = note_off_found
+        self.note_grid = np.zeros(128, dtype=np.int64)
+        self.last_tick = 0
+        self.omitted_time = 0
+        self.pending = np.zeros(0, dtype=EVENT_DTYPE)
+
+    def __repr__(self) -> str:
+        return f'TrackEventsReader(track={self.reader.track}, ticks={self.reader.ticks}, pending={len(self.pending)})'
+
+    @property
+    def finished(self) -> bool:
+        return self.reader.finished
+
+    def read(self,
+             tick_limit: float) -> np.ndarray:
+        """
+        reads the track up to its first message later than tick_limit (see SmfTrackReader.read),
+        returns kept events which can no longer be preceded by later ones, all of them at the end of the track
+
+        :param tick_limit:
+        :return:
+        """
+        rows = list[Tuple[int, int, int, int, int, int, int]]()
+        self.reader.read(rows, tick_limit)
+        events = np.array(rows, dtype=EVENT_DTYPE)
+        notes = events[(events['type'] == EVENT_NOTE_ON) | (events['type'] == EVENT_NOTE_OFF)]
+
+        if len(notes) > 0:
+            if not self.note_off_found:
+                notes['type'][notes['velocity'] == 0] = EVENT_NOTE_OFF
+            kept = get_kept_notes_mask(notes['note'], notes['type'] == EVENT_NOTE_ON, self.note_grid)
+
+            # as in combine_and_clean_events, with the time omitted in previous parts
+            times = notes['abs_tick']
+            omitted_time = self.omitted_time + np.cumsum(np.where(kept, 0, np.diff(times, prepend=self.last_tick)))
+            kept_omitted_time = omitted_time[kept]
+            self.last_tick = int(times[-1])
+            self.omitted_time = int(omitted_time[-1] - (kept_omitted_time[-1] if len(kept_omitted_time) > 0 else 0))
+
+            kept_events = notes[kept]
+            kept_events['abs_tick'] += np.diff(kept_omitted_time, prepend=0)
+            pending = np.concatenate((self.pending, kept_events))
+            self.pending = pending[np.argsort(pending['abs_tick'], kind='stable')]
+
+        # later events are read no earlier than the last read message, and kept ones are only moved later
+        ready = len(self.pending) if self.finished else \
+            int(np.searchsorted(self.pending['abs_tick'], self.reader.ticks, side='right'))
+        events, self.pending = self.pending[:ready], self.pending[ready:]
+        return events
+
+
+class WindowTrack:
+    """
+    cleaned note events of a track cut into windows by iterate_windows_of_notes: events are added in parts
+    as windows need them, states of notes after the events before the current window are carried over
+    """
+    reader: Union[TrackEventsReader, None]  # None if all events are given at once
+    accuracy: float
+    initial_ticks: int          # beginning offset of notes, removed from added events
+    offsets: np.ndarray         # events added, but not applied to states of notes yet
+    notes: np.ndarray
+    note_on: np.ndarray
+    velocities: np.ndarray
+    active: np.ndarray          # states of notes after applied events
+    active_velocities: np.ndarray
+    last_offset: int            # offset of the last added event, the length of the track once all are added
+    creating_offset: int        # offset of the last applied event creating an Event, see get_event_creating_messages
+    creating: Union[np.ndarray, None]  # mask of added events creating Events, None until computed again
+
+    def __init__(
+            self,
+            events: np.ndarray,
+            reader: Union[TrackEventsReader, None],
+            accuracy: float,
+            initial_ticks: int = 0
+    ):
+        self.reader = reader
+        self.accuracy = accuracy
+        self.initial_ticks = initial_ticks
+        self.offsets = np.zeros(0, dtype=np.int64)
+        self.notes = np.zeros(0, dtype=np.int64)
+        self.note_on = np.zeros(0, dtype=np.bool_)
+        self.velocities = np.zeros(0, dtype=np.uint8)
+        self.active = np.zeros(128, dtype=np.bool_)
+        self.active_velocities = np.zeros(128, dtype=np.uint8)
+        self.last_offset = 0
+        self.creating_offset = 0
+        self.creating = None
+        self.add_events(events)
+
+    def __repr__(self) -> str:
+        return f'WindowTrack(events={len(self.offsets)}, last_offset={self.last_offset}, finished={self.finished})'
+
+    @property
+    def finished(self) -> bool:
+        return self.reader is None or self.reader.finished
+
+    def add_events(self,
+                   events: np.ndarray) -> None:
+        """
+        adds cleaned note events following the ones added before
+
+        :param events:
+        :return:
+        """
+        if len(events) == 0:
+            return
+
+        offsets = get_grid_offsets(events['abs_tick'] - self.initial_ticks, self.accuracy)
+        self.offsets = np.concatenate((self.offsets, offsets))
+        self.notes = np.concatenate((self.notes, events['note'].astype(np.int64)))
+        self.note_on = np.concatenate((self.note_on, events['type'] == EVENT_NOTE_ON))
+        self.velocities = np.concatenate((self.velocities, events['velocity']))
+        self.last_offset = int(offsets[-1])
+        self.creating = None
+
+    def get_creating_events(self) -> np.ndarray:
+        """
+        returns a mask of added events creating Events, given states of notes after the applied ones
+
+        :return:
+        """
+        if self.creating is not None:
+            return self.creating
+        if len(self.notes) == 0:
+            return np.zeros(0, dtype=np.bool_)
+
+        order = np.argsort(self.notes, kind='stable')
+        sorted_notes = self.notes[order]
+        previous_on = np.concatenate(([False], self.note_on[order][:-1]))
+        group_starts = np.concatenate(([True], sorted_notes[1:] != sorted_notes[:-1]))
+        previous_on[group_starts] = self.active[sorted_notes[group_starts]]
+        active_before = np.empty_like(previous_on)
+        active_before[order] = previous_on
+        self.creating = self.note_on | active_before
+        return self.creating
+
+    def read_until(self,
+                   end: int,
+                   part_length: int) -> None:
+        """
+        adds events until one creating an Event begins at time unit end or later, or until the end of the track;
+        the track is read in parts of about part_length time units
+
+        :param end:
+        :param part_length:
+        :return:
+        """
+        tick_limit = self.initial_ticks + (end + 1) * self.accuracy
+        while not self.finished and (self.last_offset < end or
+                                     not np.any(self.get_creating_events()[self.offsets >= end])):
+            reader = cast(TrackEventsReader, self.reader)
+            self.add_events(reader.read(tick_limit))
+            tick_limit = max(tick_limit, reader.reader.ticks) + part_length * self.accuracy
+
+    def apply_until(self,
+                    begin: int) -> None:
+        """
+        applies events beginning at time unit begin or earlier to states of notes
+
+        :param begin:
+        :return:
+        """
+        count = int(np.searchsorted(self.offsets, begin, side='right'))
+        if count == 0:
+            return
+
+        creating = self.get_creating_events()
+        if np.any(creating[:count]):
+            self.creating_offset = int(self.offsets[:count][creating[:count]][-1])
+
+        last_events = np.full(128, -1, dtype=np.int64)
+        np.maximum.at(last_events, self.notes[:count], np.arange(count))
+        changed = np.flatnonzero(last_events >= 0)
+        self.active[changed] = self.note_on[last_events[changed]]
+        self.active_velocities[changed] = self.velocities[last_events[changed]]
+
+        self.offsets = self.offsets[count:]
+        self.notes = self.notes[count:]
+        self.note_on = self.note_on[count:]
+        self.velocities = self.velocities[count:]
+        self.creating = creating[count:]  # states after applied events agree with the events themselves
+
+    def fill_window(self,
+                    output_array: np.ndarray,
+                    begin: int,
+                    use_velocities: bool,
+                    packed: bool) -> None:
+        """
+        writes notes of time units [begin, begin + len(output_array)) into a zeroed array of the window,
+        as fill_window_of_notes does with Events; events up to the end of the window have to be added first
+        (see read_until), windows have to begin in increasing order
+
+        :param output_array:
+        :param begin:
+        :param use_velocities:
+        :param packed:
+        :return:
+        """
+        self.apply_until(begin)
+        end = begin + len(output_array)
+        count = int(np.searchsorted(self.offsets, end, side='left'))
+
+        # notes are held until the last Event, which has no length
+        creating = self.get_creating_events()
+        if np.any(creating[count:]):
+            stop = end
+        else:
+            stop = int(self.offsets[:count][creating[:count]][-1]) if np.any(creating[:count]) else \
+                self.creating_offset
+        if stop <= begin:
+            return
+
+        if use_velocities:
+            states = np.where(self.active, self.active_velocities, 0)
+            values = np.where(self.note_on[:count], self.velocities[:count], 0)
+        else:
+            states = self.active
+            values = self.note_on[:count]
+
+        # the last event of each note up to each time unit of the window
+        rows = np.broadcast_to(states, (stop - begin, 128))
+        if count > 0:
+            last_events = np.full((end - begin, 128), -1, dtype=np.int64)
+            np.maximum.at(last_events, (self.offsets[:count] - begin, self.notes[:count]), np.arange(count))
+            last_events = np.maximum.accumulate(last_events[:stop - begin], axis=0)
+            rows = np.where(last_events >= 0, values[last_events], rows)
+
+        if use_velocities:
+            output_array[:stop - begin] = rows.astype(np.float_) / 128
+        else:
+            output_array[:stop - begin] = pack_roll(rows) if packed else rows
+
+
 def get_offset(time: int,
                ticks: int,
                accuracy: float) -> int:
@@ -203,29 +723,58 @@ def get_offset(time: int,
     return finish - begin
 
 
+def get_track_offsets(track: MidiTrack,
+                      accuracy: float,
+                      initial_ticks: int = 0) -> np.ndarray:
+    """
+    returns grid accuracy offsets of all Messages in a track, computed at once from cumulative ticks
+    instead of summing get_offset increments message by message
+
+    :param track:
+    :param accuracy:
+    :param initial_ticks:
+    :return:
+    """
+    ticks = np.cumsum(np.fromiter((msg.time for msg in track), dtype=np.int64, count=len(track)))
+    return get_grid_offsets(ticks - initial_ticks, accuracy)
+
+
+@instrumented
+def get_message_offsets(file: MidiFile,
+                        accuracy: float,
+                        initial_ticks: int = 0) -> list[np.ndarray]:
+    """
+    returns grid accuracy offsets of all Messages in each track of a file, as get_track_offsets;
+    initial ticks are removed from 'Track 0' only, prepare_file removes them from the other tracks itself
+
+    :param file:
+    :param accuracy:
+    :param initial_ticks:
+    :return:
+    """
+    return [get_track_offsets(track, accuracy, initial_ticks if i == 0 else 0) for i, track in enumerate(file.tracks)]
+
+
 # gets the length of the longest track
 def get_midi_length(file: MidiFile,
-                    accuracy: float) -> int:
+                    accuracy: float,
+                    offsets: Union[list[np.ndarray], None] = None) -> int:
     """
-    returns the length of the longest track
+    returns the length of the longest track;
+    offsets of Messages from get_message_offsets can be given to avoid computing them again
 
     :param file:
     :param accuracy:
+    :param offsets:
     :return:
     """
-    lengths = list[int]()
-    for i, track in enumerate(file.tracks[1:]):
-        ticks = 0
-        value = 0
-        for msg in track:
-            value += get_offset(msg.time, ticks, accuracy)
-            ticks += msg.time
-        lengths.append(value)
+    if offsets is None:
+        offsets = get_message_offsets(file, accuracy)
 
-    return max(lengths)
+    return max(int(track_offsets[-1]) if len(track_offsets) > 0 else 0 for track_offsets in offsets[1:])
 
 
-def check_file_type(file: MidiFile) -> None:
+def check_file_type(file: Union[MidiFile, SmfFile]) -> None:
     """
     checks if MIDI file type is 1: if not, raises a ValueError
 
@@ -246,28 +795,74 @@ def get_filename(filepath: str) -> str:
     :param filepath:
     :return:
     """
-    filename = os.path.basename(filepath)
-    if filename[-4:] != '.mid':
+    if os.path.basename(filepath)[-4:] != '.mid':
         raise TypeError('file must be of ".mid" format')
 
-    filename = filename[:-4]
-    return filename
+    return get_source_name(filepath)
+
+
+def get_source_bytes(source: MidiSource) -> bytes:
+    """
+    returns the content of a MIDI source, reading a file or a stream if necessary
+
+    :param source:
+    :return:
+    """
+    if is_path(source):
+        with open(cast(Union[str, 'os.PathLike[str]'], source), 'rb') as file:
+            return file.read()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source)
+    return cast(BinaryIO, source).read()
+
+
+def load_source(source: MidiSource) -> Union[str, 'os.PathLike[str]', bytes]:
+    """
+    reads a binary stream into bytes, so that the source can be decoded more than once; other sources are kept
+
+    :param source:
+    :return:
+    """
+    if is_path(source) or isinstance(source, bytes):
+        return cast(Union[str, 'os.PathLike[str]', bytes], source)
+    return get_source_bytes(source)
+
+
+def get_accuracy(ticks_per_beat: int,
+                 beat_amount: int,
+                 grid_accuracy: int = GRID_ACCURACY) -> float:
+    """
+    calculates amount of PPQ in grid units, i.e. MIDI ticks in a grid time unit of 1 / grid_accuracy of a measure
+
+    :param ticks_per_beat:
+    :param beat_amount: notated 32nd notes per beat
+    :param grid_accuracy:
+    :return:
+    """
+    return float((ticks_per_beat * 32) / (grid_accuracy * beat_amount))
 
 
-def open_file(filepath: str,
+@instrumented
+def open_file(filepath: MidiSource,
               grid_accuracy: int = GRID_ACCURACY) -> Tuple[MidiFile, str, float]:
     """
     opens and checks if a given file is a '.mid' file:
     if yes, translates notated_32nd_notes_per_beat to pulses per quarter (PPQ) if necessary
-    and calculates amount of PPQ in grid units; if not, raises an error
+    and calculates amount of PPQ in grid units; if not, raises an error;
+    in-memory content and binary streams are read directly, with an empty filename
 
     :param filepath:
     :param grid_accuracy:
     :return:
     """
-    filename = get_filename(filepath)
+    filename = get_filename(os.fspath(cast(Union[str, 'os.PathLike[str]'], filepath))) if is_path(filepath) else ''
     try:
-        file = MidiFile(filepath)
+        if is_path(filepath):
+            file = MidiFile(filepath)
+        elif isinstance(filepath, (bytes, bytearray, memoryview)):
+            file = MidiFile(file=io.BytesIO(filepath))
+        else:
+            file = MidiFile(file=filepath)
     except (OSError, EOFError):
         raise ImportError('file is corrupted')
 
@@ -282,9 +877,33 @@ def open_file(filepath: str,
     else:
         beat_amount = 8
 
-    # calculates amount of PPQ in grid units
-    accuracy = (file.ticks_per_beat * 32) / (grid_accuracy * beat_amount)
-    return file, filename, float(accuracy)
+    return file, filename, get_accuracy(file.ticks_per_beat, beat_amount, grid_accuracy)
+
+
+@instrumented
+def get_tempo_map(file: MidiFile,
+                  length: int,
+                  accuracy: float,
+                  initial_ticks: int = 0,
+                  offsets: Union[np.ndarray, None] = None) -> TempoMap:
+    """
+    translates Track 0 'set_tempo' MetaMessages to a TempoMap of length + 1 time units,
+    with an additional time unit for the last, closing event;
+    offsets of Track 0 Messages from get_track_offsets can be given to avoid computing them again
+
+    :param file:
+    :param length:
+    :param accuracy:
+    :param initial_ticks:
+    :param offsets:
+    :return:
+    """
+    if offsets is None:
+        offsets = get_track_offsets(file.tracks[0], accuracy, initial_ticks)
+    tempo_indices = [i for i, msg in enumerate(file.tracks[0]) if msg.type == 'set_tempo']
+    tempos = np.array([file.tracks[0][i].tempo for i in tempo_indices], dtype=np.int64)
+
+    return TempoMap.from_changes(offsets[tempo_indices], tempos, length + 1)
 
 
 def get_tempo_array(file: MidiFile,
@@ -301,49 +920,36 @@ def get_tempo_array(file: MidiFile,
     :param initial_ticks:
     :return:
     """
-    tempos = [0] * (length + 1)
-    ticks = -initial_ticks
-    offset = -get_offset(initial_ticks, 0, accuracy)
-    tempo = 500000  # default MIDI tempo
-
-    for msg in file.tracks[0]:
-        increment = get_offset(msg.time, ticks, accuracy)
-        begin_range = min(max(offset, 0), length + 1)
-        end_range = min(max(offset + increment, 0), length + 1)
-        for time in range(begin_range, end_range):
-            tempos[time] = tempo
-        ticks += msg.time
-        offset += increment
-
-        if msg.type == 'set_tempo':
-            tempo = msg.tempo
-
-        if offset > length + 1:
-            break
+    return get_tempo_map(file, length, accuracy, initial_ticks).to_list()
 
-    for time in range(offset, length + 1):  # additional position for an ending event
-        tempos[time] = tempo
 
-    return tempos
-
-
-def export_tempo_array(filepath: str,
-                       trim_output: bool) -> list[int]:
+def export_tempo_array(filepath: MidiSource,
+                       trim_output: bool,
+                       backend: str = DEFAULT_BACKEND) -> list[int]:
     """
     returns an array of tempos for each time unit in a given MIDI file after optional trimming
 
     :param filepath:
     :param trim_output:
+    :param backend:
     :return:
     """
-    tempos: list[int]
+    check_backend(backend)
+    tempo_map: TempoMap
     if trim_output:
-        _, _, _, _, tempos = prepare_file(filepath, False)
+        if backend == 'numpy':
+            _, _, tempo_map = quantise_tick_events(prepare_tick_events(filepath, False))
+        else:
+            _, _, _, _, tempo_map, _ = prepare_file_with_offsets(filepath, False)
+    elif backend == 'numpy':
+        events_file, _, accuracy = open_events(filepath)
+        length = max(get_grid_offsets(events_file.track_ticks[1:], accuracy).tolist())
+        tempo_map = get_tempo_map_from_events(events_file.get_track(0), length, accuracy)
     else:
         file, _, accuracy = open_file(filepath)
         length = get_midi_length(file, accuracy)
-        tempos = get_tempo_array(file, length, accuracy)
-    tempos = tempos[:-1]
+        tempo_map = get_tempo_map(file, length, accuracy)
+    tempos = tempo_map.to_list()[:-1]
 
     return tempos
 
@@ -363,6 +969,41 @@ def export_output(folder: str,
     np.save('{}/{}'.format(folder, filename), output)
 
 
+def get_note_messages(track: MidiTrack) -> Iterator[Tuple[int, Message, bool]]:
+    """
+    yields 'note_on' and 'note_off' Messages of a track with their starting times and a flag of Messages ending notes;
+    in case of 'note_on' messages only, 'note_off' is marked by velocity == 0
+
+    :param track:
+    :return:
+    """
+    off_notes = any(msg.type == 'note_off' for msg in track)
+    offset = 0
+    for msg in track:
+        offset += msg.time
+        if msg.type == 'note_on':
+            yield offset, msg, msg.velocity == 0 and not off_notes
+        elif msg.type == 'note_off':
+            yield offset, msg, True
+
+
+def copy_message(msg: Message,
+                 time: int,
+                 message_type: str) -> Message:
+    """
+    returns a copy of a note Message with a given time and type, equal to msg.copy(time=time) for the same type
+    and to Message(message_type, ...) for a different one, but without validating its attributes again
+
+    :param msg:
+    :param time:
+    :param message_type:
+    :return:
+    """
+    return Message(message_type, skip_checks=True, channel=msg.channel, note=msg.note, velocity=msg.velocity,
+                   time=time)
+
+
+@instrumented
 def combine_and_clean_tracks(tracks: list[MidiTrack]) -> MidiTrack:
     """
     translates all Messages to a single list, then removes vacuous Messages
@@ -370,58 +1011,30 @@ def combine_and_clean_tracks(tracks: list[MidiTrack]) -> MidiTrack:
     :param tracks:
     :return:
     """
-    note_grid = [0] * 128                            # list with numbers of active notes, one for each height
-    raw_messages = list[Tuple[int, Message]]()       # all messages with their starting times
-    filtered_messages = list[Tuple[int, Message]]()  # as raw_messages, but without repetitions
-    messages = list[Message]()                       # all messages with corrected timestamps
-    tracks = copy.deepcopy(tracks)
-
-    # in case of 'note_on' messages only, 'note_off' is marked by velocity == 0
-    for i in range(len(tracks)):
-        phantom_track = list[Message]()
-        off_notes = [x.type for x in tracks[i] if x.type == 'note_off']
-        if len(off_notes) == 0:
-            for msg in tracks[i]:
-                if msg.type == 'note_on':
-                    if msg.velocity != 0:
-                        phantom_track.append(msg)
-                    else:
-                        phantom_msg = Message('note_off', channel=msg.channel, note=msg.note,
-                                              time=msg.time, velocity=msg.velocity)
-                        phantom_track.append(phantom_msg)
-                else:
-                    phantom_track.append(msg)
-            tracks[i] = MidiTrack(phantom_track)
-
-    for track in tracks:
-        offset = 0
-        for msg in track:
-            offset += msg.time
-            if msg.type in ['note_on', 'note_off']:
-                raw_messages.append((offset, msg))
+    note_grid = [0] * 128                                  # list with numbers of active notes, one for each height
+    filtered_messages = list[Tuple[int, Message, bool]]()  # note Messages without repetitions, with starting times
+    messages = list[Message]()                             # copies of filtered messages with corrected timestamps
 
+    # Messages are streamed from tracks one after another, without collecting all of them first;
+    # source tracks are not modified, only the messages written to the output are created
     last_message_time = 0
     delta_error = 0  # saves 'time' argument from omitted messages
-    for time, msg in raw_messages:
-        if msg.type == 'note_on':
+    for time, msg, note_off in itertools.chain.from_iterable(get_note_messages(track) for track in tracks):
+        if not note_off:
             if note_grid[msg.note] == 0:
-                filtered_messages.append((time + delta_error, msg))
+                filtered_messages.append((time + delta_error, msg, note_off))
                 delta_error = 0
                 last_message_time = time
                 note_grid[msg.note] = 1
 
-            elif note_grid[msg.note] > 0:  # in case of overlapping tracks, loss of following notes' metadata
+            else:  # in case of overlapping tracks, loss of following notes' metadata
                 note_grid[msg.note] += 1
                 delta_error += (time - last_message_time)
                 last_message_time = time
 
-            else:
-                delta_error += (time - last_message_time)
-                last_message_time = time
-
-        elif msg.type == 'note_off':
+        else:
             if note_grid[msg.note] == 1:
-                filtered_messages.append((time + delta_error, msg))
+                filtered_messages.append((time + delta_error, msg, note_off))
                 delta_error = 0
                 last_message_time = time
                 note_grid[msg.note] = 0
@@ -434,18 +1047,12 @@ def combine_and_clean_tracks(tracks: list[MidiTrack]) -> MidiTrack:
             else:
                 delta_error += (time - last_message_time)
                 last_message_time = time
-
-        else:
-            delta_error += (time - last_message_time)
-            last_message_time = time
-    filtered_messages.sort(key=lambda x: x[0])
+    filtered_messages.sort(key=operator.itemgetter(0))
 
     offset = 0
-    for time, msg in filtered_messages:
-        if time - offset != msg.time:
-            msg.time = time - offset
-        offset += msg.time
-        messages.append(msg)
+    for time, msg, note_off in filtered_messages:
+        messages.append(copy_message(msg, time - offset, 'note_off' if note_off else 'note_on'))
+        offset = time
 
     return MidiTrack(messages)
 
@@ -468,29 +1075,24 @@ def get_max_velocity(tracks: list[MidiTrack]) -> int:
     return max_velocity
 
 
+@instrumented
 def remove_empty_tracks(file: MidiFile,
                         threshold: int = 0) -> MidiFile:
     """
-    removes tracks from a MIDI file which contain at most the number of messages given by a threshold
+    returns a MIDI file without tracks which contain at most the number of messages given by a threshold;
+    the given file is not modified, kept tracks are shared with it rather than copied
 
     :param file:
     :param threshold:
     :return:
     """
-    file = copy.deepcopy(file)
-    to_remove = list[int]()
-    for i in range(1, len(file.tracks)):
-        if len(file.tracks[i]) <= threshold:
-            to_remove.append(i)
-
-    to_remove.sort(reverse=True)
-    for i in to_remove:
-        file.tracks.pop(i)
+    output_file = MidiFile(type=file.type, ticks_per_beat=file.ticks_per_beat, charset=file.charset)
+    output_file.tracks = [track for i, track in enumerate(file.tracks) if i == 0 or len(track) > threshold]
 
-    return file
+    return output_file
 
 
-def prepare_file(filepath: str,
+def prepare_file(filepath: MidiSource,
                  join_tracks: bool,
                  track_length_threshold: int = TRACK_LENGTH_THRESHOLD) -> Tuple[MidiFile, str, float, int, list[int]]:
     """
@@ -498,6 +1100,25 @@ def prepare_file(filepath: str,
     then cleans, trims and optionally joins tracks;
     if the file has no notes, throws a ValueError
 
+    :param filepath:
+    :param join_tracks:
+    :param track_length_threshold:
+    :return:
+    """
+    file, filename, accuracy, length, tempo_map, _ = prepare_file_with_offsets(filepath, join_tracks,
+                                                                               track_length_threshold)
+    return file, filename, accuracy, length, tempo_map.to_list()
+
+
+def prepare_file_with_offsets(filepath: MidiSource,
+                              join_tracks: bool,
+                              track_length_threshold: int = TRACK_LENGTH_THRESHOLD) \
+        -> Tuple[MidiFile, str, float, int, TempoMap, list[np.ndarray]]:
+    """
+    as prepare_file, but returns tempos as a TempoMap, without expanding them to a value for each time unit,
+    and grid accuracy offsets of all Messages in each track;
+    offsets are computed once, then used for the input length, the tempo map and later for Events
+
     :param filepath:
     :param join_tracks:
     :param track_length_threshold:
@@ -526,75 +1147,604 @@ def prepare_file(filepath: str,
     for track in file.tracks[1:]:
         track[0].time -= min_time
 
-    length = get_midi_length(file, accuracy)
-    tempos = get_tempo_array(file, length, accuracy, min_time)
+    offsets = get_message_offsets(file, accuracy, min_time)
+    length = get_midi_length(file, accuracy, offsets)
+    tempo_map = get_tempo_map(file, length, accuracy, min_time, offsets[0])
 
-    return file, filename, accuracy, length, tempos
+    return file, filename, accuracy, length, tempo_map, offsets
 
 
-def get_lists_of_events(file: MidiFile,
+def get_nonzero_sequence(track: int,
+                         use_velocities: bool,
+                         times: np.ndarray,
+                         offsets: np.ndarray,
+                         tempos: np.ndarray,
+                         active: np.ndarray,
+                         velocities: Union[np.ndarray, None]) -> EventSequence:
+    """
+    creates an EventSequence from arrays of raw Events (with the opening one) without zero-length Events:
+    an Event is kept if the following one starts later, the last Event is always kept
+
+    :param track:
+    :param use_velocities:
+    :param times:
+    :param offsets:
+    :param tempos:
+    :param active:
+    :param velocities:
+    :return:
+    """
+    kept = np.append(times[1:] > 0, True)
+    lengths = np.append(times[1:], 0)[kept]
+    kept_times = np.concatenate((times[kept][:1], lengths[:-1]))
+
+    return EventSequence(track, use_velocities, kept_times, lengths, offsets[kept], tempos[kept], active[kept],
+                         velocities[kept] if velocities is not None else None)
+
+
+@instrumented
+def get_event_sequences(file: MidiFile,
                         accuracy: float,
-                        tempos: list[int],
-                        use_velocities: bool) -> list[list[Event]]:
+                        tempos: Union[list[int], TempoMap],
+                        use_velocities: bool,
+                        offsets: Union[list[np.ndarray], None] = None) -> list[EventSequence]:
     """
-    translates Messages to raw sequences of Events
+    translates Messages to EventSequences, without creating Event objects;
+    offsets of Messages from get_message_offsets can be given to avoid computing them again
 
     :param file:
     :param accuracy:
     :param tempos:
     :param use_velocities:
+    :param offsets:
     :return:
     """
-    initial_sequences = list[list[Event]]()
+    event_sequences = list[EventSequence]()
+    if offsets is None:
+        offsets = get_message_offsets(file, accuracy)
 
-    for track_index, track in enumerate(file.tracks[1:]):
-        initial_sequence = list[Event]()
-        ticks = 0
-        offset = 0
-        accumulated_increment = 0
+    for track_index, (track, track_offsets) in enumerate(zip(file.tracks[1:], offsets[1:])):
+        if isinstance(tempos, TempoMap):
+            track_tempos = tempos.get_tempos(track_offsets)
+        else:
+            track_tempos = np.asarray(tempos, dtype=np.int64)[track_offsets]
+
+        # states of all notes after each Event, starting with the opening one
+        active_state = bytearray(128)
+        velocity_state = bytearray(128)
+        active_rows = [bytes(active_state)]
+        velocity_rows = [bytes(velocity_state)]
+        times = [0]
+        event_offsets = [0]
+        event_tempos = [tempos[0]]
+
+        # time of a 'note_off' of an inactive note is passed to the following Event
+        last_offset = 0
+        for msg, offset, tempo in zip(track, track_offsets.tolist(), track_tempos.tolist()):
+            if msg.type == 'note_on':
+                active_state[msg.note] = 1
+                velocity_state[msg.note] = msg.velocity
+            elif msg.type == 'note_off':
+                if not active_state[msg.note]:
+                    continue
+                active_state[msg.note] = 0
+                velocity_state[msg.note] = 0
 
-        event_notes = dict[int, EventNote]()
-        initial_sequence.append(Event(0, 0, 0, track_index, tempos[0], {}, use_velocities))
+            if msg.type in ['note_on', 'note_off']:
+                active_rows.append(bytes(active_state))
+                if use_velocities:
+                    velocity_rows.append(bytes(velocity_state))
+                times.append(offset - last_offset)
+                event_offsets.append(offset)
+                event_tempos.append(tempo)
+            last_offset = offset
 
-        for msg in track:
-            increment = get_offset(msg.time, ticks, accuracy)
+        active = np.frombuffer(b''.join(active_rows), dtype=np.bool_).reshape(-1, 128)
+        velocities = np.frombuffer(b''.join(velocity_rows), dtype=np.uint8).reshape(-1, 128) if use_velocities else None
+        event_sequences.append(get_nonzero_sequence(track_index, use_velocities, np.array(times, dtype=np.int64),
+                                                    np.array(event_offsets, dtype=np.int64),
+                                                    np.array(event_tempos, dtype=np.int64), active, velocities))
 
-            if msg.type == 'note_on':
-                event_notes[msg.note] = EventNote(msg.velocity, msg.note)
-            elif msg.type == 'note_off':
-                try:
-                    event_notes.pop(msg.note)
-                except KeyError:
-                    ticks += msg.time
-                    offset += increment
-                    accumulated_increment += increment
-                    continue
+    return event_sequences
 
-            ticks += msg.time
-            offset += increment
-            increment += accumulated_increment
-            accumulated_increment = 0
 
-            if msg.type in ['note_on', 'note_off']:
-                initial_sequence.append(Event(increment, 0, offset, track_index,
-                                              tempos[offset], event_notes, use_velocities))
+@instrumented
+def get_lists_of_events(file: MidiFile,
+                        accuracy: float,
+                        tempos: Union[list[int], TempoMap],
+                        use_velocities: bool,
+                        offsets: Union[list[np.ndarray], None] = None) -> list[list[Event]]:
+    """
+    translates Messages to raw sequences of Events;
+    offsets of Messages from get_message_offsets can be given to avoid computing them again
+
+    :param file:
+    :param accuracy:
+    :param tempos:
+    :param use_velocities:
+    :param offsets:
+    :return:
+    """
+    return [sequence.to_events() for sequence in get_event_sequences(file, accuracy, tempos, use_velocities, offsets)]
+
+
+def check_backend(backend: str) -> None:
+    """
+    checks if a decode backend is supported: if not, raises a ValueError
+
+    :param backend:
+    :return:
+    """
+    if backend not in DECODE_BACKENDS:
+        raise ValueError('unknown decode backend "{}", expected one of {}'.format(backend, DECODE_BACKENDS))
+
+
+def get_smf_accuracy(file: SmfFile,
+                     grid_accuracy: int = GRID_ACCURACY) -> float:
+    """
+    returns the amount of MIDI ticks in a grid time unit of a parsed file, as open_file does
+
+    :param file:
+    :param grid_accuracy:
+    :return:
+    """
+    # translates notated_32nd_notes_per_beat to pulses per quarter (PPQ) if necessary
+    if file.notated_32nd_notes_per_beat is not None:
+        beat_amount = file.notated_32nd_notes_per_beat
+    else:
+        beat_amount = 8
+
+    return get_accuracy(file.ticks_per_beat, beat_amount, grid_accuracy)
+
+
+@instrumented
+def open_events(filepath: MidiSource,
+                grid_accuracy: int = GRID_ACCURACY,
+                limit_32nd_notes: Union[float, None] = None,
+                min_messages: int = 0) -> Tuple[SmfFile, str, float]:
+    """
+    as open_file, but parses a '.mid' file directly into a structured array of events;
+    with limit_32nd_notes, tracks are parsed only partially (see read_smf)
+
+    :param filepath:
+    :param grid_accuracy:
+    :param limit_32nd_notes:
+    :param min_messages:
+    :return:
+    """
+    filename = get_filename(os.fspath(cast(Union[str, 'os.PathLike[str]'], filepath))) if is_path(filepath) else ''
+    try:
+        file = read_smf(get_source_bytes(filepath), limit_32nd_notes, min_messages)
+    except (OSError, EOFError):
+        raise ImportError('file is corrupted')
+
+    check_file_type(file)
+    return file, filename, get_smf_accuracy(file, grid_accuracy)
+
+
+@instrumented
+def scan_events(filepath: MidiSource,
+                grid_accuracy: int = GRID_ACCURACY) -> Tuple[SmfFile, list[SmfTrackReader], float]:
+    """
+    as open_events, but only checks a '.mid' file, returning readers of its tracks instead of events (see scan_smf)
+
+    :param filepath:
+    :param grid_accuracy:
+    :return:
+    """
+    try:
+        file, readers = scan_smf(get_source_bytes(filepath))
+    except (OSError, EOFError):
+        raise ImportError('file is corrupted')
+
+    check_file_type(file)
+    return file, readers, get_smf_accuracy(file, grid_accuracy)
+
+
+@instrumented_file('filepath')
+def validate_file(filepath: MidiSource,
+                  track_length_threshold: int = TRACK_LENGTH_THRESHOLD) -> None:
+    """
+    quickly checks if a MIDI file can be decoded, without creating mido Messages: reads all chunk headers,
+    but each track only until it is long enough and has a 'note_on' message (see read_smf);
+    throws an ImportError for a corrupted file, a ValueError for a file of type other than 1 or without notes
+    in tracks included in output; later messages of tracks are not checked, so decoding may still fail
+
+    :param filepath:
+    :param track_length_threshold:
+    :return:
+    """
+    file, _, _ = open_events(filepath, GRID_ACCURACY, 0, track_length_threshold + 1)
+
+    track_indices = np.flatnonzero(file.track_sizes > track_length_threshold)
+    events = file.events[np.isin(file.events['track'], track_indices[track_indices > 0])]
+    if not np.any((events['type'] == EVENT_NOTE_ON) & (events['velocity'] > 0)):
+        raise ValueError('empty file - no note messages found')
+
+
+def get_grid_offsets(ticks: np.ndarray,
+                     accuracy: float) -> np.ndarray:
+    """
+    translates absolute MIDI ticks to the closest grid accuracy time units,
+    equal to the sums of get_offset increments up to each tick
+
+    :param ticks:
+    :param accuracy:
+    :return:
+    """
+    return np.rint(ticks.astype(np.float_) / accuracy).astype(np.int64)
+
+
+def get_events_length(tracks: list[np.ndarray],
+                      accuracy: float) -> int:
+    """
+    as get_midi_length, returns the length of the longest track of events
+
+    :param tracks:
+    :param accuracy:
+    :return:
+    """
+    return max(int(get_grid_offsets(track['abs_tick'][-1:], accuracy).sum()) for track in tracks)
+
+
+@instrumented
+def get_tempo_map_from_events(events: np.ndarray,
+                              length: int,
+                              accuracy: float,
+                              initial_ticks: int = 0) -> TempoMap:
+    """
+    as get_tempo_map, translates 'set_tempo' events to a TempoMap of length + 1 time units
+
+    :param events:
+    :param length:
+    :param accuracy:
+    :param initial_ticks:
+    :return:
+    """
+    tempo_events = events[events['type'] == EVENT_SET_TEMPO]
+    offsets = get_grid_offsets(tempo_events['abs_tick'] - initial_ticks, accuracy)
+
+    return TempoMap.from_changes(offsets, tempo_events['tempo'], length + 1)
 
-        # creates another list without zero-length event_lengths
-        nonzero_sequence = list[Event]()
-        for i in range(len(initial_sequence) - 1):
-            if initial_sequence[i + 1].time > 0:
-                initial_sequence[i].length = initial_sequence[i + 1].time
-                nonzero_sequence.append(initial_sequence[i])
-        nonzero_sequence.append(initial_sequence[-1])
 
-        for i in range(1, len(nonzero_sequence)):
-            nonzero_sequence[i].time = nonzero_sequence[i - 1].length
+def get_kept_notes_mask(notes: np.ndarray,
+                        note_on: np.ndarray,
+                        note_grid: Union[np.ndarray, None] = None) -> np.ndarray:
+    """
+    marks note events which are not repetitions, i.e. 'note_on' events of inactive notes
+    and 'note_off' events closing the last active instance of a note, as in combine_and_clean_tracks;
+    with note_grid given, numbers of active instances of notes before the events are taken from it
+    and it is updated to the numbers after them
+
+    :param notes:
+    :param note_on:
+    :param note_grid:
+    :return:
+    """
+    if len(notes) == 0:
+        return np.zeros(0, dtype=np.bool_)
+
+    steps = np.where(note_on, 1, -1).astype(np.int64)
+    order = np.argsort(notes, kind='stable')
+    sorted_notes = notes[order]
+    sorted_steps = steps[order]
+
+    group_starts = np.concatenate(([True], sorted_notes[1:] != sorted_notes[:-1]))
+    group_ids = np.cumsum(group_starts) - 1
+    sums = np.cumsum(sorted_steps)
+    prefix = sums - (sums - sorted_steps)[group_starts][group_ids]  # sums of steps within a single note
+    initial = note_grid[sorted_notes] if note_grid is not None else np.zeros(len(notes), dtype=np.int64)
+
+    # number of active instances of a note never falls below 0:
+    # grid = initial + prefix - min(0, initial + running minimum of prefix);
+    # groups are separated so that the running minimum restarts for every note
+    separation = 2 * len(notes) + 2
+    minima = np.minimum.accumulate(prefix - group_ids * separation) + group_ids * separation
+    grid = initial + prefix - np.minimum(initial + minima, 0)
+
+    previous_grid = np.concatenate(([0], grid[:-1]))
+    previous_grid[group_starts] = initial[group_starts]
+    sorted_mask = np.where(sorted_steps > 0, previous_grid == 0, previous_grid == 1)
+
+    if note_grid is not None:
+        group_ends = np.concatenate((group_starts[1:], [True]))
+        note_grid[sorted_notes[group_ends]] = grid[group_ends]
+
+    mask = np.empty_like(sorted_mask)
+    mask[order] = sorted_mask
+    return mask
+
+
+@instrumented
+def combine_and_clean_events(tracks: list[np.ndarray]) -> np.ndarray:
+    """
+    as combine_and_clean_tracks, translates note events of all tracks to a single array,
+    then removes vacuous events
+
+    :param tracks:
+    :return:
+    """
+    note_tracks = list[np.ndarray]()
+    for track in tracks:
+        notes = track[(track['type'] == EVENT_NOTE_ON) | (track['type'] == EVENT_NOTE_OFF)].copy()
+
+        # in case of 'note_on' messages only, 'note_off' is marked by velocity == 0
+        if not np.any(notes['type'] == EVENT_NOTE_OFF):
+            notes['type'][notes['velocity'] == 0] = EVENT_NOTE_OFF
+        note_tracks.append(notes)
+
+    if len(note_tracks) == 0:
+        return np.zeros(0, dtype=EVENT_DTYPE)
+
+    raw_events = np.concatenate(note_tracks)
+    kept = get_kept_notes_mask(raw_events['note'], raw_events['type'] == EVENT_NOTE_ON)
+
+    # 'time' arguments of omitted events are added to the following kept event
+    times = raw_events['abs_tick']
+    omitted_time = np.cumsum(np.where(kept, 0, np.diff(times, prepend=0)))[kept]
+    delta_errors = np.diff(omitted_time, prepend=0)
 
-        initial_sequences.append(nonzero_sequence)
-    return initial_sequences
+    events = raw_events[kept]
+    events['abs_tick'] += delta_errors
+    return events[np.argsort(events['abs_tick'], kind='stable')]
 
 
-def initialise_sequences(filepath: str,
+def get_max_velocity_from_events(tracks: list[np.ndarray]) -> int:
+    """
+    as get_max_velocity, returns the highest velocity across all 'note_on' events
+
+    :param tracks:
+    :return:
+    """
+    max_velocity = 0
+    for track in tracks:
+        velocities = track['velocity'][track['type'] == EVENT_NOTE_ON]
+        if len(velocities) > 0:
+            max_velocity = max(max_velocity, int(velocities.max()))
+
+    return max_velocity
+
+
+def prepare_events(filepath: MidiSource,
+                   join_tracks: bool,
+                   track_length_threshold: int = TRACK_LENGTH_THRESHOLD) \
+        -> Tuple[list[np.ndarray], str, float, int, list[int]]:
+    """
+    as prepare_file, parses MIDI file into arrays of note events, one for each track left after cleaning,
+    trimming and optional joining; if the file has no notes, throws a ValueError
+
+    :param filepath:
+    :param join_tracks:
+    :param track_length_threshold:
+    :return:
+    """
+    tick_events = prepare_tick_events(filepath, join_tracks, track_length_threshold)
+    accuracy, length, tempo_map = quantise_tick_events(tick_events)
+    return tick_events.tracks, tick_events.filename, accuracy, length, tempo_map.to_list()
+
+
+def prepare_tick_events(filepath: MidiSource,
+                        join_tracks: bool,
+                        track_length_threshold: int = TRACK_LENGTH_THRESHOLD,
+                        cache: Union[DecodeCache, None] = None,
+                        end: Union[int, None] = None,
+                        grid_accuracy: int = GRID_ACCURACY) -> TickEvents:
+    """
+    parses a MIDI file into cleaned, trimmed and optionally joined arrays of note events, as prepare_events does,
+    but keeps their MIDI ticks, so that they can be quantised to any grid accuracy (see quantise_tick_events);
+    if the file has no notes, throws a ValueError;
+    with end given and join_tracks == False, tracks are parsed only as far as needed for time units before end
+    (of a given grid accuracy), events of such tracks end later but are incomplete and marked in
+    TickEvents.truncated; joined tracks are always parsed whole, as repetitions of notes are removed
+    across all tracks in their order;
+    with a given DecodeCache, events are stored for the file content and reused instead of parsing it again
+
+    :param filepath:
+    :param join_tracks:
+    :param track_length_threshold:
+    :param cache:
+    :param end:
+    :param grid_accuracy:
+    :return:
+    """
+    limited = end is not None and not join_tracks
+
+    key = ''
+    if cache is not None:
+        filepath = get_source_bytes(filepath)
+        parameters = [join_tracks, track_length_threshold] + ([cast(int, end), grid_accuracy] if limited else [])
+        key = cache.get_key(filepath, 'prepare_tick_events', *parameters)
+        cached_arrays = cache.load(key)
+        if isinstance(cached_arrays, dict):
+            return TickEvents.from_arrays(cached_arrays)
+
+    # a time unit after end and a 4/4 measure are added, so that rounding of ticks to the grid never matters
+    limit_32nd_notes = (cast(int, end) + 1) * 32 / grid_accuracy + 32 if limited else None
+    file, filename, _ = open_events(filepath, GRID_ACCURACY, limit_32nd_notes, track_length_threshold + 1)
+    track_indices = [i for i in range(1, len(file.track_sizes)) if file.track_sizes[i] > track_length_threshold]
+    tracks = [file.get_track(i) for i in track_indices]
+
+    if join_tracks:
+        tracks = [combine_and_clean_events(tracks)]
+        truncated = [False]
+    else:
+        tracks = [combine_and_clean_events([track]) for track in tracks]
+        truncated = file.truncated[track_indices].tolist()
+
+    truncated = [track_truncated for track, track_truncated in zip(tracks, truncated) if len(track) > 0]
+    tracks = [track for track in tracks if len(track) > 0]
+    if len(tracks) == 0:
+        raise ValueError('empty file - no note messages found')
+
+    # remove notes' beginning offset
+    min_time = min(int(track['abs_tick'][0]) for track in tracks)
+    for track in tracks:
+        track['abs_tick'] -= min_time
+
+    tempo_events = file.get_track(0)
+    beat_amount = file.notated_32nd_notes_per_beat if file.notated_32nd_notes_per_beat is not None else 8
+    tick_events = TickEvents(tracks, tempo_events[tempo_events['type'] == EVENT_SET_TEMPO], filename,
+                             file.ticks_per_beat, beat_amount, min_time, np.array(truncated, dtype=np.bool_))
+
+    if cache is not None:
+        cache.store(key, tick_events.get_arrays())
+    return tick_events
+
+
+def quantise_tick_events(tick_events: TickEvents,
+                         grid_accuracy: int = GRID_ACCURACY) -> Tuple[float, int, TempoMap]:
+    """
+    returns the amount of MIDI ticks in a grid time unit, the length and the TempoMap of events
+    quantised to a given grid accuracy
+
+    :param tick_events:
+    :param grid_accuracy:
+    :return:
+    """
+    if grid_accuracy <= 0:
+        raise ValueError('grid accuracy must be positive')
+
+    accuracy = tick_events.get_accuracy(grid_accuracy)
+    length = get_events_length(tick_events.tracks, accuracy)
+    tempo_map = get_tempo_map_from_events(tick_events.tempo_events, length, accuracy, tick_events.initial_ticks)
+    return accuracy, length, tempo_map
+
+
+def get_event_creating_messages(track: np.ndarray) -> np.ndarray:
+    """
+    returns a mask of cleaned note events of a track creating Events: 'note_off' of an inactive note creates
+    no Event, its time is passed to the following one
+
+    :param track:
+    :return:
+    """
+    notes = track['note'].astype(np.int64)
+    note_on = track['type'] == EVENT_NOTE_ON
+
+    order = np.argsort(notes, kind='stable')
+    sorted_notes = notes[order]
+    previous_on = np.concatenate(([False], note_on[order][:-1]))
+    previous_on[np.concatenate(([True], sorted_notes[1:] != sorted_notes[:-1]))] = False
+    active_before = np.empty_like(previous_on)
+    active_before[order] = previous_on
+    return note_on | active_before
+
+
+@instrumented
+def get_event_sequences_from_arrays(tracks: list[np.ndarray],
+                                    accuracy: float,
+                                    tempos: Union[list[int], TempoMap],
+                                    use_velocities: bool) -> list[EventSequence]:
+    """
+    as get_event_sequences, translates arrays of cleaned note events to EventSequences
+
+    :param tracks:
+    :param accuracy:
+    :param tempos:
+    :param use_velocities:
+    :return:
+    """
+    event_sequences = list[EventSequence]()
+
+    for track_index, track in enumerate(tracks):
+        offsets = get_grid_offsets(track['abs_tick'], accuracy)
+        notes = track['note'].astype(np.int64)
+        note_on = track['type'] == EVENT_NOTE_ON
+        creates_event = get_event_creating_messages(track)
+
+        # initial events, with the opening one (at position -1), then the ones without zero-length successors
+        positions = np.concatenate(([-1], np.flatnonzero(creates_event)))
+        event_offsets = np.concatenate(([0], offsets[creates_event]))
+        nonzero = np.concatenate((event_offsets[1:] > event_offsets[:-1], [True]))
+        positions = positions[nonzero]
+        event_offsets = event_offsets[nonzero]
+        lengths = np.diff(event_offsets, append=event_offsets[-1])
+        times = np.diff(event_offsets, prepend=0)
+
+        # state of a note after each event is given by its last 'note_on' or 'note_off' event
+        active = np.zeros((len(positions), 128), dtype=np.bool_)
+        velocities = np.zeros((len(positions), 128), dtype=np.int64)
+        for note in np.unique(notes):
+            note_positions = np.flatnonzero(notes == note)
+            last = np.searchsorted(note_positions, positions, side='right') - 1
+            has_message = last >= 0
+            last_messages = note_positions[last[has_message]]
+            active[has_message, note] = note_on[last_messages]
+            velocities[has_message, note] = track['velocity'][last_messages]
+
+        if isinstance(tempos, TempoMap):
+            event_tempos = tempos.get_tempos(event_offsets)
+        else:
+            event_tempos = np.asarray(tempos)[event_offsets]
+
+        event_sequences.append(EventSequence(track_index, use_velocities, times, lengths, event_offsets,
+                                             event_tempos.astype(np.int64), active,
+                                             np.where(active, velocities, 0).astype(np.uint8)
+                                             if use_velocities else None))
+
+    return event_sequences
+
+
+def initialise_event_sequences_with_backend(filepath: MidiSource,
+                                           use_velocities: bool,
+                                           join_tracks: bool,
+                                           backend: str = DEFAULT_BACKEND,
+                                           use_custom_normalization: bool = False) \
+        -> Tuple[Union[MidiFile, list[np.ndarray]], str, int, TempoMap, list[EventSequence]]:
+    """
+    gets EventSequences from a MIDI file parsed once with a given backend and normalises them to either 128
+    or maximal velocity; returns the parsed file (a MidiFile for 'mido', arrays of tracks for 'numpy'),
+    its name, its length, its TempoMap and EventSequences
+
+    :param filepath:
+    :param use_velocities:
+    :param join_tracks:
+    :param backend:
+    :param use_custom_normalization:
+    :return:
+    """
+    check_backend(backend)
+    event_sequences: list[EventSequence]
+    if backend == 'numpy':
+        tick_events = prepare_tick_events(filepath, join_tracks)
+        accuracy, length, tempo_map = quantise_tick_events(tick_events)
+        tracks, filename = tick_events.tracks, tick_events.filename
+        event_sequences = get_event_sequences_from_arrays(tracks, accuracy, tempo_map, use_velocities)
+        max_velocity = get_max_velocity_from_events(tracks) if use_custom_normalization else 128
+        parsed: Union[MidiFile, list[np.ndarray]] = tracks
+    else:
+        file, filename, accuracy, length, tempo_map, offsets = prepare_file_with_offsets(filepath, join_tracks)
+        event_sequences = get_event_sequences(file, accuracy, tempo_map, use_velocities, offsets)
+        max_velocity = get_max_velocity(file.tracks[1:]) if use_custom_normalization else 128
+        parsed = file
+
+    with record_stage('normalise'):
+        for sequence in event_sequences:
+            sequence.normalise(max_velocity)
+
+    return parsed, filename, length, tempo_map, event_sequences
+
+
+def initialise_event_sequences(filepath: MidiSource,
+                               use_velocities: bool,
+                               join_tracks: bool,
+                               use_custom_normalization: bool = False) \
+        -> Tuple[MidiFile, str, int, list[EventSequence]]:
+    """
+    gets EventSequences from a MIDI file and normalises them to either 128 or maximal velocity
+
+    :param filepath:
+    :param use_velocities:
+    :param join_tracks:
+    :param use_custom_normalization:
+    :return:
+    """
+    file, filename, length, _, event_sequences = initialise_event_sequences_with_backend(
+        filepath, use_velocities, join_tracks, 'mido', use_custom_normalization)
+    return cast(MidiFile, file), filename, length, event_sequences
+
+
+def initialise_sequences(filepath: MidiSource,
                          use_velocities: bool,
                          join_tracks: bool,
                          use_custom_normalization: bool = False) -> Tuple[MidiFile, str, int, list[list[Event]]]:
@@ -607,29 +1757,214 @@ def initialise_sequences(filepath: str,
     :param use_custom_normalization:
     :return:
     """
-    file, filename, accuracy, length, tempos = prepare_file(filepath, join_tracks)
-    initial_sequences = get_lists_of_events(file, accuracy, tempos, use_velocities)
+    file, filename, length, event_sequences = initialise_event_sequences(filepath, use_velocities, join_tracks,
+                                                                         use_custom_normalization)
+    return file, filename, length, [sequence.to_events() for sequence in event_sequences]
 
-    if use_custom_normalization:
-        max_velocity = get_max_velocity(file.tracks[1:])
-        for sequence in initial_sequences:
-            for event in sequence:
-                event.normalise(max_velocity)
 
+def get_sequence_arrays(output_list: list[list[Tuple[int, Union[list[int], list[bool], list[float],
+                                                                  list[Tuple[int, float]]]]]],
+                        use_velocities: bool,
+                        only_active_notes: bool) -> dict[str, np.ndarray]:
+    """
+    translates tracks of get_sequence_of_notes output into flat arrays, e.g. to store them in a DecodeCache
+
+    :param output_list:
+    :param use_velocities:
+    :param only_active_notes:
+    :return:
+    """
+    events = [event for track_list in output_list for event in track_list]
+    arrays: dict[str, np.ndarray] = {
+        'track_lengths': np.array([len(track_list) for track_list in output_list], dtype=np.int64),
+        'lengths': np.array([length for length, _ in events], dtype=np.int64),
+    }
+
+    if only_active_notes:
+        arrays['counts'] = np.array([len(notes) for _, notes in events], dtype=np.int64)
+        if use_velocities:
+            elements = [element for _, notes in events for element in cast(list[Tuple[int, float]], notes)]
+            arrays['heights'] = np.array([height for height, _ in elements], dtype=np.int64)
+            arrays['values'] = np.array([value for _, value in elements], dtype=np.float_)
+        else:
+            arrays['heights'] = np.array([height for _, notes in events for height in notes], dtype=np.int64)
     else:
-        for sequence in initial_sequences:
-            for event in sequence:
-                event.normalise(128)
+        arrays['notes'] = np.array([notes for _, notes in events],
+                                   dtype=np.float_ if use_velocities else np.bool_).reshape(len(events), 128)
 
-    return file, filename, length, initial_sequences
+    return arrays
 
 
-def get_sequence_of_notes(filepath: str,
+def get_sequence_arrays_from_event_sequences(event_sequences: list[EventSequence],
+                                             use_velocities: bool) -> dict[str, np.ndarray]:
+    """
+    translates EventSequences directly into flat arrays of active notes, as get_sequence_arrays does
+    with only_active_notes == True; get_sequence_from_arrays expands them to outputs of both kinds
+
+    :param event_sequences:
+    :param use_velocities:
+    :return:
+    """
+    lengths = [sequence.lengths for sequence in event_sequences]
+    counts = list[np.ndarray]()
+    heights = list[np.ndarray]()
+    values = list[np.ndarray]()
+    for sequence in event_sequences:
+        event_indices, sequence_heights, sequence_values = sequence.get_active_notes()
+        counts.append(np.bincount(event_indices, minlength=len(sequence)))
+        heights.append(sequence_heights)
+        values.append(sequence_values)
+
+    arrays: dict[str, np.ndarray] = {
+        'track_lengths': np.array([len(sequence) for sequence in event_sequences], dtype=np.int64),
+        'lengths': np.concatenate(lengths + [np.zeros(0, dtype=np.int64)]).astype(np.int64),
+        'counts': np.concatenate(counts + [np.zeros(0, dtype=np.int64)]).astype(np.int64),
+        'heights': np.concatenate(heights + [np.zeros(0, dtype=np.int64)]).astype(np.int64),
+    }
+    if use_velocities:
+        arrays['values'] = np.concatenate(values + [np.zeros(0, dtype=np.float_)])
+
+    return arrays
+
+
+def get_sequence_from_arrays(arrays: dict[str, np.ndarray],
+                             use_velocities: bool,
+                             only_active_notes: bool) \
+        -> list[list[Tuple[int, Union[list[int], list[bool], list[float], list[Tuple[int, float]]]]]]:
+    """
+    translates flat arrays from get_sequence_arrays (or get_sequence_arrays_from_event_sequences)
+    back into tracks of get_sequence_of_notes output
+
+    :param arrays:
+    :param use_velocities:
+    :param only_active_notes:
+    :return:
+    """
+    lengths: list[int] = arrays['lengths'].tolist()
+    all_notes: list[Union[list[int], list[bool], list[float], list[Tuple[int, float]]]]
+
+    if 'notes' in arrays:
+        all_notes = arrays['notes'].tolist()
+    elif only_active_notes:
+        note_ends = np.cumsum(arrays['counts'])
+        note_begins = note_ends - arrays['counts']
+        heights: list[int] = arrays['heights'].tolist()
+        if use_velocities:
+            values: list[float] = arrays['values'].tolist()
+            all_notes = [list(zip(heights[begin:end], values[begin:end]))
+                         for begin, end in zip(note_begins.tolist(), note_ends.tolist())]
+        else:
+            all_notes = [heights[begin:end] for begin, end in zip(note_begins.tolist(), note_ends.tolist())]
+    else:
+        # lists are filled with active notes only, so that all zeros are the same object, as in Event.all_notes
+        rows: list[list[Any]] = [[float(0) if use_velocities else False] * 128 for _ in range(len(lengths))]
+        event_indices = np.repeat(np.arange(len(lengths)), arrays['counts'])
+        row_values = arrays['values'].tolist() if use_velocities else [True] * len(event_indices)
+        for event_index, height, value in zip(event_indices.tolist(), arrays['heights'].tolist(), row_values):
+            rows[event_index][height] = value
+        all_notes = list(rows)
+
+    output_list = list[list[Tuple[int, Union[list[int], list[bool], list[float], list[Tuple[int, float]]]]]]()
+    begin = 0
+    for track_length in arrays['track_lengths'].tolist():
+        output_list.append(list(zip(lengths[begin:begin + track_length], all_notes[begin:begin + track_length])))
+        begin += track_length
+
+    return output_list
+
+
+def get_notes_matrix(sequence: EventSequence,
+                     dtype: np.dtype) -> np.ndarray:
+    """
+    returns notes of all Events of a sequence as a matrix of a given type, one row for each Event:
+    np.bool_ for active notes, np.uint8 for MIDI velocities and np.float16 for normalised velocities;
+    without velocities, active notes are ones in matrices of all types
+
+    :param sequence:
+    :param dtype:
+    :return:
+    """
+    if dtype == np.bool_ or not sequence.use_velocities:
+        return sequence.active.astype(dtype)
+
+    # filled with values of active notes only, so that no float64 matrix is created
+    notes = np.zeros(sequence.active.shape, dtype=dtype)
+    event_indices, heights, values = sequence.get_active_notes()
+    if dtype == np.uint8:
+        values = cast(np.ndarray, sequence.velocities)[event_indices, heights]
+    notes[event_indices, heights] = values
+
+    return notes
+
+
+@instrumented_file('filepath')
+def get_notes_matrices(filepath: MidiSource,
+                       use_velocities: bool,
+                       join_tracks: bool,
+                       dtype: Union[str, type, np.dtype] = np.bool_,
+                       backend: str = DEFAULT_BACKEND,
+                       cache: Union[DecodeCache, None] = None) -> NotesMatrices:
+    """
+    as get_sequence_of_notes with only_active_notes == False, translates a MIDI file into a sequence of notes,
+    but returns an array of event lengths and a matrix of notes of size events x 128 (see get_notes_matrix)
+    instead of lists, for each track or for joined tracks
+
+    get_notes_matrices(str, bool, False, dtype) -> <list> 'tracks'
+      (<Tuple> (<np.ndarray [int64]> 'event lengths', <np.ndarray [dtype], size: 'events' x 128>))
+    get_notes_matrices(str, bool, True, dtype) ->
+      <Tuple> (<np.ndarray [int64]> 'event lengths', <np.ndarray [dtype], size: 'events' x 128>)
+
+    :param filepath:
+    :param use_velocities:
+    :param join_tracks:
+    :param dtype:
+    :param backend:
+    :param cache:
+    :return:
+    """
+    check_backend(backend)
+    dtype = np.dtype(dtype)
+    if dtype not in SEQUENCE_DTYPES:
+        raise ValueError('unknown type of notes "{}", expected one of {}'.format(dtype, SEQUENCE_DTYPES))
+
+    key = ''
+    arrays: Union[np.ndarray, dict[str, np.ndarray], None] = None
+    if cache is not None:
+        filepath = get_source_bytes(filepath)
+        key = cache.get_key(filepath, 'get_notes_matrices', use_velocities, join_tracks, dtype.num, GRID_ACCURACY)
+        arrays = cache.load(key)
+
+    if not isinstance(arrays, dict):
+        _, _, _, _, event_sequences = initialise_event_sequences_with_backend(filepath, use_velocities,
+                                                                              join_tracks, backend)
+
+        arrays = {
+            'track_lengths': np.array([len(sequence) for sequence in event_sequences], dtype=np.int64),
+            'lengths': np.concatenate([sequence.lengths for sequence in event_sequences]).astype(np.int64),
+            'notes': np.concatenate([get_notes_matrix(sequence, dtype) for sequence in event_sequences]),
+        }
+        if cache is not None:
+            cache.store(key, arrays)
+
+    # outputs of tracks are views of the arrays
+    track_ends = np.cumsum(arrays['track_lengths']).tolist()
+    output_list = [(arrays['lengths'][end - track_length:end], arrays['notes'][end - track_length:end])
+                   for track_length, end in zip(arrays['track_lengths'].tolist(), track_ends)]
+
+    return output_list[0] if join_tracks else output_list
+
+
+@instrumented_file('filepath')
+def get_sequence_of_notes(filepath: MidiSource,
                           use_velocities: bool,
                           join_tracks: bool,
-                          only_active_notes: bool) \
+                          only_active_notes: bool,
+                          backend: str = DEFAULT_BACKEND,
+                          cache: Union[DecodeCache, None] = None,
+                          dtype: Union[str, type, np.dtype, None] = None) \
         -> Union[list[list[Tuple[int, Union[list[int], list[bool], list[float], list[Tuple[int, float]]]]]],
-                 list[Tuple[int, Union[list[int], list[bool], list[float], list[Tuple[int, float]]]]]]:
+                 list[Tuple[int, Union[list[int], list[bool], list[float], list[Tuple[int, float]]]]],
+                 NotesMatrices]:
     """
     translates a MIDI file into a sequence representing notes;
     output type depends on parameters:
@@ -652,41 +1987,47 @@ def get_sequence_of_notes(filepath: str,
     get_sequence_of_notes(str, True, True, False) ->
       <list> 'event_lengths' (<Tuple> (<int> 'time offset', <list [float], size: 128>))
 
+    with a given dtype (np.bool_, np.uint8 or np.float16), NumPy arrays are returned instead of lists,
+    as by get_notes_matrices; only_active_notes has to be False then;
+    with a given DecodeCache, outputs are stored for the file content and reused instead of decoding it again
+
     :param filepath:
     :param use_velocities:
     :param join_tracks:
     :param only_active_notes:
+    :param backend:
+    :param cache:
+    :param dtype:
     :return:
     """
-    file, filename, length, initial_sequences = initialise_sequences(filepath, use_velocities, join_tracks, False)
+    if dtype is not None:
+        if only_active_notes:
+            raise ValueError('NumPy outputs (dtype given) hold all notes, only_active_notes must be False')
+        return get_notes_matrices(filepath, use_velocities, join_tracks, dtype, backend, cache)
+
+    check_backend(backend)
     output_list = list[list[Tuple[int, Union[list[int], list[bool], list[float], list[Tuple[int, float]]]]]]()
 
-    for sequence in initial_sequences:
-        track_list = list[Tuple[int, Union[list[int], list[bool], list[float], list[Tuple[int, float]]]]]()
+    key = ''
+    cached_arrays: Union[np.ndarray, dict[str, np.ndarray], None] = None
+    if cache is not None:
+        filepath = get_source_bytes(filepath)
+        key = cache.get_key(filepath, 'get_sequence_of_notes', use_velocities, join_tracks, only_active_notes,
+                            GRID_ACCURACY)
+        cached_arrays = cache.load(key)
 
-        if only_active_notes:
-            for event in sequence:
-                event_list: Union[list[int], list[bool], list[float], list[Tuple[int, float]]]  # type consistency
-                if use_velocities:
-                    tuple_list = list[Tuple[int, float]]()
-                    for element in event.active_notes:
-                        tuple_list.append((element.height, float(element.value)))
-                    event_list = tuple_list
-                else:
-                    int_list = list[int]()
-                    for element in event.active_notes:
-                        int_list.append(element.height)
-                    event_list = int_list
-                track_list.append((event.length, event_list))
+    if isinstance(cached_arrays, dict):
+        output_list = get_sequence_from_arrays(cached_arrays, use_velocities, only_active_notes)
+    else:
+        _, _, _, _, event_sequences = initialise_event_sequences_with_backend(filepath, use_velocities,
+                                                                              join_tracks, backend)
 
-        else:
-            for event in sequence:
-                notes: Union[list[int], list[bool], list[float], list[Tuple[int, float]]] = event.all_notes
-                new_tuple: Tuple[int, Union[list[int], list[bool], list[float], list[Tuple[int, float]]]] \
-                    = (event.length, notes)
-                track_list.append(new_tuple)
+        # Event objects are not created, lists are made directly from flat arrays of all EventSequences
+        arrays = get_sequence_arrays_from_event_sequences(event_sequences, use_velocities)
+        output_list = get_sequence_from_arrays(arrays, use_velocities, only_active_notes)
 
-        output_list.append(track_list)
+        if cache is not None:
+            cache.store(key, arrays)
 
     output: Union[list[list[Tuple[int, Union[list[int], list[bool], list[float], list[Tuple[int, float]]]]]],
                   list[Tuple[int, Union[list[int], list[bool], list[float], list[Tuple[int, float]]]]]]
@@ -698,9 +2039,161 @@ def get_sequence_of_notes(filepath: str,
     return output
 
 
-def get_array_of_notes(filepath: str,
+def get_interval_indices(offsets: np.ndarray,
+                         lengths: np.ndarray) -> np.ndarray:
+    """
+    translates intervals given by their beginnings and lengths into a flat array of all covered time units,
+    ordered as the intervals are, e.g. offsets [0, 5] and lengths [2, 3] give [0, 1, 5, 6, 7]
+
+    :param offsets:
+    :param lengths:
+    :return:
+    """
+    lengths = np.maximum(np.asarray(lengths, dtype=np.int64), 0)  # as range() is empty for negative lengths
+    offsets = np.asarray(offsets, dtype=np.int64)
+    interval_ends = np.cumsum(lengths)
+
+    # index within an interval is the global index shifted back to the interval's beginning
+    shifts = np.repeat(offsets - (interval_ends - lengths), lengths)
+    return np.arange(interval_ends[-1] if len(interval_ends) > 0 else 0, dtype=np.int64) + shifts
+
+
+def get_event_arrays(sequence: Union[list[Event], EventSequence],
+                     use_velocities: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    translates a sequence of Events into arrays of offsets, lengths and notes, one row for each Event;
+    an EventSequence already stores them
+
+    :param sequence:
+    :param use_velocities:
+    :return:
+    """
+    if isinstance(sequence, EventSequence):
+        return sequence.offsets, sequence.lengths, sequence.get_notes()
+
+    offsets = np.fromiter((event.offset for event in sequence), dtype=np.int64, count=len(sequence))
+    lengths = np.fromiter((event.length for event in sequence), dtype=np.int64, count=len(sequence))
+    notes = np.array([event.all_notes for event in sequence],
+                     dtype=np.float_ if use_velocities else np.bool_).reshape(len(sequence), 128)
+
+    return offsets, lengths, notes
+
+
+@instrumented
+def fill_array_of_notes(output_array: np.ndarray,
+                        offsets: np.ndarray,
+                        lengths: np.ndarray,
+                        notes: np.ndarray) -> None:
+    """
+    writes rows of notes into a time-distributed array, each repeated over the interval given by its offset and length;
+    intervals are expected to be disjoint, as the ones of Events from a single track are
+
+    :param output_array:
+    :param offsets:
+    :param lengths:
+    :param notes:
+    :return:
+    """
+    time_units = get_interval_indices(offsets, lengths)
+    output_array[time_units] = np.repeat(notes, np.maximum(lengths, 0), axis=0)
+
+
+@instrumented
+def get_sparse_roll_from_sequences(initial_sequences: Sequence[Union[list[Event], EventSequence]],
+                                   length: int,
+                                   use_velocities: bool,
+                                   join_tracks: bool) -> SparseRoll:
+    """
+    translates sequences of Events directly into a SparseRoll, without creating a dense array;
+    each Event's notes are repeated in all rows of its time units
+
+    :param initial_sequences:
+    :param length:
+    :param use_velocities:
+    :param join_tracks:
+    :return:
+    """
+    row_lengths = np.zeros((len(initial_sequences), length), dtype=np.int64)
+    all_indices = list[np.ndarray]()
+    all_data = list[np.ndarray]()
+
+    for seq_index, sequence in enumerate(initial_sequences):
+        offsets, lengths, notes = get_event_arrays(sequence, use_velocities)
+        lengths = np.maximum(lengths, 0)
+        event_indices, heights = np.nonzero(notes)
+        counts = np.bincount(event_indices, minlength=len(notes))
+
+        # for each time unit covered by an Event, all of the Event's non-zero notes
+        time_units = get_interval_indices(offsets, lengths)
+        unit_events = np.repeat(np.arange(len(notes)), lengths)
+        row_lengths[seq_index, time_units] = counts[unit_events]
+        elements = get_interval_indices(np.cumsum(counts)[unit_events] - counts[unit_events], counts[unit_events])
+
+        all_indices.append(heights[elements].astype(np.uint8))
+        all_data.append(notes[event_indices, heights][elements])
+
+    indptr = np.zeros(row_lengths.size + 1, dtype=np.int64)
+    np.cumsum(row_lengths, out=indptr[1:])
+    shape: Union[Tuple[int, int], Tuple[int, int, int]] = \
+        (length, 128) if join_tracks else (len(initial_sequences), length, 128)
+
+    return SparseRoll(shape, indptr, np.concatenate(all_indices), np.concatenate(all_data))
+
+
+@instrumented
+def get_dense_array_of_notes(initial_sequences: Sequence[Union[list[Event], EventSequence]],
+                             length: int,
+                             use_velocities: bool,
+                             join_tracks: bool,
+                             packed: bool) -> np.ndarray:
+    """
+    translates sequences of Events into a dense array of notes, as returned by get_array_of_notes
+
+    :param initial_sequences:
+    :param length:
+    :param use_velocities:
+    :param join_tracks:
+    :param packed:
+    :return:
+    """
+    array_size: Union[Tuple[int, int], Tuple[int, int, int]]
+    notes_size = PACKED_NOTES if packed else 128
+
+    if join_tracks:
+        array_size = (length, notes_size)
+    else:
+        array_size = (len(initial_sequences), length, notes_size)
+
+    if use_velocities:
+        output_array = np.zeros(array_size, dtype=np.float_)
+    elif packed:
+        output_array = np.zeros(array_size, dtype=np.uint8)
+    else:
+        output_array = np.zeros(array_size, dtype=np.bool_)
+
+    # Events' notes are packed before being repeated over time units, so that no unpacked array is created
+    if join_tracks:
+        offsets, lengths, notes = get_event_arrays(initial_sequences[0], use_velocities)
+        fill_array_of_notes(output_array, offsets, lengths, pack_roll(notes) if packed else notes)
+
+    else:
+        for seq_index, sequence in enumerate(initial_sequences):
+            offsets, lengths, notes = get_event_arrays(sequence, use_velocities)
+            fill_array_of_notes(output_array[seq_index], offsets, lengths, pack_roll(notes) if packed else notes)
+
+    return output_array
+
+
+@instrumented_file('filepath')
+def get_array_of_notes(filepath: MidiSource,
                        use_velocities: bool,
-                       join_tracks: bool) -> np.ndarray:
+                       join_tracks: bool,
+                       backend: str = DEFAULT_BACKEND,
+                       cache: Union[DecodeCache, None] = None,
+                       sparse: bool = False,
+                       packed: bool = False,
+                       start: int = 0,
+                       end: Union[int, None] = None) -> Union[np.ndarray, SparseRoll]:
     """
     translates a MIDI file into an array representing notes;
     output type depends on parameters:
@@ -715,38 +2208,390 @@ def get_array_of_notes(filepath: str,
     get_array_of_notes(str, True, True) ->
       <np.ndarray [float], size: 'grid length' x 128>
 
+    with sparse == True, a SparseRoll of the same shape and dtype is returned instead of a dense array;
+    with packed == True, boolean notes are packed into bits (see roll.pack_roll), the last dimension being 16 bytes;
+    with end given, only time units [start, end) are decoded, see get_range_of_notes;
+    with a given DecodeCache, outputs are stored for the file content and reused instead of decoding it again
+
     :param filepath:
     :param use_velocities:
     :param join_tracks:
+    :param backend:
+    :param cache:
+    :param sparse:
+    :param packed:
+    :param start:
+    :param end:
     :return:
     """
-    file, filename, length, initial_sequences = initialise_sequences(filepath, use_velocities, join_tracks, False)
-    array_size: Union[Tuple[int, int], Tuple[int, int, int]]
+    check_backend(backend)
+    if packed and (use_velocities or sparse):
+        raise ValueError('only dense boolean outputs (use_velocities == False, sparse == False) can be packed')
+    if end is None and start != 0:
+        raise ValueError('start of a range of time units requires its end')
+    if end is not None and sparse:
+        raise ValueError('only dense outputs (sparse == False) can be decoded for a range of time units')
+
+    key = ''
+    if cache is not None:
+        filepath = get_source_bytes(filepath)
+        key = cache.get_key(filepath, 'get_array_of_notes', use_velocities, join_tracks, sparse, packed,
+                            GRID_ACCURACY, *([start, end] if end is not None else []))
+        cached_array = cache.load(key)
+        if isinstance(cached_array, np.ndarray):
+            return cached_array
+        if isinstance(cached_array, dict):
+            return SparseRoll.from_arrays(cached_array)
+
+    if end is not None:
+        range_array = get_range_of_notes(filepath, use_velocities, join_tracks, start, end, backend, packed)
+        if cache is not None:
+            cache.store(key, range_array)
+        return range_array
+
+    _, _, length, _, initial_sequences = initialise_event_sequences_with_backend(filepath, use_velocities,
+                                                                                 join_tracks, backend)
+
+    if sparse:
+        output_roll = get_sparse_roll_from_sequences(initial_sequences, length, use_velocities, join_tracks)
+        if cache is not None:
+            cache.store(key, output_roll.get_arrays())
+        return output_roll
+
+    output_array = get_dense_array_of_notes(initial_sequences, length, use_velocities, join_tracks, packed)
+    if cache is not None:
+        cache.store(key, output_array)
+
+    return output_array
+
+
+def get_array_of_notes_from_tick_events(tick_events: TickEvents,
+                                        use_velocities: bool,
+                                        join_tracks: bool,
+                                        grid_accuracy: int = GRID_ACCURACY,
+                                        packed: bool = False) -> np.ndarray:
+    """
+    as get_array_of_notes with sparse == False, translates events of a MIDI file parsed by prepare_tick_events
+    into a dense array of notes, quantised to a given grid accuracy (best if it's a power of 2);
+    join_tracks has to be the same as the one given to prepare_tick_events
+
+    :param tick_events:
+    :param use_velocities:
+    :param join_tracks:
+    :param grid_accuracy:
+    :param packed:
+    :return:
+    """
+    if packed and use_velocities:
+        raise ValueError('only boolean outputs (use_velocities == False) can be packed')
+
+    accuracy, length, tempo_map = quantise_tick_events(tick_events, grid_accuracy)
+    event_sequences = get_event_sequences_from_arrays(tick_events.tracks, accuracy, tempo_map, use_velocities)
+    with record_stage('normalise'):
+        for sequence in event_sequences:
+            sequence.normalise(128)
+
+    return get_dense_array_of_notes(event_sequences, length, use_velocities, join_tracks, packed)
+
+
+@instrumented_file('filepath')
+def get_arrays_of_notes(filepath: MidiSource,
+                        use_velocities: bool,
+                        join_tracks: bool,
+                        grid_accuracies: Iterable[int],
+                        packed: bool = False,
+                        cache: Union[DecodeCache, None] = None) -> dict[int, np.ndarray]:
+    """
+    translates a MIDI file into arrays of notes for multiple grid accuracies, parsing it only once:
+    returns {grid accuracy: array}, each array as returned by get_array_of_notes with GRID_ACCURACY == grid accuracy;
+    with a given DecodeCache, both the parsed events and the arrays are stored for the file content and reused,
+    arrays under the same keys as the ones of get_array_of_notes
+
+    :param filepath:
+    :param use_velocities:
+    :param join_tracks:
+    :param grid_accuracies:
+    :param packed:
+    :param cache:
+    :return:
+    """
+    if cache is not None:
+        filepath = get_source_bytes(filepath)
+
+    arrays = dict[int, np.ndarray]()
+    tick_events: Union[TickEvents, None] = None
+    for grid_accuracy in grid_accuracies:
+        key = ''
+        if cache is not None:
+            key = cache.get_key(cast(bytes, filepath), 'get_array_of_notes', use_velocities, join_tracks, False,
+                                packed, grid_accuracy)
+            cached_array = cache.load(key)
+            if isinstance(cached_array, np.ndarray):
+                arrays[grid_accuracy] = cached_array
+                continue
+
+        if tick_events is None:
+            tick_events = prepare_tick_events(filepath, join_tracks, cache=cache)
+        arrays[grid_accuracy] = get_array_of_notes_from_tick_events(tick_events, use_velocities, join_tracks,
+                                                                    grid_accuracy, packed)
+        if cache is not None:
+            cache.store(key, arrays[grid_accuracy])
+
+    return arrays
+
+
+def fill_window_of_notes(output_array: np.ndarray,
+                         sequence: EventSequence,
+                         ends: np.ndarray,
+                         begin: int,
+                         packed: bool) -> None:
+    """
+    writes notes of Events overlapping time units [begin, begin + len(output_array)) into an array of the window,
+    as fill_array_of_notes does for the whole file; only the overlapping Events are read
+
+    :param output_array:
+    :param sequence:
+    :param ends: ends of Events, offsets + lengths
+    :param begin:
+    :param packed:
+    :return:
+    """
+    end = begin + len(output_array)
+    first = int(np.searchsorted(ends, begin, side='right'))
+    last = max(int(np.searchsorted(sequence.offsets, end, side='left')), first)
+
+    if sequence.use_velocities:
+        notes = sequence.get_velocities(slice(first, last))
+    else:
+        notes = pack_roll(sequence.active[first:last]) if packed else sequence.active[first:last]
+
+    # intervals of Events are cut to the window
+    offsets = np.maximum(sequence.offsets[first:last], begin)
+    lengths = np.maximum(np.minimum(ends[first:last], end) - offsets, 0)
+    fill_array_of_notes(output_array, offsets - begin, lengths, notes)
+
+
+def get_events_from_track(track: MidiTrack) -> np.ndarray:
+    """
+    translates a MidiTrack cleaned by combine_and_clean_tracks into an array of note events,
+    as combine_and_clean_events returns them
 
+    :param track:
+    :return:
+    """
+    events = np.zeros(len(track), dtype=EVENT_DTYPE)
+    events['abs_tick'] = np.cumsum(np.fromiter((msg.time for msg in track), dtype=np.int64, count=len(track)))
+    events['type'] = [EVENT_NOTE_ON if msg.type == 'note_on' else EVENT_NOTE_OFF for msg in track]
+    events['channel'] = [msg.channel for msg in track]
+    events['note'] = [msg.note for msg in track]
+    events['velocity'] = [msg.velocity for msg in track]
+    return events
+
+
+def get_window_tracks(filepath: MidiSource,
+                      join_tracks: bool,
+                      backend: str = DEFAULT_BACKEND,
+                      track_length_threshold: int = TRACK_LENGTH_THRESHOLD) -> list[WindowTrack]:
+    """
+    prepares tracks of a MIDI file left after cleaning, trimming and optional joining to be cut into windows;
+    with the 'numpy' backend and join_tracks == False, the file is only checked whole (see scan_events),
+    then each track is read in parts as windows need them; joined tracks are parsed whole, as repetitions
+    of notes are removed across all tracks in their order, and so are files opened with mido
+
+    :param filepath:
+    :param join_tracks:
+    :param backend:
+    :param track_length_threshold:
+    :return:
+    """
+    if backend == 'mido':
+        file, _, accuracy, _, _, _ = prepare_file_with_offsets(filepath, join_tracks, track_length_threshold)
+        return [WindowTrack(get_events_from_track(track), None, accuracy) for track in file.tracks[1:]]
+    if join_tracks:
+        tick_events = prepare_tick_events(filepath, join_tracks, track_length_threshold)
+        return [WindowTrack(track, None, tick_events.get_accuracy()) for track in tick_events.tracks]
+
+    file, readers, accuracy = scan_events(filepath)
+    # tracks without 'note_on' events, after velocity == 0 marks 'note_off' (see combine_and_clean_events), are empty
+    track_readers = [TrackEventsReader(reader.rewound(), reader.note_off_found) for reader in readers[1:]
+                     if reader.count > track_length_threshold and
+                     (reader.first_note_on is not None or reader.zero_velocity_found and reader.note_off_found)]
+    if len(track_readers) == 0:
+        raise ValueError('empty file - no note messages found')
+
+    first_events = list[np.ndarray]()
+    for track_reader in track_readers:
+        events = np.zeros(0, dtype=EVENT_DTYPE)
+        tick_limit = float(file.ticks_per_beat)
+        while len(events) == 0 and not track_reader.finished:
+            events = track_reader.read(tick_limit)
+            tick_limit = 2 * max(tick_limit, track_reader.reader.ticks) + 1
+        first_events.append(events)
+
+    # remove notes' beginning offset
+    min_time = min(int(events['abs_tick'][0]) for events in first_events)
+    return [WindowTrack(events, track_reader, accuracy, min_time)
+            for events, track_reader in zip(first_events, track_readers)]
+
+
+def iterate_windows_of_notes(filepath: MidiSource,
+                             use_velocities: bool,
+                             join_tracks: bool,
+                             window_length: int,
+                             step: Union[int, None] = None,
+                             backend: str = DEFAULT_BACKEND,
+                             packed: bool = False,
+                             drop_incomplete: bool = False) -> Iterator[np.ndarray]:
+    """
+    translates a MIDI file into consecutive windows of the array returned by get_array_of_notes, yielding them
+    one by one: a window starting at time unit t holds get_array_of_notes(...)[..., t:t + window_length, :],
+    with zeros past the end of the file; windows start every step time units (by default, step == window_length)
+    and overlap if step < window_length; with drop_incomplete == True, windows crossing the end are skipped;
+    neither Events nor the array of the whole file are created, windows are filled from note events and states
+    of notes carried over from the previous window; with the 'numpy' backend and join_tracks == False, the file
+    is checked whole first, then tracks are read in parts as windows need them, so that besides the bytes
+    of the file, memory depends on the window length, not on the length of the file; otherwise, note events
+    of the whole file are kept (see get_window_tracks), and with mido, the whole file is parsed into Messages
+
+    :param filepath:
+    :param use_velocities:
+    :param join_tracks:
+    :param window_length:
+    :param step:
+    :param backend:
+    :param packed:
+    :param drop_incomplete:
+    :return:
+    """
+    check_backend(backend)
+    step = window_length if step is None else step
+    if window_length <= 0 or step <= 0:
+        raise ValueError('window length and step must be positive')
+    if packed and use_velocities:
+        raise ValueError('only boolean outputs (use_velocities == False) can be packed')
+
+    tracks = get_window_tracks(filepath, join_tracks, backend)
+
+    window_size: Union[Tuple[int, int], Tuple[int, int, int]]
+    notes_size = PACKED_NOTES if packed else 128
     if join_tracks:
-        array_size = (length, 128)
+        window_size = (window_length, notes_size)
     else:
-        array_size = (len(file.tracks) - 1, length, 128)
+        window_size = (len(tracks), window_length, notes_size)
+
+    dtype = np.dtype(np.float_ if use_velocities else np.uint8 if packed else np.bool_)
+    begin = 0
+    while True:
+        for track in tracks:
+            track.read_until(begin + window_length, window_length)
+
+        # until all tracks are read, one of them has an Event beginning after the window, so the file is longer
+        if all(track.finished for track in tracks):
+            length = max(track.last_offset for track in tracks)
+            if begin > (length - window_length if drop_incomplete else length - 1):
+                return
+
+        window = np.zeros(window_size, dtype=dtype)
+        for track_index, track in enumerate(tracks):
+            track.fill_window(window if join_tracks else window[track_index], begin, use_velocities, packed)
+        yield window
+        begin += step
+
+
+def get_event_sequences_until(tick_events: TickEvents,
+                              use_velocities: bool,
+                              end: int,
+                              grid_accuracy: int = GRID_ACCURACY) -> Union[list[EventSequence], None]:
+    """
+    translates TickEvents into EventSequences normalised to 128, with Events beginning before time unit end only:
+    the last Event of a track with later Events lasts until end, so notes cover time units before end as they do
+    with all Events; returns None if a truncated track (see prepare_tick_events) has no Events after end,
+    as lengths of its Events are unknown without the rest of the track
 
-    if use_velocities:
-        output_array = np.zeros(array_size, dtype=np.float_)
+    :param tick_events:
+    :param use_velocities:
+    :param end:
+    :param grid_accuracy:
+    :return:
+    """
+    accuracy = tick_events.get_accuracy(grid_accuracy)
+    tracks = list[np.ndarray]()
+    cut = list[bool]()
+
+    for track, truncated in zip(tick_events.tracks, tick_events.truncated.tolist()):
+        events = int(np.searchsorted(get_grid_offsets(track['abs_tick'], accuracy), end, side='left'))
+        later_events = bool(get_event_creating_messages(track)[events:].any())
+        if truncated and not later_events:
+            return None
+        tracks.append(track[:events])
+        cut.append(later_events)
+
+    tempo_map = get_tempo_map_from_events(tick_events.tempo_events, end, accuracy, tick_events.initial_ticks)
+    event_sequences = get_event_sequences_from_arrays(tracks, accuracy, tempo_map, use_velocities)
+
+    with record_stage('normalise'):
+        for sequence, track_cut in zip(event_sequences, cut):
+            sequence.normalise(128)
+            if track_cut:
+                sequence.lengths[-1] = end - sequence.offsets[-1]
+
+    return event_sequences
+
+
+@instrumented_file('filepath')
+def get_range_of_notes(filepath: MidiSource,
+                       use_velocities: bool,
+                       join_tracks: bool,
+                       start: int,
+                       end: int,
+                       backend: str = DEFAULT_BACKEND,
+                       packed: bool = False) -> np.ndarray:
+    """
+    translates time units [start, end) of a MIDI file into an array of notes, equal to the part of the array
+    returned by get_array_of_notes, with zeros past the end of the file, so that it always has end - start
+    time units; only the part is allocated, notes active at start and tempos before it are taken into account;
+    with the 'numpy' backend, Events after end are skipped and, with join_tracks == False, tracks are parsed
+    only as far as needed
+
+    :param filepath:
+    :param use_velocities:
+    :param join_tracks:
+    :param start:
+    :param end:
+    :param backend:
+    :param packed:
+    :return:
+    """
+    check_backend(backend)
+    if not 0 <= start <= end:
+        raise ValueError('range of time units must satisfy 0 <= start <= end')
+    if packed and use_velocities:
+        raise ValueError('only boolean outputs (use_velocities == False) can be packed')
+
+    event_sequences: Union[list[EventSequence], None]
+    if backend == 'numpy':
+        filepath = load_source(filepath)  # may be parsed again
+        event_sequences = get_event_sequences_until(prepare_tick_events(filepath, join_tracks, end=end),
+                                                    use_velocities, end)
+        if event_sequences is None:
+            event_sequences = get_event_sequences_until(prepare_tick_events(filepath, join_tracks),
+                                                        use_velocities, end)
     else:
-        output_array = np.zeros(array_size, dtype=np.bool_)
+        _, _, _, _, event_sequences = initialise_event_sequences_with_backend(filepath, use_velocities, join_tracks,
+                                                                              backend)
+    event_sequences = cast(list[EventSequence], event_sequences)
 
+    array_size: Union[Tuple[int, int], Tuple[int, int, int]]
+    notes_size = PACKED_NOTES if packed else 128
     if join_tracks:
-        for ev_index in range(len(initial_sequences[0])):
-            for time in range(initial_sequences[0][ev_index].offset,
-                              initial_sequences[0][ev_index].offset +
-                              initial_sequences[0][ev_index].length):
-                output_array[time] = initial_sequences[0][ev_index].all_notes
-
+        array_size = (end - start, notes_size)
     else:
-        for seq_index in range(len(initial_sequences)):
-            for ev_index in range(len(initial_sequences[seq_index])):
-                for time in range(initial_sequences[seq_index][ev_index].offset,
-                                  initial_sequences[seq_index][ev_index].offset +
-                                  initial_sequences[seq_index][ev_index].length):
-                    output_array[seq_index][time] = initial_sequences[seq_index][ev_index].all_notes
+        array_size = (len(event_sequences), end - start, notes_size)
+
+    output_array = np.zeros(array_size, dtype=np.float_ if use_velocities else np.uint8 if packed else np.bool_)
+    for seq_index, sequence in enumerate(event_sequences):
+        ends = sequence.offsets + np.maximum(sequence.lengths, 0)
+        fill_window_of_notes(output_array if join_tracks else output_array[seq_index], sequence, ends, start, packed)
 
     return output_array
 
@@ -1,42 +1,143 @@
-import copy
+import io
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import *
 
 import numpy as np
 from mido import MidiFile, MidiTrack
 from mido.messages import Message
+from mido.messages.checks import check_channel, check_data_byte
 from mido.midifiles.meta import MetaMessage
+try:
+    from roll import SparseRoll
+    from tempo import TempoMap, get_accumulated_time
+    from instrument import instrumented, instrumented_file, record_stage
+    from smf import META_END_OF_TRACK, META_SET_TEMPO, META_TIME_SIGNATURE, write_channel_messages, \
+        write_meta_message, write_smf
+except ImportError:
+    from .roll import SparseRoll
+    from .tempo import TempoMap, get_accumulated_time
+    from .instrument import instrumented, instrumented_file, record_stage
+    from .smf import META_END_OF_TRACK, META_SET_TEMPO, META_TIME_SIGNATURE, write_channel_messages, \
+        write_meta_message, write_smf
 
 DEFAULT_VELOCITY = 64
 TICKS_PER_BEAT = 240
 GRID_ACCURACY = 64
+ENCODE_BACKENDS = ['mido', 'numpy']  # 'numpy' writes bytes of files directly, without mido Messages
+DEFAULT_ENCODE_BACKEND = 'numpy'
 
 
-def get_tempo_meta_messages(array: list[int],
-                            accuracy: float) -> MidiTrack:
+def get_midi_velocities(values: Union[np.ndarray, list[float]]) -> np.ndarray:
+    """
+    scales velocities of notes from [0, 1] to [0, 128], limited to the highest MIDI velocity 127
+
+    :param values:
+    :return:
+    """
+    return np.minimum(127, np.rint(np.asarray(values, dtype=np.float_) * 128)).astype(np.int64)
+
+
+def get_encode_accuracy(grid_accuracy: int,
+                        ticks_per_beat: int = TICKS_PER_BEAT) -> float:
     """
-    translates a provided tempo array into a MetaMessage track
+    returns the amount of MIDI ticks in a grid time unit of encoded files, equal to ticks_per_measure / grid_accuracy
+
+    :param grid_accuracy:
+    :param ticks_per_beat:
+    :return:
+    """
+    return float(4 * ticks_per_beat / grid_accuracy)
+
+
+def get_tempo_changes(array: Union[list[int], TempoMap],
+                      accuracy: float) -> Tuple[list[Tuple[int, int]], int]:
+    """
+    translates a provided tempo array (or a TempoMap) into delta times (in MIDI ticks) and values of tempo changes,
+    returns them with the delta time of the end of the track
 
     :param array:
     :param accuracy:
     :return:
     """
-    events = [MetaMessage('time_signature', numerator=4, denominator=4, clocks_per_click=24,
-                          notated_32nd_notes_per_beat=8, time=0)]
+    tempo_map = array if isinstance(array, TempoMap) else TempoMap.from_array(array)
+    changes = list[Tuple[int, int]]()
 
+    # time is accumulated unit by unit only between tempo changes, the rest is carried to the following message
     time = float(0)
+    last_offset = 0
     last_tempo = 0
-    for i in range(len(array)):
-        if array[i] != last_tempo:
-            events.append(MetaMessage('set_tempo', tempo=array[i], time=round(time)))
-            last_tempo = array[i]
+    for offset, tempo in zip(tempo_map.offsets.tolist(), tempo_map.tempos.tolist()):
+        if tempo != last_tempo:
+            time = get_accumulated_time(time, accuracy, offset - last_offset)
+            changes.append((round(time), tempo))
             time -= float(round(time))
-        time += accuracy
-    events.append(MetaMessage('end_of_track', time=round(time)))
+            last_offset = offset
+            last_tempo = tempo
+    time = get_accumulated_time(time, accuracy, tempo_map.length - last_offset)
+
+    return changes, round(time)
+
+
+def get_tempo_meta_messages(array: Union[list[int], TempoMap],
+                            accuracy: float) -> MidiTrack:
+    """
+    translates a provided tempo array (or a TempoMap) into a MetaMessage track
+
+    :param array:
+    :param accuracy:
+    :return:
+    """
+    events = [MetaMessage('time_signature', numerator=4, denominator=4, clocks_per_click=24,
+                          notated_32nd_notes_per_beat=8, time=0)]
+    changes, end_time = get_tempo_changes(array, accuracy)
+    for time, tempo in changes:
+        events.append(MetaMessage('set_tempo', tempo=tempo, time=time))
+    events.append(MetaMessage('end_of_track', time=end_time))
 
     return MidiTrack(events)
 
 
+def get_tempo_track_bytes(array: Union[list[int], TempoMap],
+                          accuracy: float) -> bytes:
+    """
+    as get_tempo_meta_messages, translates a provided tempo array (or a TempoMap) into contents of a MIDI track
+
+    :param array:
+    :param accuracy:
+    :return:
+    """
+    track = [write_meta_message(0, META_TIME_SIGNATURE, bytes((4, 2, 24, 8)))]
+    changes, end_time = get_tempo_changes(array, accuracy)
+    for time, tempo in changes:
+        if not 0 <= tempo <= 0xffffff:
+            raise ValueError('tempo must be in range 0..16777215')
+        track.append(write_meta_message(time, META_SET_TEMPO, tempo.to_bytes(3, 'big')))
+    track.append(write_meta_message(end_time, META_END_OF_TRACK, b''))
+
+    return b''.join(track)
+
+
+def get_tempo_map_from_tempos(tempos: Union[list[int], np.ndarray],
+                              event_lengths: Union[list[int], None] = None) -> TempoMap:
+    """
+    translates tempos given for each time unit, or for each event if event lengths are provided, into a TempoMap
+
+    :param tempos:
+    :param event_lengths:
+    :return:
+    """
+    if event_lengths is None:
+        return TempoMap.from_array(tempos)
+
+    if len(tempos) != len(event_lengths):
+        print(Warning('input tempo and event length arrays are of different length - '
+                      'rewriting of the tempo array skipped'))
+        return TempoMap.from_array(tempos)
+
+    return TempoMap.from_event_lengths(tempos, event_lengths)
+
+
 def get_tempo_array_from_tempo_sequences(input_tempos: list[int],
                                          event_lengths: list[int]) -> list[int]:
     """
@@ -58,31 +159,37 @@ def get_tempo_array_from_tempo_sequences(input_tempos: list[int],
     return tempos
 
 
-def get_sequences_from_array(array: np.ndarray) -> Tuple[list[Union[list[bool], list[float]]], list[int]]:
+def get_event_boundaries(array: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
     """
-    translates a time distributed single-track array into a list of events
+    finds changes between consecutive rows (time units) of a time distributed single-track array,
+    returns first rows of events of equal rows and lengths of the events
 
     :param array:
     :return:
     """
-    events = list[Union[list[bool], list[float]]]()
-    event_lengths = list[int]()
+    if len(array) == 0:
+        raise IndexError('input array must have at least one time unit')
 
-    current_notes = array[0]
-    current_length = 0
-    for value in array:
-        if not np.array_equal(current_notes, value):
-            events.append(current_notes.tolist())
-            event_lengths.append(current_length)
-            current_notes = value
-            current_length = 0
-        current_length += 1
-    events.append(current_notes.tolist())
-    event_lengths.append(current_length)
+    changed = np.ones(len(array), dtype=np.bool_)
+    changed[1:] = np.any(array[1:] != array[:-1], axis=tuple(range(1, array.ndim)))
+    starts = np.flatnonzero(changed)
+
+    return starts, np.diff(starts, append=len(array))
+
+
+@instrumented
+def get_sequences_from_array(array: np.ndarray) -> Tuple[list[Union[list[bool], list[float]]], list[int]]:
+    """
+    translates a time distributed single-track array into a list of events
 
-    return events, event_lengths
+    :param array:
+    :return:
+    """
+    starts, lengths = get_event_boundaries(array)
+    return array[starts].tolist(), lengths.tolist()
 
 
+@instrumented
 def get_tuples_from_sequences(input_events: list[Union[list[bool], list[float]]]) -> list[list[Tuple[int, int]]]:
     """
     translates a list of events into a list of tuples of active notes
@@ -90,17 +197,137 @@ def get_tuples_from_sequences(input_events: list[Union[list[bool], list[float]]]
     :param input_events:
     :return:
     """
+    if len(input_events) == 0:
+        return list[list[Tuple[int, int]]]()
+
+    events, _ = get_tuples_from_array(np.asarray(input_events), False)
+    return events
+
+
+def get_sparse_event_starts(roll: SparseRoll,
+                            join_rows: bool) -> np.ndarray:
+    """
+    returns first rows of events of a two-dimensional SparseRoll; with join_rows, equal consecutive rows
+    (time units) are joined into a single event, as in get_event_boundaries, otherwise each row is a separate event
+
+    :param roll:
+    :param join_rows:
+    :return:
+    """
+    row_lengths = np.diff(roll.indptr)
+    rows = len(row_lengths)
+
+    if not join_rows:
+        return np.arange(rows)
+
+    # rows of equal lengths are compared element by element with the previous ones
+    same_length = np.zeros(rows, dtype=np.bool_)
+    same_length[1:] = row_lengths[1:] == row_lengths[:-1]
+    element_rows = np.repeat(np.arange(rows), row_lengths)
+    compared = np.flatnonzero(same_length[element_rows])
+    previous = compared - row_lengths[element_rows[compared]]
+    mismatch = (roll.indices[compared] != roll.indices[previous]) | (roll.data[compared] != roll.data[previous])
+
+    changed = ~same_length
+    changed[element_rows[compared[mismatch]]] = True
+    return np.flatnonzero(changed)
+
+
+@instrumented
+def get_tuples_from_sparse_roll(roll: SparseRoll,
+                                join_rows: bool) -> Tuple[list[list[Tuple[int, int]]], list[int]]:
+    """
+    translates a two-dimensional SparseRoll into a list of tuples of active notes, as get_tuples_from_sequences,
+    and a list of event lengths; with join_rows, equal consecutive rows (time units) are joined into a single
+    event, as in get_sequences_from_array, otherwise each row is a separate event of length 1
+
+    :param roll:
+    :param join_rows:
+    :return:
+    """
+    starts = get_sparse_event_starts(roll, join_rows)
+    events = get_tuples_from_notes(roll.indptr[starts], roll.indptr[starts + 1], roll.indices, roll.data)
+    return events, np.diff(starts, append=len(roll.indptr) - 1).tolist()
+
+
+@instrumented
+def get_arrays_from_sparse_roll(roll: SparseRoll,
+                                join_rows: bool) -> Tuple[np.ndarray, np.ndarray, list[int]]:
+    """
+    translates a two-dimensional SparseRoll into matrices of active notes and their velocities of size
+    'events' x 128 (see get_messages_from_arrays) and a list of event lengths, as get_tuples_from_sparse_roll;
+    as with tuples, a stored note is active regardless of its value
+
+    :param roll:
+    :param join_rows:
+    :return:
+    """
+    starts = get_sparse_event_starts(roll, join_rows)
+    row_lengths = np.diff(roll.indptr)
+
+    is_start = np.zeros(len(row_lengths), dtype=np.bool_)
+    is_start[starts] = True
+    element_rows = np.repeat(np.arange(len(row_lengths)), row_lengths)
+    selected = np.flatnonzero(is_start[element_rows])
+    event_indices = (np.cumsum(is_start) - 1)[element_rows[selected]]
+
+    active = np.zeros((len(starts), 128), dtype=np.bool_)
+    active[event_indices, roll.indices[selected]] = True
+    velocities = np.zeros((len(starts), 128), dtype=np.int64)
+    velocities[event_indices, roll.indices[selected]] = get_midi_velocities(roll.data[selected])
+
+    return active, velocities, np.diff(starts, append=len(row_lengths)).tolist()
+
+
+@instrumented
+def get_tuples_from_array(array: np.ndarray,
+                          join_rows: bool) -> Tuple[list[list[Tuple[int, int]]], list[int]]:
+    """
+    translates a time distributed single-track array into a list of tuples of active notes, as
+    get_tuples_from_sequences, and a list of event lengths; with join_rows, equal consecutive rows (time units)
+    are joined into a single event, as in get_sequences_from_array, otherwise each row is a separate event
+    of length 1
+
+    :param array:
+    :param join_rows:
+    :return:
+    """
+    if join_rows:
+        starts, lengths = get_event_boundaries(array)
+    else:
+        starts, lengths = np.arange(len(array)), np.ones(len(array), dtype=np.int64)
+
+    event_indices, heights = np.nonzero(array[starts])
+    bounds = np.searchsorted(event_indices, np.arange(len(starts) + 1))
+    events = get_tuples_from_notes(bounds[:-1], bounds[1:], heights, array[starts[event_indices], heights])
+
+    return events, lengths.tolist()
+
+
+def get_tuples_from_notes(begins: np.ndarray,
+                          ends: np.ndarray,
+                          heights: np.ndarray,
+                          values: np.ndarray) -> list[list[Tuple[int, int]]]:
+    """
+    translates active notes of events, given as ranges [begin, end) of arrays of their heights and values,
+    into a list of tuples of active notes, as get_tuples_from_sequences
+
+    :param begins:
+    :param ends:
+    :param heights:
+    :param values:
+    :return:
+    """
+    height_list: list[int] = heights.tolist()
+    velocities: list[int] = get_midi_velocities(values).tolist()
     events = list[list[Tuple[int, int]]]()
-    for event in input_events:
-        notes = list[Tuple[int, int]]()
-        for i, value in enumerate(event):
-            if value:  # True or > 0.0
-                notes.append((i, min(127, round(value * 128))))  # velocity scaled from [0, 1] to [0, 128]
-        events.append(notes)
+    for begin, end in zip(begins.tolist(), ends.tolist()):
+        events.append(list(zip(height_list[begin:end], velocities[begin:end])))
 
     return events
 
 
+@instrumented
 def get_messages_from_tuples(track: list[list[Tuple[int, int]]],
                              track_channel: int,
                              event_lengths: list[int],
@@ -125,11 +352,14 @@ def get_messages_from_tuples(track: list[list[Tuple[int, int]]],
 
     messages = list[Union[Message, MetaMessage]]()
     last_event = list[Tuple[int, int]]()
+    last_notes = set[Tuple[int, int]]()
     time = 0
     for i, current_event in enumerate(track):
         if join_notes:
-            subtract = [elem for elem in last_event if elem not in current_event]
-            add = [elem for elem in current_event if elem not in last_event]
+            current_notes = set(current_event)
+            subtract = [elem for elem in last_event if elem not in current_notes]
+            add = [elem for elem in current_event if elem not in last_notes]
+            last_notes = current_notes
         else:
             subtract = last_event
             add = current_event
@@ -156,6 +386,166 @@ def get_messages_from_tuples(track: list[list[Tuple[int, int]]],
     return MidiTrack(messages)
 
 
+def get_note_changes(active: np.ndarray,
+                     velocities: np.ndarray,
+                     join_notes: bool) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    computes notes ended and begun by each event of a single track at once, from matrices of active notes
+    and their velocities of size 'events' x 128; returns masks of size 'events + 1' x 128, the last row ending
+    notes active after the last event; with join_notes, a note active in consecutive events with the same
+    velocity is not ended (as with tuples in get_messages_from_tuples)
+
+    :param active:
+    :param velocities:
+    :param join_notes:
+    :return:
+    """
+    previous = np.zeros((len(active) + 1, 128), dtype=np.bool_)
+    previous[1:] = active
+    current = np.zeros_like(previous)
+    current[:-1] = active
+
+    if not join_notes:
+        return previous, current
+
+    previous_velocities = np.zeros(previous.shape, dtype=velocities.dtype)
+    previous_velocities[1:] = velocities
+    current_velocities = np.zeros_like(previous_velocities)
+    current_velocities[:-1] = velocities
+    changed = (previous ^ current) | (previous & current & (previous_velocities != current_velocities))
+
+    return previous & changed, current & changed
+
+
+def get_note_events(active: np.ndarray,
+                    velocities: np.ndarray,
+                    track_channel: int,
+                    event_lengths: Union[list[int], np.ndarray],
+                    accuracy: float,
+                    join_notes: bool,
+                    use_default_velocity: bool,
+                    default_velocity: int = DEFAULT_VELOCITY) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    finds 'note_off' and 'note_on' messages of events given as matrices of active notes and their velocities
+    of size 'events' x 128 at once (see get_note_changes), with messages of each event ordered by note;
+    returns masks of 'note_on' messages, their notes, velocities and delta times (in MIDI ticks)
+
+    :param active:
+    :param velocities:
+    :param track_channel:
+    :param event_lengths:
+    :param accuracy:
+    :param join_notes:
+    :param use_default_velocity:
+    :param default_velocity:
+    :return:
+    """
+    if len(active) != len(event_lengths):
+        raise IndexError('input event length array and data event dimension must be of equal length')
+
+    ended, begun = get_note_changes(active, velocities, join_notes)
+
+    # in each event, 'note_off' messages come before 'note_on' messages
+    event_indices, columns = np.nonzero(np.concatenate((ended, begun), axis=1))
+    notes = columns % 128
+    note_on = columns >= 128
+
+    # only the first message of an event is given time passed since the previous message
+    event_times = np.zeros(len(active) + 1, dtype=np.int64)
+    np.cumsum(event_lengths, out=event_times[1:])
+    first = np.ones(len(event_indices), dtype=np.bool_)
+    first[1:] = event_indices[1:] != event_indices[:-1]
+    passed = np.diff(event_times[event_indices[first]], prepend=0)
+    times = np.zeros(len(event_indices), dtype=np.int64)
+    times[first] = np.rint(passed * accuracy)
+
+    message_velocities = np.zeros(len(event_indices), dtype=np.int64)
+    if use_default_velocity:
+        message_velocities[note_on] = default_velocity
+    else:
+        message_velocities[note_on] = velocities[event_indices[note_on], notes[note_on]]
+
+    # attributes are checked as by Message once for all messages
+    if len(event_indices) > 0:
+        check_channel(track_channel)
+        if use_default_velocity and np.any(note_on):
+            check_data_byte(default_velocity)
+        check_data_byte(int(message_velocities.min()))
+        check_data_byte(int(message_velocities.max()))
+
+    return note_on, notes, message_velocities, times
+
+
+@instrumented
+def get_messages_from_arrays(active: np.ndarray,
+                             velocities: np.ndarray,
+                             track_channel: int,
+                             event_lengths: Union[list[int], np.ndarray],
+                             accuracy: float,
+                             join_notes: bool,
+                             use_default_velocity: bool,
+                             default_velocity: int = DEFAULT_VELOCITY) -> MidiTrack:
+    """
+    as get_messages_from_tuples, translates events given as matrices of active notes and their velocities
+    of size 'events' x 128 into a MidiTrack, with messages of each event ordered by note;
+    'note_off' and 'note_on' messages of all events are found at once (see get_note_events)
+
+    :param active:
+    :param velocities:
+    :param track_channel:
+    :param event_lengths:
+    :param accuracy:
+    :param join_notes:
+    :param use_default_velocity:
+    :param default_velocity:
+    :return:
+    """
+    note_on, notes, velocities, times = get_note_events(active, velocities, track_channel, event_lengths, accuracy,
+                                                        join_notes, use_default_velocity, default_velocity)
+
+    # messages are created without checks, done by get_note_events for all of them at once
+    # (notes are column indices and times are integers, so only channel and velocities can be out of range)
+    messages = list[Union[Message, MetaMessage]]()
+    for is_note_on, note, velocity, time in zip(note_on.tolist(), notes.tolist(), velocities.tolist(),
+                                                 times.tolist()):
+        messages.append(Message('note_on' if is_note_on else 'note_off', skip_checks=True, channel=track_channel,
+                                note=note, velocity=velocity, time=time))
+
+    messages.append(MetaMessage('end_of_track', time=0))
+    return MidiTrack(messages)
+
+
+@instrumented
+def get_track_bytes_from_arrays(active: np.ndarray,
+                                velocities: np.ndarray,
+                                track_channel: int,
+                                event_lengths: Union[list[int], np.ndarray],
+                                accuracy: float,
+                                join_notes: bool,
+                                use_default_velocity: bool,
+                                default_velocity: int = DEFAULT_VELOCITY) -> bytes:
+    """
+    as get_messages_from_arrays, translates events given as matrices of active notes and their velocities
+    of size 'events' x 128 into contents of a MIDI track, written as by mido
+
+    :param active:
+    :param velocities:
+    :param track_channel:
+    :param event_lengths:
+    :param accuracy:
+    :param join_notes:
+    :param use_default_velocity:
+    :param default_velocity:
+    :return:
+    """
+    note_on, notes, velocities, times = get_note_events(active, velocities, track_channel, event_lengths, accuracy,
+                                                        join_notes, use_default_velocity, default_velocity)
+    statuses = np.where(note_on, 0x90, 0x80) | track_channel
+
+    return write_channel_messages(times, statuses, notes, velocities) + \
+        write_meta_message(0, META_END_OF_TRACK, b'')
+
+
 def prepare_meta_file(tempos: list[int],
                       grid_accuracy: int,
                       event_lengths: Union[list[int], None] = None,
@@ -169,18 +559,65 @@ def prepare_meta_file(tempos: list[int],
     :param ticks_per_beat:
     :return:
     """
+    tempo_map = get_tempo_map_from_tempos(tempos, event_lengths)
+    accuracy, midi_file = prepare_meta_file_from_tempo_map(tempo_map, grid_accuracy, ticks_per_beat)
+    return tempo_map.to_list(), accuracy, midi_file
+
+
+@instrumented
+def prepare_meta_file_from_tempo_map(tempo_map: TempoMap,
+                                     grid_accuracy: int,
+                                     ticks_per_beat: int = TICKS_PER_BEAT) -> Tuple[float, MidiFile]:
+    """
+    as prepare_meta_file, generates a MIDI file with MetaMessages tempo track from a TempoMap
+
+    :param tempo_map:
+    :param grid_accuracy:
+    :param ticks_per_beat:
+    :return:
+    """
     midi_file = MidiFile(ticks_per_beat=ticks_per_beat)
-    accuracy = float(4 * ticks_per_beat / grid_accuracy)  # equal to ticks_per_measure / grid_accuracy
-    if event_lengths is not None:
-        new_tempos = get_tempo_array_from_tempo_sequences(copy.deepcopy(tempos), event_lengths)
+    accuracy = get_encode_accuracy(grid_accuracy, ticks_per_beat)
+
+    midi_file.tracks.append(get_tempo_meta_messages(tempo_map, accuracy))
+    return accuracy, midi_file
+
+
+def get_arrays_from_standard_2d_input(data: Union[np.ndarray, SparseRoll],
+                                      use_sequences: bool,
+                                      event_lengths: Union[list[int], None] = None) \
+        -> Tuple[np.ndarray, np.ndarray, list[int]]:
+    """
+    translates a two-dimensional single-track array (or a SparseRoll) into matrices of active notes and their
+    velocities of size 'events' x 128 (see get_messages_from_arrays) and a list of event lengths
+
+    :param data:
+    :param use_sequences:
+    :param event_lengths:
+    :return:
+    """
+    lengths = list[int]()  # type checking consistency
+    if use_sequences:
+        if isinstance(event_lengths, list):
+            lengths = event_lengths
+        else:
+            raise ValueError('no argument \'event_lengths\' for \'use_sequences\' mode provided')
+
+    if isinstance(data, SparseRoll):
+        active, velocities, roll_lengths = get_arrays_from_sparse_roll(data, not use_sequences)
+        return active, velocities, lengths if use_sequences else roll_lengths
+
+    if use_sequences:
+        rows = data
     else:
-        new_tempos = copy.deepcopy(tempos)
+        starts, array_lengths = get_event_boundaries(data)
+        rows, lengths = data[starts], array_lengths.tolist()
 
-    midi_file.tracks.append(get_tempo_meta_messages(new_tempos, accuracy))
-    return new_tempos, accuracy, midi_file
+    return rows != 0, get_midi_velocities(rows), lengths
 
 
-def get_messages_from_standard_2d_input(data: np.ndarray,
+@instrumented
+def get_messages_from_standard_2d_input(data: Union[np.ndarray, SparseRoll],
                                         track_channel: int,
                                         accuracy: float,
                                         join_notes: bool,
@@ -188,7 +625,7 @@ def get_messages_from_standard_2d_input(data: np.ndarray,
                                         use_velocities: bool,
                                         event_lengths: Union[list[int], None] = None) -> MidiTrack:
     """
-    translates a two-dimensional single-track array into a MidiTrack
+    translates a two-dimensional single-track array (or a SparseRoll) into a MidiTrack
 
     :param data:
     :param track_channel:
@@ -199,42 +636,61 @@ def get_messages_from_standard_2d_input(data: np.ndarray,
     :param event_lengths:
     :return:
     """
-    lengths: list[int]
-    if use_sequences:
-        events = data.tolist()
-        if isinstance(event_lengths, list):
-            lengths = event_lengths
-        else:
-            raise ValueError('no argument \'event_lengths\' for \'use_sequences\' mode provided')
-    else:
-        events, lengths = get_sequences_from_array(data)
-
-    events = get_tuples_from_sequences(events)
-    track = get_messages_from_tuples(events, track_channel, lengths, accuracy, join_notes, not use_velocities)
+    if isinstance(data, SparseRoll):
+        lengths: list[int]
+        if use_sequences:
+            if isinstance(event_lengths, list):
+                lengths = event_lengths
+            else:
+                raise ValueError('no argument \'event_lengths\' for \'use_sequences\' mode provided')
+        events, roll_lengths = get_tuples_from_sparse_roll(data, not use_sequences)
+        if not use_sequences:
+            lengths = roll_lengths
+        return get_messages_from_tuples(events, track_channel, lengths, accuracy, join_notes, not use_velocities)
+
+    active, velocities, lengths = get_arrays_from_standard_2d_input(data, use_sequences, event_lengths)
+    return get_messages_from_arrays(active, velocities, track_channel, lengths, accuracy, join_notes,
+                                    not use_velocities)
+
+
+@instrumented
+def get_track_bytes_from_standard_2d_input(data: Union[np.ndarray, SparseRoll],
+                                           track_channel: int,
+                                           accuracy: float,
+                                           join_notes: bool,
+                                           use_sequences: bool,
+                                           use_velocities: bool,
+                                           event_lengths: Union[list[int], None] = None) -> bytes:
+    """
+    as get_messages_from_standard_2d_input, translates a two-dimensional single-track array (or a SparseRoll)
+    into contents of a MIDI track
 
-    return track
+    :param data:
+    :param track_channel:
+    :param accuracy:
+    :param join_notes:
+    :param use_sequences:
+    :param use_velocities:
+    :param event_lengths:
+    :return:
+    """
+    active, velocities, lengths = get_arrays_from_standard_2d_input(data, use_sequences, event_lengths)
+    return get_track_bytes_from_arrays(active, velocities, track_channel, lengths, accuracy, join_notes,
+                                       not use_velocities)
 
 
-def get_file_from_standard_features(data: np.ndarray,
-                                    tempos: Union[int, list[int]],
-                                    output_path: Path | str,
-                                    join_notes: bool,
-                                    use_sequences: bool,
-                                    use_velocities: bool,
-                                    event_lengths: Union[list[int], None] = None,
-                                    grid_accuracy: int = GRID_ACCURACY) -> None:
-    output_path = Path(output_path)
+def get_tempo_map_from_standard_features(data: Union[np.ndarray, SparseRoll],
+                                         tempos: Union[int, list[int]],
+                                         use_sequences: bool,
+                                         event_lengths: Union[list[int], None] = None) -> TempoMap:
     """
-    translates a multi-dimensional array into a MIDI file
+    checks dimensions of a multi-dimensional array (or a SparseRoll) and its tempos,
+    returns a TempoMap of the tempos; a constant tempo is not expanded to a list
 
     :param data:
     :param tempos:
-    :param output_path:
-    :param join_notes:
     :param use_sequences:
-    :param use_velocities:
     :param event_lengths:
-    :param grid_accuracy:
     :return:
     """
     lengths = list[int]()  # type checking consistency
@@ -244,15 +700,16 @@ def get_file_from_standard_features(data: np.ndarray,
         else:
             raise ValueError('no argument \'event_lengths\' for \'use_sequences\' mode provided')
 
-    # tempos' array configuration
+    tempo_array: Union[list[int], np.ndarray]
     if isinstance(tempos, int):
         if data.ndim == 2:
-            tempos = [tempos] * data.shape[0]
+            tempo_array = np.full(data.shape[0], tempos, dtype=np.int64)
         elif data.ndim == 3:
-            tempos = [tempos] * data.shape[1]
+            tempo_array = np.full(data.shape[1], tempos, dtype=np.int64)
         else:
             raise TypeError('input array must have 2 or 3 dimensions')
     else:
+        tempo_array = tempos
         if use_sequences:
             if len(lengths) != len(tempos):
                 raise IndexError('length of tempos and event lengths\' arrays must be equal')
@@ -266,22 +723,415 @@ def get_file_from_standard_features(data: np.ndarray,
             else:
                 raise TypeError('input array must have 2 or 3 dimensions')
 
-    # tracks generation
-    _, accuracy, midi_file = prepare_meta_file(tempos, grid_accuracy, event_lengths)
+    return get_tempo_map_from_tempos(tempo_array, event_lengths)
+
+
+def get_midi_file_from_standard_features(data: Union[np.ndarray, SparseRoll],
+                                         tempos: Union[int, list[int]],
+                                         join_notes: bool,
+                                         use_sequences: bool,
+                                         use_velocities: bool,
+                                         event_lengths: Union[list[int], None] = None,
+                                         grid_accuracy: int = GRID_ACCURACY) -> MidiFile:
+    """
+    translates a multi-dimensional array (or a SparseRoll) into a MidiFile, see get_file_from_standard_features
+
+    :param data:
+    :param tempos:
+    :param join_notes:
+    :param use_sequences:
+    :param use_velocities:
+    :param event_lengths:
+    :param grid_accuracy:
+    :return:
+    """
+    tempo_map = get_tempo_map_from_standard_features(data, tempos, use_sequences, event_lengths)
+    accuracy, midi_file = prepare_meta_file_from_tempo_map(tempo_map, grid_accuracy)
     if data.ndim == 2:
         midi_file.tracks.append(get_messages_from_standard_2d_input(data, 0, accuracy, join_notes,
                                                                     use_sequences, use_velocities, event_lengths))
     elif data.ndim == 3:
         for i in range(data.shape[0]):  # channels are limited to 16 in MIDI 1.0
-            midi_file.tracks.append(get_messages_from_standard_2d_input(data[i], i % 16, accuracy, join_notes,
+            track_data = data.get_track(i) if isinstance(data, SparseRoll) else data[i]
+            midi_file.tracks.append(get_messages_from_standard_2d_input(track_data, i % 16, accuracy, join_notes,
                                                                         use_sequences, use_velocities, event_lengths))
     else:
         raise TypeError('input array must have 2 or 3 dimensions')
 
+    return midi_file
+
+
+def check_encode_backend(backend: str) -> None:
+    """
+    checks if an encode backend is supported: if not, raises a ValueError
+
+    :param backend:
+    :return:
+    """
+    if backend not in ENCODE_BACKENDS:
+        raise ValueError('unknown encode backend "{}", expected one of {}'.format(backend, ENCODE_BACKENDS))
+
+
+@instrumented
+def get_bytes_from_standard_features(data: Union[np.ndarray, SparseRoll],
+                                     tempos: Union[int, list[int]],
+                                     join_notes: bool,
+                                     use_sequences: bool,
+                                     use_velocities: bool,
+                                     event_lengths: Union[list[int], None] = None,
+                                     grid_accuracy: int = GRID_ACCURACY,
+                                     backend: str = DEFAULT_ENCODE_BACKEND) -> bytes:
+    """
+    as get_file_from_standard_features, translates a multi-dimensional array (or a SparseRoll) into
+    a MIDI file, but returns its content, equal to the content of the saved file; the 'numpy' backend writes
+    the content directly, without mido Messages, the 'mido' backend saves a MidiFile into memory
+
+    :param data:
+    :param tempos:
+    :param join_notes:
+    :param use_sequences:
+    :param use_velocities:
+    :param event_lengths:
+    :param grid_accuracy:
+    :param backend:
+    :return:
+    """
+    check_encode_backend(backend)
+    if backend == 'mido':
+        midi_file = get_midi_file_from_standard_features(data, tempos, join_notes, use_sequences, use_velocities,
+                                                         event_lengths, grid_accuracy)
+        buffer = io.BytesIO()
+        with record_stage('save'):
+            midi_file.save(file=buffer)
+        return buffer.getvalue()
+
+    tempo_map = get_tempo_map_from_standard_features(data, tempos, use_sequences, event_lengths)
+    accuracy = get_encode_accuracy(grid_accuracy)
+    tracks = [get_tempo_track_bytes(tempo_map, accuracy)]
+    if data.ndim == 2:
+        tracks.append(get_track_bytes_from_standard_2d_input(data, 0, accuracy, join_notes,
+                                                             use_sequences, use_velocities, event_lengths))
+    elif data.ndim == 3:
+        for i in range(data.shape[0]):  # channels are limited to 16 in MIDI 1.0
+            track_data = data.get_track(i) if isinstance(data, SparseRoll) else data[i]
+            tracks.append(get_track_bytes_from_standard_2d_input(track_data, i % 16, accuracy, join_notes,
+                                                                 use_sequences, use_velocities, event_lengths))
+    else:
+        raise TypeError('input array must have 2 or 3 dimensions')
+
+    with record_stage('save'):
+        return write_smf(1, TICKS_PER_BEAT, tracks)
+
+
+def get_batch_item_bytes(items: list[Tuple[np.ndarray, bytes, Union[list[int], None]]],
+                         accuracy: float,
+                         join_notes: bool,
+                         use_sequences: bool,
+                         use_velocities: bool) -> list[bytes]:
+    """
+    translates two-dimensional single-track arrays, given with contents of their tempo tracks and their event
+    lengths, into contents of MIDI files; used by get_bytes_from_batch, also in worker processes
+
+    :param items:
+    :param accuracy:
+    :param join_notes:
+    :param use_sequences:
+    :param use_velocities:
+    :return:
+    """
+    return [write_smf(1, TICKS_PER_BEAT, [tempo_track, get_track_bytes_from_standard_2d_input(
+        data, 0, accuracy, join_notes, use_sequences, use_velocities, event_lengths)])
+            for data, tempo_track, event_lengths in items]
+
+
+def get_batch_values(values: Any,
+                     size: int) -> list[Any]:
+    """
+    returns tempos or event lengths given to get_bytes_from_batch for each array of a batch,
+    as they are either shared by all arrays or given for each of them
+
+    :param values:
+    :param size: number of arrays
+    :return:
+    """
+    if isinstance(values, np.ndarray):
+        values = values.tolist()
+    if isinstance(values, list) and len(values) > 0 and not isinstance(values[0], (int, np.integer)):
+        return [value.tolist() if isinstance(value, np.ndarray) else value for value in values]
+    return [values] * size
+
+
+@instrumented
+def get_bytes_from_batch(data: np.ndarray,
+                         tempos: Union[int, list[int], list[list[int]], np.ndarray],
+                         join_notes: bool,
+                         use_sequences: bool,
+                         use_velocities: bool,
+                         event_lengths: Union[list[int], list[list[int]], None] = None,
+                         grid_accuracy: int = GRID_ACCURACY,
+                         workers: int = 1) -> list[bytes]:
+    """
+    translates a batch of two-dimensional single-track arrays of size 'N' x 'time units' x 128
+    (e.g. generated samples) into contents of N MIDI files, each equal to the output of
+    get_bytes_from_standard_features given a single array; tempos and event lengths are either shared
+    by all arrays or given for each of them, tempo tracks are checked and written once for each
+    distinct tempos; arrays are encoded in the calling process, or with workers > 1 by a pool of worker
+    processes, which pays off only for large batches, as starting the pool takes longer than encoding
+    a few arrays
+
+    :param data:
+    :param tempos:
+    :param join_notes:
+    :param use_sequences:
+    :param use_velocities:
+    :param event_lengths:
+    :param grid_accuracy:
+    :param workers:
+    :return:
+    """
+    if data.ndim != 3:
+        raise TypeError('input batch must have 3 dimensions')
+
+    item_tempos = get_batch_values(tempos, len(data))
+    item_lengths = get_batch_values(event_lengths, len(data))
+    if len(item_tempos) != len(data) or len(item_lengths) != len(data):
+        raise IndexError('tempos and event lengths must be given either for all or for each of input arrays')
+
+    accuracy = get_encode_accuracy(grid_accuracy)
+    tempo_tracks = dict[Tuple[Any, Any], bytes]()
+    items = list[Tuple[np.ndarray, bytes, Union[list[int], None]]]()
+    for array, array_tempos, array_lengths in zip(data, item_tempos, item_lengths):
+        key = (array_tempos if isinstance(array_tempos, int) else tuple(array_tempos),
+               None if array_lengths is None else tuple(array_lengths))
+        if key not in tempo_tracks:
+            tempo_map = get_tempo_map_from_standard_features(array, array_tempos, use_sequences, array_lengths)
+            tempo_tracks[key] = get_tempo_track_bytes(tempo_map, accuracy)
+        items.append((array, tempo_tracks[key], array_lengths))
+
+    if workers <= 1 or len(items) <= 1:
+        return get_batch_item_bytes(items, accuracy, join_notes, use_sequences, use_velocities)
+
+    # arrays are sent to workers in contiguous parts, one for each worker
+    bounds = np.linspace(0, len(items), min(workers, len(items)) + 1).round().astype(np.int64).tolist()
+    with ProcessPoolExecutor(max_workers=len(bounds) - 1) as executor:
+        futures = [executor.submit(get_batch_item_bytes, items[begin:end], accuracy, join_notes, use_sequences,
+                                   use_velocities) for begin, end in zip(bounds[:-1], bounds[1:])]
+        return [content for future in futures for content in future.result()]
+
+
+class StreamingMidiWriter:
+    """
+    encodes a single-track piece incrementally, event by event or time step by time step, e.g. during
+    autoregressive generation; notes active in the previous event are tracked, so that write_event and write_step
+    return bytes of messages begun by each event as soon as it is written
+
+    as lengths of Standard MIDI File chunks precede their content, returned bytes are the content of the track
+    of notes (delta times and messages, with running status), which is complete after close; get_file then
+    returns the whole file, equal to the output of get_bytes_from_standard_features given all events
+    (with use_sequences) or time steps (without it), e.g.
+
+    writer = StreamingMidiWriter(1000000, False, False)
+    for step in steps:
+        send(writer.write_event(step, 8))
+    send(writer.close())
+    """
+    track_channel: int
+    join_notes: bool
+    use_velocities: bool
+    accuracy: float
+    tempo: int                 # of the following events
+    tempos: list[int]          # of each written event or time step
+    event_lengths: list[int]
+    last_step: Union[np.ndarray, None]  # written by write_step directly before
+    chunks: list[bytes]        # returned so far
+    active: np.ndarray         # notes and their velocities in the last event, as in get_note_changes
+    velocities: np.ndarray
+    passed: int                # time units since the last event with messages
+    status: Union[int, None]   # of the last written message, for running status
+    closed: bool
+
+    def __init__(
+            self,
+            tempo: int,
+            join_notes: bool,
+            use_velocities: bool,
+            track_channel: int = 0,
+            grid_accuracy: int = GRID_ACCURACY
+    ):
+        self.track_channel = track_channel
+        self.join_notes = join_notes
+        self.use_velocities = use_velocities
+        self.accuracy = get_encode_accuracy(grid_accuracy)
+        self.tempo = tempo
+        self.tempos = list[int]()
+        self.event_lengths = list[int]()
+        self.last_step = None
+        self.chunks = list[bytes]()
+        self.active = np.zeros(128, dtype=np.bool_)
+        self.velocities = np.zeros(128, dtype=np.int64)
+        self.passed = 0
+        self.status = None
+        self.closed = False
+
+    def __repr__(self) -> str:
+        return f'StreamingMidiWriter(events={len(self.event_lengths)}, bytes={sum(map(len, self.chunks))}, ' \
+               f'closed={self.closed})'
+
+    def write_messages(self,
+                       ended: np.ndarray,
+                       begun: np.ndarray,
+                       velocities: np.ndarray) -> bytes:
+        """
+        writes 'note_off' messages of ended notes and 'note_on' messages of begun notes at the end of time passed
+        since the last written messages, returns their bytes
+
+        :param ended: mask of 128 notes
+        :param begun: mask of 128 notes
+        :param velocities: of 128 notes
+        :return:
+        """
+        notes = np.concatenate((np.flatnonzero(ended), np.flatnonzero(begun)))
+        if len(notes) == 0:
+            return b''
+
+        note_on = np.arange(len(notes)) >= np.count_nonzero(ended)
+        message_velocities = np.where(note_on, velocities[notes] if self.use_velocities else DEFAULT_VELOCITY, 0)
+        check_channel(self.track_channel)
+        check_data_byte(int(message_velocities.min()))
+        check_data_byte(int(message_velocities.max()))
+
+        times = np.zeros(len(notes), dtype=np.int64)
+        times[0] = np.rint(self.passed * self.accuracy)
+        statuses = np.where(note_on, 0x90, 0x80) | self.track_channel
+        chunk = write_channel_messages(times, statuses, notes, message_velocities, self.status)
+
+        self.passed = 0
+        self.status = int(statuses[-1])
+        self.chunks.append(chunk)
+        return chunk
+
+    def write_event(self,
+                    notes: np.ndarray,
+                    length: int = 1,
+                    tempo: Union[int, None] = None) -> bytes:
+        """
+        writes an event of given length (in time units) with notes given as an array of 128 values
+        (as rows of arrays given to get_file_from_standard_features), returns bytes of messages
+        beginning the event; a tempo changes tempo of this and following events
+
+        :param notes:
+        :param length:
+        :param tempo:
+        :return:
+        """
+        if self.closed:
+            raise ValueError('cannot write events to a closed writer')
+        if np.shape(notes) != (128,):
+            raise IndexError('an event must have exactly 128 notes')
+
+        self.last_step = None
+        if tempo is not None:
+            self.tempo = tempo
+        self.tempos.append(self.tempo)
+        self.event_lengths.append(length)
+
+        active = np.asarray(notes) != 0
+        velocities = get_midi_velocities(np.asarray(notes))
+
+        ended, begun = get_note_changes(np.stack((self.active, active)), np.stack((self.velocities, velocities)),
+                                        self.join_notes)
+        chunk = self.write_messages(ended[1], begun[1], velocities)
+
+        self.active = active
+        self.velocities = velocities
+        self.passed += length
+        return chunk
+
+    def write_step(self,
+                   notes: np.ndarray,
+                   tempo: Union[int, None] = None) -> bytes:
+        """
+        as write_event, writes a time step; as in get_file_from_standard_features without use_sequences,
+        a time step equal to the previous one continues its event
+
+        :param notes:
+        :param tempo:
+        :return:
+        """
+        if self.last_step is None or not np.array_equal(notes, self.last_step):
+            chunk = self.write_event(notes, 1, tempo)
+            self.last_step = np.array(notes)
+            return chunk
+
+        if self.closed:
+            raise ValueError('cannot write events to a closed writer')
+        if tempo is not None:
+            self.tempo = tempo
+        self.tempos.append(self.tempo)
+        self.event_lengths.append(1)
+        self.passed += 1
+        return b''
+
+    def close(self) -> bytes:
+        """
+        ends notes active in the last event and the track, returns the remaining bytes of the track
+
+        :return:
+        """
+        if self.closed:
+            raise ValueError('writer is already closed')
+
+        chunk = self.write_messages(self.active, np.zeros(128, dtype=np.bool_), self.velocities)
+        self.chunks.append(write_meta_message(0, META_END_OF_TRACK, b''))
+        self.closed = True
+        return chunk + self.chunks[-1]
+
+    def get_file(self) -> bytes:
+        """
+        returns the content of the whole MIDI file, with the tempo track, after the writer is closed
+
+        :return:
+        """
+        if not self.closed:
+            raise ValueError('the track of a writer is complete only after it is closed')
+
+        tempo_map = get_tempo_map_from_tempos(self.tempos, self.event_lengths)
+        return write_smf(1, TICKS_PER_BEAT, [get_tempo_track_bytes(tempo_map, self.accuracy),
+                                             b''.join(self.chunks)])
+
+
+@instrumented_file('output_path')
+def get_file_from_standard_features(data: Union[np.ndarray, SparseRoll],
+                                    tempos: Union[int, list[int]],
+                                    output_path: Path | str,
+                                    join_notes: bool,
+                                    use_sequences: bool,
+                                    use_velocities: bool,
+                                    event_lengths: Union[list[int], None] = None,
+                                    grid_accuracy: int = GRID_ACCURACY) -> None:
+    output_path = Path(output_path)
+    """
+    translates a multi-dimensional array into a MIDI file;
+    a SparseRoll (e.g. from get_array_of_notes(..., sparse=True)) can be given instead of a dense array
+
+    :param data:
+    :param tempos:
+    :param output_path:
+    :param join_notes:
+    :param use_sequences:
+    :param use_velocities:
+    :param event_lengths:
+    :param grid_accuracy:
+    :return:
+    """
+    midi_file = get_midi_file_from_standard_features(data, tempos, join_notes, use_sequences, use_velocities,
+                                                     event_lengths, grid_accuracy)
     output_path.parent.mkdir(exist_ok=True, parents=True)
-    midi_file.save(output_path)
+    with record_stage('save'):
+        midi_file.save(output_path)
 
 
+@instrumented_file('output_path')
 def get_file_from_music21_features(data: np.ndarray,
                                    output_path: str,
                                    use_tonal_features: bool,
@@ -0,0 +1,252 @@
+import time
+import inspect
+import functools
+import contextlib
+import tracemalloc
+
+from typing import *
+try:
+    from source import get_source_name
+except ImportError:
+    from .source import get_source_name
+
+Function = TypeVar('Function', bound=Callable[..., Any])
+
+
+class StageRecord:
+    """
+    stores a single call of an instrumented stage
+    """
+    stage: str
+    depth: int        # number of enclosing stages
+    start: float      # in seconds from the beginning of the Instrumentation
+    duration: float   # wall time, in seconds
+    peak: int         # peak of memory allocated during the call over the memory at its beginning, in bytes
+
+    __slots__ = ('stage', 'depth', 'start', 'duration', 'peak')
+
+    def __init__(
+            self,
+            stage: str,
+            depth: int,
+            start: float,
+            duration: float,
+            peak: int
+    ):
+        self.stage = stage
+        self.depth = depth
+        self.start = start
+        self.duration = duration
+        self.peak = peak
+
+    def __repr__(self) -> str:
+        return f'StageRecord({self.stage!r}, depth={self.depth}, start={self.start:.6f}, ' \
+               f'duration={self.duration:.6f}, peak={self.peak})'
+
+
+class FileTrace:
+    """
+    stores calls of stages made while processing a single file, in order of their ends
+    """
+    index: int                  # files are numbered in order of processing
+    name: str                   # a filename without extension, empty for in-memory sources
+    records: list[StageRecord]
+
+    def __init__(
+            self,
+            index: int,
+            name: str
+    ):
+        self.index = index
+        self.name = name
+        self.records = list[StageRecord]()
+
+    def __repr__(self) -> str:
+        return f'FileTrace({self.index}, {self.name!r}, stages={len(self.records)})'
+
+
+class Instrumentation:
+    """
+    records wall time, number of calls and peak of allocated memory (with tracemalloc) of stages of decoding
+    and encoding while it is used as a context manager, e.g.
+
+    with Instrumentation() as instrumentation:
+        get_array_of_notes(path, False, True)
+    print(instrumentation.get_report())
+
+    stages are instrumented functions of midi.decode and midi.encode (see instrumented) and blocks of code
+    in record_stage; stages run within a call of a function decoding or encoding a file are also recorded
+    in a FileTrace of the file; stages run in other processes (e.g. by decode_corpus) are not recorded
+    """
+    trace_memory: bool
+    calls: dict[str, int]
+    times: dict[str, float]      # total wall time of each stage, in seconds
+    peaks: dict[str, int]        # the highest peak of memory of each stage, in bytes
+    traces: list[FileTrace]
+    current_trace: Union[FileTrace, None]
+    memory_stack: list[list[int]]  # memory at the beginning and peak of memory so far of each running stage
+    started_tracing: bool
+    begin: float
+
+    def __init__(
+            self,
+            trace_memory: bool = True
+    ):
+        self.trace_memory = trace_memory
+        self.calls = dict[str, int]()
+        self.times = dict[str, float]()
+        self.peaks = dict[str, int]()
+        self.traces = list[FileTrace]()
+        self.current_trace = None
+        self.memory_stack = list[list[int]]()
+        self.started_tracing = False
+        self.begin = time.perf_counter()
+
+    def __repr__(self) -> str:
+        return f'Instrumentation(stages={len(self.calls)}, files={len(self.traces)})'
+
+    def __enter__(self) -> 'Instrumentation':
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+        active_instrumentations.append(self)
+        return self
+
+    def __exit__(self,
+                 *exception: Any) -> None:
+        active_instrumentations.remove(self)
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    @contextlib.contextmanager
+    def record(self,
+               stage: str,
+               file_name: Union[str, None] = None) -> Iterator[None]:
+        """
+        records a stage run within the context; with file_name given and no file being processed,
+        the stage begins a FileTrace
+
+        :param stage:
+        :param file_name:
+        :return:
+        """
+        begins_trace = file_name is not None and self.current_trace is None
+        if begins_trace:
+            self.current_trace = FileTrace(len(self.traces), cast(str, file_name))
+            self.traces.append(self.current_trace)
+
+        depth = len(self.memory_stack)
+        if self.trace_memory:
+            memory, peak = tracemalloc.get_traced_memory()
+            if self.memory_stack:
+                self.memory_stack[-1][1] = max(self.memory_stack[-1][1], peak)
+            tracemalloc.reset_peak()
+            self.memory_stack.append([memory, memory])
+        else:
+            self.memory_stack.append([0, 0])
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            memory, peak = self.memory_stack.pop()
+            if self.trace_memory:
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+                tracemalloc.reset_peak()
+                if self.memory_stack:
+                    self.memory_stack[-1][1] = max(self.memory_stack[-1][1], peak)
+
+            self.calls[stage] = self.calls.get(stage, 0) + 1
+            self.times[stage] = self.times.get(stage, 0.0) + duration
+            self.peaks[stage] = max(self.peaks.get(stage, 0), peak - memory)
+            if self.current_trace is not None:
+                self.current_trace.records.append(StageRecord(stage, depth, start - self.begin, duration,
+                                                              peak - memory))
+            if begins_trace:
+                self.current_trace = None
+
+    def get_report(self) -> dict[str, dict[str, Union[int, float]]]:
+        """
+        returns the number of calls, total and mean wall time (in seconds) and the highest peak of memory
+        (in bytes) of each recorded stage, ordered by total time
+
+        :return:
+        """
+        return {stage: {'calls': self.calls[stage], 'time': self.times[stage],
+                        'mean_time': self.times[stage] / self.calls[stage], 'peak': self.peaks[stage]}
+                for stage in sorted(self.calls, key=lambda stage: -self.times[stage])}
+
+    def get_traces(self) -> list[dict[str, Any]]:
+        """
+        returns FileTraces as dictionaries of lists, e.g. to be saved as JSON
+
+        :return:
+        """
+        return [{'index': trace.index, 'name': trace.name,
+                 'stages': [record.stage for record in trace.records],
+                 'depths': [record.depth for record in trace.records],
+                 'starts': [record.start for record in trace.records],
+                 'durations': [record.duration for record in trace.records],
+                 'peaks': [record.peak for record in trace.records]} for trace in self.traces]
+
+
+# Instrumentations in use, stages are recorded by the innermost one
+active_instrumentations = list[Instrumentation]()
+
+
+def record_stage(stage: str,
+                 file_name: Union[str, None] = None) -> ContextManager[None]:
+    """
+    returns a context recording a stage by the active Instrumentation (see Instrumentation.record),
+    which does nothing if there is none
+
+    :param stage:
+    :param file_name:
+    :return:
+    """
+    if not active_instrumentations:
+        return contextlib.nullcontext()
+    return active_instrumentations[-1].record(stage, file_name)
+
+
+def instrumented(function: Function) -> Function:
+    """
+    decorates a function, so that its calls are recorded as a stage by the active Instrumentation
+
+    :param function:
+    :return:
+    """
+    @functools.wraps(function)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if not active_instrumentations:
+            return function(*args, **kwargs)
+        with active_instrumentations[-1].record(function.__name__):
+            return function(*args, **kwargs)
+
+    return cast(Function, wrapper)
+
+
+def instrumented_file(parameter: str) -> Callable[[Function], Function]:
+    """
+    as instrumented, but calls of a decorated function process a file given by a parameter,
+    so stages run within them are recorded in a FileTrace of the file (see source.get_source_name)
+
+    :param parameter: name of the parameter, e.g. a MidiSource or an output path
+    :return:
+    """
+    def decorator(function: Function) -> Function:
+        position = list(inspect.signature(function).parameters).index(parameter)
+
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not active_instrumentations:
+                return function(*args, **kwargs)
+            source = args[position] if position < len(args) else kwargs.get(parameter)
+            with active_instrumentations[-1].record(function.__name__, get_source_name(source)):
+                return function(*args, **kwargs)
+
+        return cast(Function, wrapper)
+
+    return decorator
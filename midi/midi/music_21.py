@@ -4,9 +4,9 @@ import numpy as np
 from typing import *
 from music21 import *
 try:
-    from decode import get_sequence_of_notes, export_tempo_array
+    from decode import get_sequence_of_notes, export_tempo_array, load_source, MidiSource
 except ImportError:
-    from .decode import get_sequence_of_notes, export_tempo_array
+    from .decode import get_sequence_of_notes, export_tempo_array, load_source, MidiSource
 
 
 def check_number_of_tracks(array: list[list[Tuple[int, list[int]]]],
@@ -105,7 +105,7 @@ def insert_meta_features(partial_features: list[list[float]],
     return partial_features
 
 
-def preprocess_features(filepath: str,
+def preprocess_features(filepath: MidiSource,
                         check_tracks: bool = False,
                         number_of_tracks: int = 0) -> Tuple[list[list[list[int]]], list[int], list[int]]:
     """
@@ -117,6 +117,7 @@ def preprocess_features(filepath: str,
     :param number_of_tracks:
     :return:
     """
+    filepath = load_source(filepath)  # a stream can be read only once
     file_input = get_sequence_of_notes(filepath, False, False, True)
 
     if check_tracks:
@@ -196,7 +197,7 @@ def get_list_of_midi_features(events: list[list[list[int]]],
     return output_features
 
 
-def get_midi_features(filepath: str,
+def get_midi_features(filepath: MidiSource,
                       check_tracks: bool = False,
                       number_of_tracks: int = 0) -> np.ndarray:
     """
@@ -215,7 +216,7 @@ def get_midi_features(filepath: str,
     return feature_array
 
 
-def get_tonal_features(filepath: str,
+def get_tonal_features(filepath: MidiSource,
                        check_tracks: bool = False,
                        number_of_tracks: int = 0) -> np.ndarray:
     """
@@ -0,0 +1,137 @@
+import numpy as np
+
+from typing import *
+
+PACKED_NOTES = 16  # bytes taken by 128 boolean notes of a single time unit after pack_roll
+
+
+class SparseRoll:
+    """
+    stores a piano roll as a compressed sparse row (CSR) matrix over time: row t lists the notes active at time unit t;
+    with multiple tracks, rows of a track follow the ones of the previous track;
+    used instead of dense arrays, which are mostly zeros, by get_array_of_notes(..., sparse=True)
+    """
+    shape: Union[Tuple[int, int], Tuple[int, int, int]]  # of an equivalent dense array, ending with 128 notes
+    indptr: np.ndarray                                    # of size rows + 1, row t is indices[indptr[t]:indptr[t + 1]]
+    indices: np.ndarray                                   # note heights, ascending within each row
+    data: np.ndarray                                      # non-zero note values, np.bool_ or np.float_
+
+    def __init__(
+            self,
+            shape: Union[Tuple[int, int], Tuple[int, int, int]],
+            indptr: np.ndarray,
+            indices: np.ndarray,
+            data: np.ndarray
+    ):
+        if len(indptr) != int(np.prod(shape[:-1])) + 1 or len(indices) != len(data):
+            raise ValueError('sparse roll arrays do not match its shape')
+
+        self.shape = shape
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+
+    def __repr__(self) -> str:
+        return f'SparseRoll(shape={self.shape}, dtype={self.dtype}, nnz={len(self.data)})'
+
+    @property
+    def ndim(self) -> int:
+        return len(self.shape)
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self.data.dtype
+
+    @property
+    def nbytes(self) -> int:
+        return self.indptr.nbytes + self.indices.nbytes + self.data.nbytes
+
+    def get_track(self,
+                  track: int) -> 'SparseRoll':
+        """
+        returns a two-dimensional roll of a single track, sharing arrays with this one
+
+        :param track:
+        :return:
+        """
+        if self.ndim != 3:
+            raise TypeError('only a three-dimensional roll has tracks')
+
+        length = self.shape[1]
+        begin, end = self.indptr[track * length], self.indptr[(track + 1) * length]
+        return SparseRoll((length, self.shape[-1]), self.indptr[track * length:(track + 1) * length + 1] - begin,
+                          self.indices[begin:end], self.data[begin:end])
+
+    def to_dense(self) -> np.ndarray:
+        """
+        translates the roll into a dense array, as returned by get_array_of_notes(..., sparse=False)
+
+        :return:
+        """
+        output_array = np.zeros((len(self.indptr) - 1, self.shape[-1]), dtype=self.dtype)
+        rows = np.repeat(np.arange(len(self.indptr) - 1), np.diff(self.indptr))
+        output_array[rows, self.indices] = self.data
+        return output_array.reshape(self.shape)
+
+    def get_arrays(self) -> dict[str, np.ndarray]:
+        """
+        returns arrays defining the roll, e.g. to save it with np.savez
+
+        :return:
+        """
+        return {'shape': np.array(self.shape, dtype=np.int64), 'indptr': self.indptr,
+                'indices': self.indices, 'data': self.data}
+
+    @staticmethod
+    def from_arrays(arrays: Mapping[str, np.ndarray]) -> 'SparseRoll':
+        """
+        creates a roll from arrays returned by get_arrays
+
+        :param arrays:
+        :return:
+        """
+        shape = cast(Union[Tuple[int, int], Tuple[int, int, int]], tuple(arrays['shape'].tolist()))
+        return SparseRoll(shape, arrays['indptr'], arrays['indices'], arrays['data'])
+
+
+def get_sparse_roll(array: np.ndarray) -> SparseRoll:
+    """
+    translates a dense two- or three-dimensional array of notes into a SparseRoll
+
+    :param array:
+    :return:
+    """
+    if array.ndim not in (2, 3):
+        raise TypeError('input array must have 2 or 3 dimensions')
+
+    rows = array.reshape(-1, array.shape[-1])
+    row_indices, indices = np.nonzero(rows)
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(row_indices, minlength=len(rows)), out=indptr[1:])
+
+    shape = cast(Union[Tuple[int, int], Tuple[int, int, int]], array.shape)
+    return SparseRoll(shape, indptr, indices.astype(np.uint8), rows[row_indices, indices])
+
+
+def pack_roll(array: np.ndarray) -> np.ndarray:
+    """
+    packs the last axis of a boolean array of notes into bits, so that 128 notes of a time unit take 16 bytes
+
+    :param array:
+    :return:
+    """
+    if array.dtype != np.bool_:
+        raise TypeError('only boolean arrays can be packed')
+    return np.packbits(array, axis=-1)
+
+
+def unpack_roll(packed: np.ndarray,
+                notes: int = 128) -> np.ndarray:
+    """
+    translates an array packed with pack_roll back into a boolean array of notes
+
+    :param packed:
+    :param notes:
+    :return:
+    """
+    return np.unpackbits(packed, axis=-1, count=notes).astype(np.bool_)
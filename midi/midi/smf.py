@@ -0,0 +1,515 @@
+import struct
+import numpy as np
+
+from typing import *
+
+EVENT_NOTE_ON = 1
+EVENT_NOTE_OFF = 2
+EVENT_SET_TEMPO = 3
+
+META_SET_TEMPO = 0x51
+META_TIME_SIGNATURE = 0x58
+META_END_OF_TRACK = 0x2f
+
+EVENT_DTYPE = np.dtype([
+    ('abs_tick', np.int64),  # time from the beginning of a track, in MIDI ticks
+    ('track', np.int32),     # index of a track in the file, including 'Track 0'
+    ('type', np.uint8),      # one of EVENT_NOTE_ON, EVENT_NOTE_OFF and EVENT_SET_TEMPO
+    ('channel', np.uint8),
+    ('note', np.uint8),
+    ('velocity', np.uint8),
+    ('tempo', np.int32),     # only for EVENT_SET_TEMPO, in microseconds per beat
+])
+
+DEFAULT_TEMPO = 500000          # default MIDI tempo
+MAX_MESSAGE_LENGTH = 1000000    # as in mido, longer messages are treated as corrupted
+
+# number of data bytes following a status byte, for all statuses except MetaMessages and sysex
+MESSAGE_DATA_LENGTHS = {
+    **{status: 2 for status in range(0x80, 0xc0)},  # note_off, note_on, polytouch, control_change
+    **{status: 1 for status in range(0xc0, 0xe0)},  # program_change, aftertouch
+    **{status: 2 for status in range(0xe0, 0xf0)},  # pitchwheel
+    0xf1: 1, 0xf2: 2, 0xf3: 1, 0xf6: 0, 0xf8: 0, 0xfa: 0, 0xfb: 0, 0xfc: 0, 0xfe: 0,
+}
+
+
+class SmfFile:
+    """
+    stores a Standard MIDI File parsed directly into a structured array of note and tempo events,
+    used instead of mido.MidiFile by the 'numpy' decode backend
+    """
+    type: int
+    ticks_per_beat: int
+    track_sizes: np.ndarray                       # number of all messages (with MetaMessages) in each track
+    track_ticks: np.ndarray                       # time of the last message in each track, in MIDI ticks
+    notated_32nd_notes_per_beat: Union[int, None]  # from the first 'time_signature' in 'Track 0'
+    events: np.ndarray                            # of EVENT_DTYPE, ordered by track, then by time
+    truncated: np.ndarray                         # tracks which were not read to their end, see read_smf
+
+    def __init__(
+            self,
+            type: int,
+            ticks_per_beat: int,
+            track_sizes: np.ndarray,
+            track_ticks: np.ndarray,
+            notated_32nd_notes_per_beat: Union[int, None],
+            events: np.ndarray,
+            truncated: Union[np.ndarray, None] = None
+    ):
+        self.type = type
+        self.ticks_per_beat = ticks_per_beat
+        self.track_sizes = track_sizes
+        self.track_ticks = track_ticks
+        self.notated_32nd_notes_per_beat = notated_32nd_notes_per_beat
+        self.events = events
+        self.truncated = truncated if truncated is not None else np.zeros(len(track_sizes), dtype=np.bool_)
+
+    def __repr__(self) -> str:
+        return f'SmfFile(type={self.type}, ticks_per_beat={self.ticks_per_beat}, ' \
+               f'tracks={len(self.track_sizes)}, events={len(self.events)})'
+
+    def get_track(self,
+                  track: int) -> np.ndarray:
+        """
+        returns a view of events from a single track
+
+        :param track:
+        :return:
+        """
+        begin, end = np.searchsorted(self.events['track'], [track, track + 1])
+        return self.events[begin:end]
+
+
+def read_variable_int(data: bytes,
+                      position: int) -> Tuple[int, int]:
+    """
+    reads a variable-length quantity, returns its value and the position of the following byte
+
+    :param data:
+    :param position:
+    :return:
+    """
+    value = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value = (value << 7) | (byte & 0x7f)
+        if byte < 0x80:
+            return value, position
+
+
+class SmfTrackReader:
+    """
+    reads messages of a single track of a Standard MIDI File, resuming where the previous call stopped;
+    note and tempo messages are added as rows of EVENT_DTYPE fields to a given list
+    """
+    data: bytes
+    track: int
+    start: int                                    # position of the first message of the track
+    end: int                                      # position of the end of the track chunk
+    position: int
+    ticks: int                                    # time of the last read message, in MIDI ticks
+    count: int                                    # number of read messages
+    last_status: Union[int, None]
+    first_note_on: Union[int, None]               # time of the first 'note_on' with a non-zero velocity
+    note_off_found: bool
+    zero_velocity_found: bool                     # whether a 'note_on' with velocity 0 was read
+    notated_32nd_notes_per_beat: Union[int, None]  # from the first 'time_signature', read only in 'Track 0'
+
+    def __init__(
+            self,
+            data: bytes,
+            track: int,
+            position: int,
+            end: int
+    ) -> None:
+        self.data = data
+        self.track = track
+        self.start = position
+        self.end = end
+        self.position = position
+        self.ticks = 0
+        self.count = 0
+        self.last_status = None
+        self.first_note_on = None
+        self.note_off_found = False
+        self.zero_velocity_found = False
+        self.notated_32nd_notes_per_beat = None
+
+    def __repr__(self) -> str:
+        return f'SmfTrackReader(track={self.track}, position={self.position}, end={self.end}, ' \
+               f'ticks={self.ticks}, count={self.count})'
+
+    @property
+    def finished(self) -> bool:
+        return self.position == self.end
+
+    def copy(self) -> 'SmfTrackReader':
+        """
+        returns a reader in the same state, which can be read independently
+
+        :return:
+        """
+        reader = SmfTrackReader(self.data, self.track, self.position, self.end)
+        vars(reader).update(vars(self))
+        return reader
+
+    def rewound(self) -> 'SmfTrackReader':
+        """
+        returns a new reader of the same track, at its beginning
+
+        :return:
+        """
+        return SmfTrackReader(self.data, self.track, self.start, self.end)
+
+    def read(self,
+             rows: Union[list[Tuple[int, int, int, int, int, int, int]], None],
+             tick_limit: Union[float, None] = None,
+             min_count: int = 0,
+             until_note_on: bool = False,
+             until_note_off: bool = False) -> None:
+        """
+        reads messages until the end of the track; with tick_limit, stops before a message when the last read one
+        is later than the limit and at least min_count messages were read; with until_note_on / until_note_off,
+        stops after the first 'note_on' with a non-zero velocity / after the first 'note_off';
+        follows mido parsing rules, raising an OSError or an EOFError for malformed input
+
+        :param rows: list to which rows of events are added, or None to only check messages
+        :param tick_limit:
+        :param min_count:
+        :param until_note_on:
+        :param until_note_off:
+        :return:
+        """
+        data = self.data
+        size = len(data)
+        track = self.track
+        end = self.end
+        position = self.position
+        ticks = self.ticks
+        count = self.count
+        last_status = self.last_status
+        try:
+            while position != end:  # as in mido, a message crossing the chunk's end runs until EOF
+                if tick_limit is not None and ticks > tick_limit and count >= min_count:
+                    break
+
+                delta, position = read_variable_int(data, position)
+                ticks += delta
+                count += 1
+
+                status = data[position]
+                position += 1
+                if status < 0x80:  # running status, the byte is already the first data byte
+                    if last_status is None:
+                        raise OSError('running status without last_status')
+                    status = last_status
+                    if status not in (0xf0, 0xf7):
+                        position -= 1
+                elif status != 0xff:
+                    last_status = status
+
+                if status == 0xff:
+                    meta_type = data[position]
+                    length, position = read_variable_int(data, position + 1)
+                    if length > MAX_MESSAGE_LENGTH:
+                        raise OSError('message length exceeds maximum length')
+                    if position + length > size:
+                        raise EOFError
+
+                    if meta_type == META_SET_TEMPO:
+                        if length < 3:
+                            raise OSError('set_tempo message too short')
+                        tempo = (data[position] << 16) | (data[position + 1] << 8) | data[position + 2]
+                        if rows is not None:
+                            rows.append((ticks, track, EVENT_SET_TEMPO, 0, 0, 0, tempo))
+                    elif meta_type == META_TIME_SIGNATURE and track == 0 and self.notated_32nd_notes_per_beat is None:
+                        if length < 4:
+                            raise OSError('time_signature message too short')
+                        self.notated_32nd_notes_per_beat = data[position + 3]
+                    position += length
+
+                elif status in (0xf0, 0xf7):
+                    length, position = read_variable_int(data, position)
+                    if length > MAX_MESSAGE_LENGTH:
+                        raise OSError('message length exceeds maximum length')
+                    if position + length > size:
+                        raise EOFError
+                    position += length
+
+                else:
+                    data_length = MESSAGE_DATA_LENGTHS.get(status)
+                    if data_length is None:
+                        raise OSError('undefined status byte 0x{:02x}'.format(status))
+                    if position + data_length > size:
+                        raise EOFError
+                    if any(byte > 127 for byte in data[position:position + data_length]):
+                        raise OSError('data byte must be in range 0..127')
+
+                    kind = status & 0xf0
+                    if kind == 0x90:
+                        if rows is not None:
+                            rows.append((ticks, track, EVENT_NOTE_ON, status & 0x0f,
+                                         data[position], data[position + 1], 0))
+                        if data[position + 1] == 0:
+                            self.zero_velocity_found = True
+                        elif self.first_note_on is None:
+                            self.first_note_on = ticks
+                            if until_note_on:
+                                position += data_length
+                                break
+                    elif kind == 0x80:
+                        if rows is not None:
+                            rows.append((ticks, track, EVENT_NOTE_OFF, status & 0x0f,
+                                         data[position], data[position + 1], 0))
+                        self.note_off_found = True
+                        if until_note_off:
+                            position += data_length
+                            break
+                    position += data_length
+
+        except IndexError:
+            raise EOFError
+        finally:
+            self.position = position
+            self.ticks = ticks
+            self.count = count
+            self.last_status = last_status
+
+
+def read_smf_header(data: bytes) -> Tuple[int, int, int, int]:
+    """
+    reads the header chunk of Standard MIDI File bytes,
+    returns the file type, the number of tracks, ticks per beat and the position of the first track chunk
+
+    :param data:
+    :return:
+    """
+    size = len(data)
+    if size < 8:
+        raise EOFError
+
+    name, length = struct.unpack_from('>4sL', data, 0)
+    if name != b'MThd':
+        raise OSError('MThd not found. Probably not a MIDI file')
+    if length < 6 or size < 14:
+        raise EOFError
+    file_type, number_of_tracks, ticks_per_beat = struct.unpack_from('>hhh', data, 8)
+    return file_type, number_of_tracks, ticks_per_beat, 8 + length
+
+
+def get_track_reader(data: bytes,
+                     track: int,
+                     position: int) -> SmfTrackReader:
+    """
+    reads the header of a track chunk at a given position, returns a reader of its messages
+
+    :param data:
+    :param track:
+    :param position:
+    :return:
+    """
+    if position + 8 > len(data):
+        raise EOFError
+    name, length = struct.unpack_from('>4sL', data, position)
+    if name != b'MTrk':
+        raise OSError('no MTrk header at start of track')
+    return SmfTrackReader(data, track, position + 8, position + 8 + length)
+
+
+def read_smf(data: Union[bytes, bytearray, memoryview],
+             limit_32nd_notes: Union[float, None] = None,
+             min_messages: int = 0) -> SmfFile:
+    """
+    parses Standard MIDI File bytes into an SmfFile without creating mido Messages;
+    follows mido parsing rules, raising an OSError or an EOFError for malformed input;
+    with limit_32nd_notes, each track after 'Track 0' is read only up to its first message later than
+    twice the time of its first 'note_on' with a non-zero velocity plus the limit, in 32nd notes
+    (as notated in 'Track 0', by default 8 in a beat), but no less than min_messages messages;
+    the rest of such a track is skipped without being checked, the track is marked in SmfFile.truncated
+    and its track_sizes / track_ticks describe the messages which were read; a track with 'note_on' messages
+    of velocity 0 and no 'note_off' messages so far is first checked for a later 'note_off' and read whole
+    if it has one, as such a track is cleaned differently
+
+    :param data:
+    :param limit_32nd_notes:
+    :param min_messages:
+    :return:
+    """
+    data = bytes(data)
+    file_type, number_of_tracks, ticks_per_beat, position = read_smf_header(data)
+
+    rows = list[Tuple[int, int, int, int, int, int, int]]()
+    track_sizes = np.zeros(max(number_of_tracks, 0), dtype=np.int64)
+    track_ticks = np.zeros(max(number_of_tracks, 0), dtype=np.int64)
+    truncated = np.zeros(max(number_of_tracks, 0), dtype=np.bool_)
+    notated_32nd_notes_per_beat: Union[int, None] = None
+
+    for track in range(number_of_tracks):
+        reader = get_track_reader(data, track, position)
+        if limit_32nd_notes is None or track == 0:
+            reader.read(rows)
+        else:
+            beat_amount = notated_32nd_notes_per_beat if notated_32nd_notes_per_beat is not None else 8
+            reader.read(rows, until_note_on=True)
+            if reader.first_note_on is not None:
+                reader.read(rows, 2 * reader.first_note_on + limit_32nd_notes * ticks_per_beat / beat_amount,
+                            min_messages)
+
+        if not reader.finished:
+            # with 'note_on' messages only, velocity == 0 marks 'note_off' (see combine_and_clean_events),
+            # so whether the track has any 'note_off' has to be known
+            truncated[track] = True
+            if not reader.note_off_found and reader.zero_velocity_found:
+                skimmed = reader.copy()
+                skimmed.read(None, until_note_off=True)
+                if skimmed.note_off_found:  # the track is read whole after all
+                    reader.read(rows)
+                    truncated[track] = False
+
+        if track == 0:
+            notated_32nd_notes_per_beat = reader.notated_32nd_notes_per_beat
+        track_sizes[track] = reader.count
+        track_ticks[track] = reader.ticks
+        position = reader.end
+
+    events = np.array(rows, dtype=EVENT_DTYPE)
+    return SmfFile(file_type, ticks_per_beat, track_sizes, track_ticks, notated_32nd_notes_per_beat, events,
+                   truncated)
+
+
+def scan_smf(data: Union[bytes, bytearray, memoryview]) -> Tuple[SmfFile, list[SmfTrackReader]]:
+    """
+    checks all messages of Standard MIDI File bytes as read_smf does, but without keeping any events;
+    returns an SmfFile without events and readers of all tracks, read to their ends, so that tracks
+    can then be read again in parts (see SmfTrackReader.rewound) with memory independent of their length
+
+    :param data:
+    :return:
+    """
+    data = bytes(data)
+    file_type, number_of_tracks, ticks_per_beat, position = read_smf_header(data)
+
+    readers = list[SmfTrackReader]()
+    for track in range(number_of_tracks):
+        reader = get_track_reader(data, track, position)
+        reader.read(None)
+        readers.append(reader)
+        position = reader.end
+
+    file = SmfFile(file_type, ticks_per_beat, np.array([reader.count for reader in readers], dtype=np.int64),
+                   np.array([reader.ticks for reader in readers], dtype=np.int64),
+                   readers[0].notated_32nd_notes_per_beat if len(readers) > 0 else None, np.zeros(0, dtype=EVENT_DTYPE))
+    return file, readers
+
+
+def read_smf_file(filepath: str) -> SmfFile:
+    """
+    reads and parses a Standard MIDI File from a given path
+
+    :param filepath:
+    :return:
+    """
+    with open(filepath, 'rb') as file:
+        return read_smf(file.read())
+
+
+def write_variable_int(value: int) -> bytes:
+    """
+    writes a non-negative integer as a variable-length quantity
+
+    :param value:
+    :return:
+    """
+    if value < 0:
+        raise ValueError('variable int must be a non-negative integer')
+
+    groups = [value & 0x7f]
+    value >>= 7
+    while value:
+        groups.append((value & 0x7f) | 0x80)
+        value >>= 7
+
+    return bytes(reversed(groups))
+
+
+def write_meta_message(time: int,
+                       meta_type: int,
+                       data: bytes) -> bytes:
+    """
+    writes a MetaMessage preceded by its delta time, in MIDI ticks
+
+    :param time:
+    :param meta_type:
+    :param data:
+    :return:
+    """
+    return write_variable_int(time) + bytes((0xff, meta_type)) + write_variable_int(len(data)) + data
+
+
+def write_channel_messages(times: np.ndarray,
+                           statuses: np.ndarray,
+                           data_1: np.ndarray,
+                           data_2: np.ndarray,
+                           previous_status: Union[int, None] = None) -> bytes:
+    """
+    writes channel messages with two data bytes (e.g. 'note_on' and 'note_off') preceded by their delta times,
+    all at once; as in mido, the status byte is omitted if it repeats the previous one (running status)
+
+    :param times: delta times, in MIDI ticks
+    :param statuses:
+    :param data_1:
+    :param data_2:
+    :param previous_status: status of a channel message written directly before, e.g. by a previous call
+    :return:
+    """
+    if len(times) == 0:
+        return b''
+    if times.min() < 0:
+        raise ValueError('message time must be non-negative in MIDI file')
+
+    # number of bytes of each delta time, at least 1
+    time_sizes = np.ones(len(times), dtype=np.int64)
+    remaining = times >> 7
+    while np.any(remaining):
+        time_sizes += remaining > 0
+        remaining >>= 7
+
+    running = np.zeros(len(times), dtype=np.bool_)
+    running[0] = statuses[0] == previous_status
+    running[1:] = statuses[1:] == statuses[:-1]
+    ends = np.cumsum(time_sizes + 3 - running)
+    begins = ends - (time_sizes + 3 - running)
+
+    buffer = np.zeros(ends[-1], dtype=np.uint8)
+    for group in range(int(time_sizes.max())):  # groups of 7 bits, from the least significant one
+        written = time_sizes > group
+        buffer[begins[written] + time_sizes[written] - 1 - group] = \
+            ((times[written] >> (7 * group)) & 0x7f) | (0x80 if group > 0 else 0)
+
+    status_positions = begins + time_sizes
+    buffer[status_positions[~running]] = statuses[~running]
+    data_positions = status_positions + ~running
+    buffer[data_positions] = data_1
+    buffer[data_positions + 1] = data_2
+
+    return buffer.tobytes()
+
+
+def write_smf(file_type: int,
+              ticks_per_beat: int,
+              tracks: list[bytes]) -> bytes:
+    """
+    writes a Standard MIDI File from contents of its tracks (see write_meta_message and write_channel_messages),
+    with the same header as mido.MidiFile.save
+
+    :param file_type:
+    :param ticks_per_beat:
+    :param tracks:
+    :return:
+    """
+    chunks = [b'MThd', struct.pack('>L', 6), struct.pack('>hhh', file_type, len(tracks), ticks_per_beat)]
+    for track in tracks:
+        chunks.extend([b'MTrk', struct.pack('>L', len(track)), track])
+
+    return b''.join(chunks)
@@ -0,0 +1,28 @@
+import os
+
+from typing import *
+
+# a path to a '.mid' file, its content or a binary stream (e.g. an uploaded file) to read it from
+MidiSource = Union[str, 'os.PathLike[str]', bytes, bytearray, memoryview, BinaryIO]
+
+
+def is_path(source: Any) -> bool:
+    """
+    checks if a MIDI source is a filesystem path rather than an in-memory content or a stream
+
+    :param source:
+    :return:
+    """
+    return isinstance(source, (str, os.PathLike))
+
+
+def get_source_name(source: Any) -> str:
+    """
+    returns a filename without extension for paths and an empty string for other sources, e.g. in-memory content
+
+    :param source:
+    :return:
+    """
+    if is_path(source):
+        return os.path.splitext(os.path.basename(os.fspath(source)))[0]
+    return ''
@@ -0,0 +1,230 @@
+import os
+import functools
+import numpy as np
+
+from typing import *
+try:
+    from corpus import DEFAULT_WORKERS, ErrorCallback, report_error, decode_corpus
+    from decode import DEFAULT_BACKEND, SEQUENCE_DTYPES, MidiSource, get_dense_array_of_notes, get_notes_matrix, \
+        get_source_name, initialise_event_sequences_with_backend
+    from tempo import TempoMap
+    from instrument import instrumented_file
+except ImportError:
+    from .corpus import DEFAULT_WORKERS, ErrorCallback, report_error, decode_corpus
+    from .decode import DEFAULT_BACKEND, SEQUENCE_DTYPES, MidiSource, get_dense_array_of_notes, get_notes_matrix, \
+        get_source_name, initialise_event_sequences_with_backend
+    from .tempo import TempoMap
+    from .instrument import instrumented_file
+
+STORE_VERSION = 1            # changes make previously built stores unreadable
+STORE_ROWS_NAME = 'rows.bin'  # rows of all decoded files, one after another, without any header
+STORE_INDEX_NAME = 'index.npz'
+
+# a function translating a single MIDI source into a two- or three-dimensional array together with a TempoMap,
+# e.g. functools.partial(decode_notes, use_velocities=False, join_tracks=True);
+# as a Decoder of decode_corpus, it has to be picklable
+StoreDecoder = Callable[[MidiSource], Tuple[np.ndarray, TempoMap]]
+
+
+class CorpusStore:
+    """
+    opens a corpus built by build_corpus_store read-only: decoded arrays of all files are rows of a single
+    memory-mapped file, so getting an array of a file returns a view without copying or decoding anything,
+    and processes opening the same store share its pages in memory
+    """
+    directory: str
+    decoder: str                # a description of the decoder, see get_decoder_name
+    rows: np.ndarray            # np.memmap of size 'rows of all files' x 'row width'
+    names: np.ndarray           # filenames without extension, empty for in-memory sources
+    sources: np.ndarray         # indices of decoded files among sources given to build_corpus_store
+    starts: np.ndarray          # first row of each file
+    lengths: np.ndarray         # rows of each track of a file
+    tracks: np.ndarray          # number of tracks of each file, 0 for files decoded into two-dimensional arrays
+    tempo_indptr: np.ndarray    # tempo changes of file i are tempo_offsets / tempo_values[indptr[i]:indptr[i + 1]]
+    tempo_offsets: np.ndarray
+    tempo_values: np.ndarray
+    tempo_lengths: np.ndarray   # grid lengths of files, as lengths of their TempoMaps
+
+    def __init__(
+            self,
+            directory: Union[str, 'os.PathLike[str]']
+    ):
+        self.directory = os.fspath(directory)
+        with np.load(os.path.join(self.directory, STORE_INDEX_NAME), allow_pickle=False) as index:
+            if int(index['version']) != STORE_VERSION:
+                raise ValueError('corpus store version {} is not supported'.format(int(index['version'])))
+
+            self.decoder = str(index['decoder'])
+            self.names = index['names']
+            self.sources = index['sources']
+            self.starts = index['starts']
+            self.lengths = index['lengths']
+            self.tracks = index['tracks']
+            self.tempo_indptr = index['tempo_indptr']
+            self.tempo_offsets = index['tempo_offsets']
+            self.tempo_values = index['tempo_values']
+            self.tempo_lengths = index['tempo_lengths']
+            dtype = np.dtype(str(index['dtype']))
+            width = int(index['width'])
+            rows = int(index['rows'])
+
+        path = os.path.join(self.directory, STORE_ROWS_NAME)
+        if os.path.getsize(path) != rows * width * dtype.itemsize:
+            raise ValueError('corpus store is corrupted')
+
+        # an empty file cannot be memory-mapped
+        self.rows = np.memmap(path, dtype=dtype, mode='r', shape=(rows, width)) if rows > 0 \
+            else np.zeros((0, width), dtype=dtype)
+
+    def __repr__(self) -> str:
+        return f'CorpusStore({self.directory!r}, decoder={self.decoder!r}, files={len(self)})'
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __getitem__(self,
+                    index: int) -> np.ndarray:
+        if not 0 <= index < len(self):
+            raise IndexError('corpus store index out of range')
+
+        start, length, tracks = int(self.starts[index]), int(self.lengths[index]), int(self.tracks[index])
+        if tracks == 0:
+            return self.rows[start:start + length]
+        return self.rows[start:start + tracks * length].reshape(tracks, length, self.rows.shape[1])
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def get_tempo_map(self,
+                      index: int) -> TempoMap:
+        """
+        returns the TempoMap of a file
+
+        :param index:
+        :return:
+        """
+        if not 0 <= index < len(self):
+            raise IndexError('corpus store index out of range')
+
+        begin, end = int(self.tempo_indptr[index]), int(self.tempo_indptr[index + 1])
+        return TempoMap(self.tempo_offsets[begin:end], self.tempo_values[begin:end], int(self.tempo_lengths[index]))
+
+
+@instrumented_file('source')
+def decode_notes(source: MidiSource,
+                 use_velocities: bool,
+                 join_tracks: bool,
+                 backend: str = DEFAULT_BACKEND,
+                 packed: bool = False,
+                 dtype: Union[str, type, np.dtype, None] = None) -> Tuple[np.ndarray, TempoMap]:
+    """
+    a StoreDecoder translating a MIDI source into a dense array of notes, as decode.get_array_of_notes
+    with sparse == False, together with the TempoMap of the file; with a given dtype, into a matrix of notes
+    of size events x 128 of joined tracks instead, as decode.get_notes_matrices without event lengths
+
+    :param source:
+    :param use_velocities:
+    :param join_tracks:
+    :param backend:
+    :param packed:
+    :param dtype:
+    :return:
+    """
+    if packed and (use_velocities or dtype is not None):
+        raise ValueError('only boolean arrays of notes (use_velocities == False, dtype == None) can be packed')
+    if dtype is not None:
+        dtype = np.dtype(dtype)
+        if dtype not in SEQUENCE_DTYPES:
+            raise ValueError('unknown type of notes "{}", expected one of {}'.format(dtype, SEQUENCE_DTYPES))
+        if not join_tracks:
+            raise ValueError('matrices of notes of tracks differ in length, so tracks have to be joined')
+
+    _, _, length, tempo_map, event_sequences = initialise_event_sequences_with_backend(source, use_velocities,
+                                                                                        join_tracks, backend)
+    if dtype is not None:
+        return get_notes_matrix(event_sequences[0], dtype), tempo_map
+    return get_dense_array_of_notes(event_sequences, length, use_velocities, join_tracks, packed), tempo_map
+
+
+def get_decoder_name(decoder: StoreDecoder) -> str:
+    """
+    returns a description of a decoder, with keyword arguments of a functools.partial, e.g.
+    'decode_notes(join_tracks=True, use_velocities=False)'
+
+    :param decoder:
+    :return:
+    """
+    if isinstance(decoder, functools.partial):
+        arguments = ', '.join(f'{name}={value!r}' for name, value in sorted(decoder.keywords.items()))
+        return f'{get_decoder_name(decoder.func)}({arguments})'
+    return getattr(decoder, '__name__', type(decoder).__name__)
+
+
+def build_corpus_store(sources: Iterable[MidiSource],
+                       directory: Union[str, 'os.PathLike[str]'],
+                       decoder: StoreDecoder,
+                       workers: int = DEFAULT_WORKERS,
+                       on_error: ErrorCallback = report_error) -> CorpusStore:
+    """
+    decodes MIDI sources once with decode_corpus and writes all outputs one after another into a single file
+    of a directory, together with an index of files (first row, length, number of tracks and TempoMap);
+    outputs have to be arrays of the same type and last dimension; sources which cannot be decoded are skipped;
+    an existing store in the directory is replaced
+
+    :param sources:
+    :param directory:
+    :param decoder:
+    :param workers:
+    :param on_error:
+    :return:
+    """
+    directory = os.fspath(directory)
+    os.makedirs(directory, exist_ok=True)
+    rows_path = os.path.join(directory, STORE_ROWS_NAME)
+    index_path = os.path.join(directory, STORE_INDEX_NAME)
+    suffix = f'.{os.getpid()}.tmp'  # written files are renamed, so readers never see partial ones
+
+    sources = list(sources)
+    names, indices, starts, lengths, tracks = list[str](), list[int](), list[int](), list[int](), list[int]()
+    tempo_offsets, tempo_values, tempo_lengths = list[np.ndarray](), list[np.ndarray](), list[int]()
+    dtype: Union[np.dtype, None] = None
+    width = 0
+    rows = 0
+
+    with open(rows_path + suffix, 'wb') as file:
+        for index, (array, tempo_map) in decode_corpus(sources, decoder, workers, True, on_error):
+            if array.ndim not in (2, 3):
+                raise TypeError('decoded arrays must have 2 or 3 dimensions')
+            if dtype is None:
+                dtype, width = array.dtype, array.shape[-1]
+            elif array.dtype != dtype or array.shape[-1] != width:
+                raise TypeError('decoded arrays must be of the same type and last dimension')
+
+            np.ascontiguousarray(array).tofile(file)
+            names.append(get_source_name(sources[index]))
+            indices.append(index)
+            starts.append(rows)
+            lengths.append(array.shape[-2])
+            tracks.append(array.shape[0] if array.ndim == 3 else 0)
+            tempo_offsets.append(tempo_map.offsets)
+            tempo_values.append(tempo_map.tempos)
+            tempo_lengths.append(tempo_map.length)
+            rows += array.shape[-2] * (array.shape[0] if array.ndim == 3 else 1)
+
+    tempo_indptr = np.zeros(len(tempo_offsets) + 1, dtype=np.int64)
+    np.cumsum([len(offsets) for offsets in tempo_offsets], out=tempo_indptr[1:])
+
+    with open(index_path + suffix, 'wb') as file:
+        np.savez(file, version=np.array(STORE_VERSION), decoder=np.array(get_decoder_name(decoder)),
+                 dtype=np.array((dtype or np.dtype(np.bool_)).str), width=np.array(width), rows=np.array(rows),
+                 names=np.array(names, dtype=np.str_), sources=np.array(indices, dtype=np.int64),
+                 starts=np.array(starts, dtype=np.int64), lengths=np.array(lengths, dtype=np.int64),
+                 tracks=np.array(tracks, dtype=np.int64), tempo_indptr=tempo_indptr,
+                 tempo_offsets=np.concatenate(tempo_offsets or [np.zeros(0, dtype=np.int64)]),
+                 tempo_values=np.concatenate(tempo_values or [np.zeros(0, dtype=np.int64)]),
+                 tempo_lengths=np.array(tempo_lengths, dtype=np.int64))
+
+    os.replace(rows_path + suffix, rows_path)
+    os.replace(index_path + suffix, index_path)
+    return CorpusStore(directory)
@@ -0,0 +1,150 @@
+import numpy as np
+
+from fractions import Fraction
+from typing import *
+try:
+    from smf import DEFAULT_TEMPO
+except ImportError:
+    from .smf import DEFAULT_TEMPO
+
+
+class TempoMap:
+    """
+    stores tempos as change points instead of a value for each time unit: tempos[i] is valid
+    from offsets[i] up to offsets[i + 1] (or up to length for the last one), in grid accuracy time units;
+    consecutive tempos are always different, so every change point but the first one is a tempo change
+    """
+    offsets: np.ndarray  # ascending, with offsets[0] == 0 unless the map is empty
+    tempos: np.ndarray   # in microseconds per beat
+    length: int          # number of time units, as the length of an equivalent tempo array
+
+    def __init__(
+            self,
+            offsets: np.ndarray,
+            tempos: np.ndarray,
+            length: int
+    ):
+        offsets = np.asarray(offsets, dtype=np.int64)
+        tempos = np.asarray(tempos, dtype=np.int64)
+
+        # a tempo is valid from its offset up to the following change point, so only the last of equal offsets counts
+        kept = (offsets < length) & np.append(offsets[1:] != offsets[:-1], True)
+        offsets, tempos = offsets[kept], tempos[kept]
+        kept = np.ones(len(tempos), dtype=np.bool_)
+        kept[1:] = tempos[1:] != tempos[:-1]
+
+        self.offsets = offsets[kept]
+        self.tempos = tempos[kept]
+        self.length = length
+
+    def __repr__(self) -> str:
+        return f'TempoMap({self.offsets.tolist()}, {self.tempos.tolist()}, {self.length})'
+
+    def __eq__(self,
+               other: Any) -> bool:
+        return isinstance(other, TempoMap) and \
+            self.length == other.length and \
+            np.array_equal(self.offsets, other.offsets) and \
+            np.array_equal(self.tempos, other.tempos)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self,
+                    offset: int) -> int:
+        if not 0 <= offset < self.length:
+            raise IndexError('tempo map offset out of range')
+        return int(self.tempos[np.searchsorted(self.offsets, offset, side='right') - 1])
+
+    def get_tempos(self,
+                   offsets: np.ndarray) -> np.ndarray:
+        """
+        returns tempos at given time units, which have to be in the range of the map
+
+        :param offsets:
+        :return:
+        """
+        return self.tempos[np.searchsorted(self.offsets, offsets, side='right') - 1]
+
+    def to_array(self) -> np.ndarray:
+        """
+        expands the map to an array with a tempo for each time unit
+
+        :return:
+        """
+        return np.repeat(self.tempos, np.diff(self.offsets, append=self.length))
+
+    def to_list(self) -> list[int]:
+        """
+        expands the map to a list with a tempo for each time unit, as returned by get_tempo_array
+
+        :return:
+        """
+        tempos: list[int] = self.to_array().tolist()
+        return tempos
+
+    @staticmethod
+    def from_array(array: Union[list[int], np.ndarray]) -> 'TempoMap':
+        """
+        creates a map from an array with a tempo for each time unit
+
+        :param array:
+        :return:
+        """
+        array = np.asarray(array, dtype=np.int64)
+        return TempoMap(np.arange(len(array)), array, len(array))
+
+    @staticmethod
+    def from_changes(offsets: np.ndarray,
+                     tempos: np.ndarray,
+                     length: int,
+                     initial_tempo: int = DEFAULT_TEMPO) -> 'TempoMap':
+        """
+        creates a map from ascending offsets of tempo changes, e.g. 'set_tempo' MetaMessages:
+        each tempo is valid from its offset until the following change, changes before the first time unit
+        set the initial tempo
+
+        :param offsets:
+        :param tempos:
+        :param length:
+        :param initial_tempo:
+        :return:
+        """
+        offsets = np.concatenate(([0], np.maximum(np.asarray(offsets, dtype=np.int64), 0)))
+        tempos = np.concatenate(([initial_tempo], np.asarray(tempos, dtype=np.int64)))
+        return TempoMap(offsets, tempos, length)
+
+    @staticmethod
+    def from_event_lengths(tempos: Union[list[int], np.ndarray],
+                           event_lengths: Union[list[int], np.ndarray]) -> 'TempoMap':
+        """
+        creates a map from a tempo for each event, as get_tempo_array_from_tempo_sequences does with lists
+
+        :param tempos:
+        :param event_lengths:
+        :return:
+        """
+        lengths = np.maximum(np.asarray(event_lengths, dtype=np.int64), 0)
+        ends = np.cumsum(lengths)
+        return TempoMap(ends - lengths, np.asarray(tempos), int(ends[-1]) if len(ends) > 0 else 0)
+
+
+def get_accumulated_time(time: float,
+                         accuracy: float,
+                         units: int) -> float:
+    """
+    returns a time with accuracy added to it a given number of times, equal to the result of repeated float addition
+
+    :param time:
+    :param accuracy:
+    :param units:
+    :return:
+    """
+    # when all partial sums are exact, the repeated addition is equal to a single multiplication
+    denominator = max(Fraction(time).denominator, Fraction(accuracy).denominator)
+    end = Fraction(time) + units * Fraction(accuracy)
+    if max(abs(Fraction(time)), abs(end)) * denominator < 2 ** 53:
+        return float(end)
+
+    # cumulative sum adds values one by one, as a loop does
+    return float(np.cumsum(np.concatenate(([time], np.full(units, accuracy))))[-1])
@@ -6,7 +6,7 @@ setup(
     packages=['midi'],
     install_requires=[
         'music21',
-        'mido',
+        'mido>=1.3',
         'requests',
         'tqdm',
         'numpy==1.23.5',
@@ -0,0 +1,77 @@
+import os
+import numpy as np
+
+from midi.cache import *
+
+
+def test_get_key(tmpdir):
+    cache = DecodeCache(tmpdir)
+    cache_key = cache.get_key(b'MThd', 'get_array_of_notes', False, True, 64)
+
+    assert cache_key.endswith('-get_array_of_notes-0-1-64-v{}'.format(CACHE_VERSION))
+    assert cache_key != cache.get_key(b'MThd', 'get_array_of_notes', True, True, 64)
+    assert cache_key != cache.get_key(b'MTrk', 'get_array_of_notes', False, True, 64)
+
+
+def test_store_and_load(tmpdir):
+    cache = DecodeCache(tmpdir)
+    array = np.arange(12, dtype=np.float_).reshape(3, 4)
+    arrays = {'lengths': np.array([1, 2]), 'notes': np.array([[True], [False]])}
+
+    assert cache.load('array') is None
+    cache.store('array', array)
+    cache.store('arrays', arrays)
+    loaded_array = cache.load('array')
+    loaded_arrays = cache.load('arrays')
+
+    assert isinstance(loaded_array, np.ndarray)
+    assert np.array_equal(loaded_array, array)
+    assert loaded_array.dtype == array.dtype
+    assert isinstance(loaded_arrays, dict)
+    assert loaded_arrays.keys() == arrays.keys()
+    assert all(np.array_equal(loaded_arrays[name], arrays[name]) for name in arrays)
+    assert cache.hits == 2
+    assert cache.misses == 1
+    assert sorted(os.listdir(tmpdir)) == ['array.npy', 'arrays.npz']
+
+
+def test_evicts_least_recently_used(tmpdir):
+    array = np.zeros(1000, dtype=np.uint8)
+    cache = DecodeCache(tmpdir, 2500)
+    cache.store('a', array)
+    cache.store('b', array)
+    os.utime(cache.get_path('a', '.npy'), ns=(0, 0))
+    os.utime(cache.get_path('b', '.npy'), ns=(1, 1))
+    _ = cache.load('a')
+    cache.store('c', array)
+
+    assert cache.load('b') is None
+    assert cache.load('a') is not None
+    assert cache.load('c') is not None
+    assert cache.get_size() <= 2500
+
+
+def test_removes_corrupted_entry(tmpdir):
+    cache = DecodeCache(tmpdir)
+    with open(cache.get_path('a', '.npy'), 'wb') as file:
+        file.write(b'not an array')
+
+    assert cache.load('a') is None
+    assert cache.misses == 1
+    assert os.listdir(tmpdir) == []
+
+
+def test_get_stats_and_clear(tmpdir):
+    cache = DecodeCache(tmpdir)
+    cache.store('a', np.zeros(10))
+    _ = cache.load('a')
+    _ = cache.load('b')
+    stats = cache.get_stats()
+
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['entries'] == 1
+    assert stats['size'] == os.path.getsize(cache.get_path('a', '.npy'))
+
+    cache.clear()
+    assert cache.get_stats() == {'hits': 0, 'misses': 0, 'entries': 0, 'size': 0}
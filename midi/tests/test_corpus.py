@@ -0,0 +1,53 @@
+import numpy as np
+
+from functools import partial
+from midi.corpus import *
+from midi.decode import get_array_of_notes
+
+# one-time setup
+file_polyphony_folder = 'test_files/test_polyphony/'
+file_types_folder = 'test_files/test_types/'
+
+file_2_name = 'test_tempos_velocities_and_polyphony'
+file_3_name = 'test_type_0'
+file_4_name = 'test_type_1_corrupt'
+file_6_name = 'test_type_1_untrimmed'
+
+paths = [file_polyphony_folder + file_2_name + '.mid',
+         file_types_folder + file_4_name + '.mid',
+         file_types_folder + file_6_name + '.mid',
+         file_types_folder + file_3_name + '.mid']
+decoder = partial(get_array_of_notes, use_velocities=False, join_tracks=True)
+
+
+def test_decode_source():
+    index, output, exception = decode_source(decoder, 3, paths[0])
+    assert index == 3
+    assert np.array_equal(output, decoder(paths[0]))
+    assert exception is None
+
+    index, output, exception = decode_source(decoder, 1, paths[1])
+    assert index == 1
+    assert output is None
+    assert isinstance(exception, ImportError)
+
+
+def test_decode_corpus_skips_errors():
+    errors = list[tuple[int, str]]()
+    for workers in [1, 2]:
+        errors.clear()
+        outputs = list(decode_corpus(paths, decoder, workers, True, lambda i, path, ex: errors.append((i, path))))
+
+        assert [index for index, _ in outputs] == [0, 2]
+        for index, output in outputs:
+            assert np.array_equal(output, decoder(paths[index]))
+        assert sorted(errors) == [(1, paths[1]), (3, paths[3])]
+
+
+def test_decode_corpus_unordered():
+    with open(paths[2], 'rb') as file:
+        sources = [paths[0], file, paths[0]]
+        outputs = dict(decode_corpus(sources, decoder, 2, False))
+
+    assert sorted(outputs.keys()) == [0, 1, 2]
+    assert np.array_equal(outputs[1], decoder(paths[2]))
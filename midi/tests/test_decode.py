@@ -1,4 +1,5 @@
 import filecmp
+import io
 import os.path
 import pytest
 
@@ -703,6 +704,24 @@ def test_get_midi_length():
     assert length == 192
 
 
+def test_get_track_offsets():
+    track = MidiTrack([Message('note_on', note=64, time=22), Message('note_off', note=64, time=63)])
+    offsets = get_track_offsets(track, 16)
+
+    assert isinstance(offsets, np.ndarray)
+    assert offsets.tolist() == [1, 5]
+    assert get_track_offsets(track, 16, 22).tolist() == [0, 4]
+
+
+def test_get_message_offsets():
+    file = MidiFile(file_polyphony_folder + file_2_name + '.mid')
+    offsets = get_message_offsets(file, float(12))
+
+    assert len(offsets) == len(file.tracks)
+    assert get_midi_length(file, float(12), offsets) == 192
+    assert get_tempo_map(file, 192, float(12), 0, offsets[0]).to_list() == expected_tempos
+
+
 def test_get_filename_correct():
     filename = get_filename('test/relative/path/file.mid')
 
@@ -730,6 +749,52 @@ def test_open_file_corrupt():
         _, _, _ = open_file(file_types_folder + file_4_name + '.mid')
 
 
+def test_open_file_from_bytes():
+    with open(file_polyphony_folder + file_2_name + '.mid', 'rb') as source:
+        data = source.read()
+    file, filename, accuracy = open_file(data)
+
+    assert isinstance(file, MidiFile)
+    assert filename == ''
+    assert accuracy == float(12)
+
+
+def test_open_file_from_corrupt_bytes():
+    with open(file_types_folder + file_4_name + '.mid', 'rb') as source:
+        data = source.read()
+
+    with pytest.raises(ImportError):
+        _, _, _ = open_file(data)
+
+
+def test_load_source():
+    with open(file_polyphony_folder + file_2_name + '.mid', 'rb') as source:
+        data = load_source(source)
+
+    assert isinstance(data, bytes)
+    assert data[:4] == b'MThd'
+
+
+def test_get_array_of_notes_in_memory():
+    path = file_polyphony_folder + file_2_name + '.mid'
+    array = np.load(file_polyphony_folder + 'AVF.npy', allow_pickle=True)
+    with open(path, 'rb') as source:
+        data = source.read()
+
+    for backend in DECODE_BACKENDS:
+        assert np.array_equal(array, get_array_of_notes(data, True, False, backend))
+        assert np.array_equal(array, get_array_of_notes(memoryview(data), True, False, backend))
+        assert np.array_equal(array, get_array_of_notes(io.BytesIO(data), True, False, backend))
+
+
+def test_export_tempo_array_in_memory():
+    with open(file_types_folder + file_6_name + '.mid', 'rb') as source:
+        data = source.read()
+
+    assert export_tempo_array(data, True) == expected_trimmed_tempos[:-1]
+    assert export_tempo_array(io.BytesIO(data), False, 'numpy') == expected_untrimmed_tempos[:-1]
+
+
 def test_get_tempo_array():
     file = MidiFile(file_polyphony_folder + file_2_name + '.mid')
     tempos = get_tempo_array(file, 192, 12)
@@ -738,6 +803,15 @@ def test_get_tempo_array():
     assert tempos == expected_tempos
 
 
+def test_get_tempo_map():
+    file = MidiFile(file_polyphony_folder + file_2_name + '.mid')
+    tempo_map = get_tempo_map(file, 192, 12)
+
+    assert isinstance(tempo_map, TempoMap)
+    assert tempo_map.offsets.tolist() == [0, 80, 144]
+    assert tempo_map.to_list() == expected_tempos
+
+
 def test_export_tempo_array_trimmed():
     tempos = export_tempo_array(file_types_folder + file_6_name + '.mid', True)
 
@@ -761,6 +835,43 @@ def test_combine_and_clean_tracks():
     assert out_track == expected_midi_track
 
 
+def test_combine_and_clean_tracks_keeps_source():
+    file = MidiFile(file_polyphony_folder + file_2_name + '.mid')
+    expected_tracks = MidiFile(file_polyphony_folder + file_2_name + '.mid').tracks
+    _ = combine_and_clean_tracks(file.tracks[1:])
+
+    assert file.tracks == expected_tracks
+
+
+def test_copy_message():
+    msg = MidiFile(file_polyphony_folder + file_2_name + '.mid').tracks[1][1]
+    expected_copy = msg.copy(time=7)
+    out_copy = copy_message(msg, 7, msg.type)
+    out_note_off = copy_message(msg, 7, 'note_off')
+
+    assert out_copy == expected_copy
+    assert list(vars(out_copy).items()) == list(vars(expected_copy).items())
+    assert out_note_off == Message('note_off', channel=msg.channel, note=msg.note, time=7, velocity=msg.velocity)
+    assert out_copy is not msg
+
+
+def test_get_note_messages():
+    track = MidiTrack([Message('note_on', note=60, velocity=100, time=5), Message('control_change', time=3),
+                       Message('note_on', note=60, velocity=0, time=2)])
+    assert [(time, msg, note_off) for time, msg, note_off in get_note_messages(track)] == \
+        [(5, track[0], False), (10, track[2], True)]
+
+
+def test_remove_empty_tracks():
+    file = MidiFile(file_polyphony_folder + file_2_name + '.mid')
+    tracks = list(file.tracks)
+    out_file = remove_empty_tracks(file, 10)
+
+    assert file.tracks == tracks
+    assert out_file.tracks == [track for i, track in enumerate(tracks) if i == 0 or len(track) > 10]
+    assert out_file.ticks_per_beat == file.ticks_per_beat
+
+
 def test_get_max_velocity():
     file = MidiFile(file_polyphony_folder + file_2_name + '.mid')
     tracks = file.tracks[1:]
@@ -880,6 +991,490 @@ def test_get_lists_of_events_velocities_mode():
     assert events == expected_events_t
 
 
+def test_get_lists_of_events_with_offsets():
+    offsets = get_message_offsets(expected_prepared_file_without_join, float(12))
+    events = get_lists_of_events(expected_prepared_file_without_join, float(12), TempoMap.from_array(expected_tempos),
+                                 False, offsets)
+
+    assert events == expected_events_f
+
+
+def test_get_interval_indices():
+    indices = get_interval_indices(np.array([0, 5, 9]), np.array([2, 3, 0]))
+
+    assert isinstance(indices, np.ndarray)
+    assert indices.tolist() == [0, 1, 5, 6, 7]
+
+
+def test_get_event_arrays():
+    offsets, lengths, notes = get_event_arrays(expected_events_t[1], True)
+
+    assert isinstance(notes, np.ndarray)
+    assert offsets.tolist() == [event.offset for event in expected_events_t[1]]
+    assert lengths.tolist() == [event.length for event in expected_events_t[1]]
+    assert notes.dtype == np.float_
+    assert notes.tolist() == [event.all_notes for event in expected_events_t[1]]
+
+
+def test_get_event_arrays_from_event_sequence():
+    sequence = EventSequence.from_events(expected_events_t[1], 1, True)
+    offsets, lengths, notes = get_event_arrays(sequence, True)
+
+    assert offsets.tolist() == [event.offset for event in expected_events_t[1]]
+    assert lengths.tolist() == [event.length for event in expected_events_t[1]]
+    assert notes.tolist() == [event.all_notes for event in expected_events_t[1]]
+
+
+def test_event_sequence():
+    for events, use_velocities in [(expected_events_f[1], False), (expected_events_t[1], True)]:
+        sequence = EventSequence.from_events(events, 1, use_velocities)
+
+        assert len(sequence) == len(events)
+        assert sequence.active.dtype == np.bool_
+        assert sequence[2] == events[2]
+        assert list(sequence) == events
+        assert sequence.to_events() == events
+        assert sequence == EventSequence.from_events(events, 1, use_velocities)
+
+
+def test_event_sequence_normalise():
+    sequence = EventSequence.from_events(expected_events_t[1], 1, True)
+    events = EventSequence.from_events(expected_events_t[1], 1, True).to_events()
+    sequence.normalise(64)
+    for event in events:
+        event.normalise(64)
+
+    assert sequence.to_events() == events
+
+
+def test_event_sequence_incorrect():
+    with pytest.raises(ValueError):
+        _ = EventSequence(0, True, np.zeros(1), np.zeros(1), np.zeros(1), np.zeros(1), np.zeros((1, 128)))
+
+
+def test_get_event_sequences():
+    for use_velocities, expected_events in [(False, expected_events_f), (True, expected_events_t)]:
+        sequences = get_event_sequences(expected_prepared_file_without_join, float(12), expected_tempos,
+                                        use_velocities)
+
+        assert all(isinstance(sequence, EventSequence) for sequence in sequences)
+        assert [sequence.to_events() for sequence in sequences] == expected_events
+
+
+def test_get_event_sequences_from_arrays():
+    tracks, _, accuracy, _, tempos = prepare_events(file_polyphony_folder + file_2_name + '.mid', False)
+    sequences = get_event_sequences_from_arrays(tracks, accuracy, tempos, True)
+
+    assert [sequence.to_events() for sequence in sequences] == expected_events_t
+
+
+def test_fill_array_of_notes():
+    offsets, lengths, notes = get_event_arrays(expected_events_f[0], False)
+    output_array = np.zeros((192, 128), dtype=np.bool_)
+    fill_array_of_notes(output_array, offsets, lengths, notes)
+
+    expected_array = np.zeros((192, 128), dtype=np.bool_)
+    for event in expected_events_f[0]:
+        for time in range(event.offset, event.offset + event.length):
+            expected_array[time] = event.all_notes
+
+    assert np.array_equal(output_array, expected_array)
+
+
+def test_get_grid_offsets():
+    offsets = get_grid_offsets(np.array([0, 22, 85, 90]), float(16))
+
+    assert isinstance(offsets, np.ndarray)
+    assert offsets.tolist() == [0, 1, 5, 6]
+
+
+def test_get_kept_notes_mask():
+    notes = np.array([60, 60, 61, 60, 60, 61, 60])
+    note_on = np.array([True, True, True, False, False, False, False])
+    mask = get_kept_notes_mask(notes, note_on)
+
+    assert mask.tolist() == [True, False, True, False, True, True, False]
+
+
+def test_get_kept_notes_mask_with_note_grid():
+    notes = np.array([60, 60, 61, 60, 60, 61, 60])
+    note_on = np.array([True, True, True, False, False, False, False])
+    note_grid = np.zeros(128, dtype=np.int64)
+    first_mask = get_kept_notes_mask(notes[:3], note_on[:3], note_grid)
+
+    assert note_grid[60] == 2 and note_grid[61] == 1
+    assert first_mask.tolist() + get_kept_notes_mask(notes[3:], note_on[3:], note_grid).tolist() \
+        == get_kept_notes_mask(notes, note_on).tolist()
+    assert not note_grid.any()
+
+
+def test_track_events_reader():
+    with open(file_polyphony_folder + file_2_name + '.mid', 'rb') as file:
+        data = file.read()
+    smf_file = read_smf(data)
+    _, readers = scan_smf(data)
+
+    for reader in readers[1:]:
+        track_reader = TrackEventsReader(reader.rewound(), reader.note_off_found)
+        parts = list[np.ndarray]()
+        tick_limit = 0
+        while not track_reader.finished:
+            parts.append(track_reader.read(tick_limit))
+            tick_limit += 30
+
+        assert np.array_equal(np.concatenate(parts), combine_and_clean_events([smf_file.get_track(reader.track)]))
+
+
+def test_combine_and_clean_events():
+    file, _, _ = open_events(file_polyphony_folder + file_2_name + '.mid')
+    track = combine_and_clean_events([file.get_track(i) for i in range(1, len(file.track_sizes))])
+
+    expected_messages = list[Tuple[int, str, int, int]]()
+    ticks = 0
+    for msg in expected_midi_track:
+        ticks += msg.time
+        expected_messages.append((ticks, msg.type, msg.note, msg.velocity))
+
+    assert track['abs_tick'].tolist() == [ticks for ticks, _, _, _ in expected_messages]
+    assert [EVENT_NOTE_ON if x == 'note_on' else EVENT_NOTE_OFF for _, x, _, _ in expected_messages] \
+        == track['type'].tolist()
+    assert track['note'].tolist() == [note for _, _, note, _ in expected_messages]
+    assert track['velocity'].tolist() == [velocity for _, _, _, velocity in expected_messages]
+
+
+def test_prepare_events_separated_mode():
+    tracks, filename, accuracy, length, tempos = prepare_events(file_polyphony_folder + file_2_name + '.mid', False)
+
+    assert isinstance(tracks, list)
+    assert len(tracks) == len(expected_prepared_file_without_join.tracks) - 1
+    assert filename == 'test_tempos_velocities_and_polyphony'
+    assert accuracy == float(12)
+    assert length == 192
+    assert tempos == expected_tempos
+
+
+def test_prepare_events_untrimmed():
+    _, _, _, length, tempos = prepare_events(file_types_folder + file_6_name + '.mid', False)
+
+    assert length == 48
+    assert tempos == expected_trimmed_tempos
+
+
+def test_export_tempo_array_numpy_backend():
+    for trim_output in [True, False]:
+        assert export_tempo_array(file_types_folder + file_6_name + '.mid', trim_output, 'numpy') == \
+            export_tempo_array(file_types_folder + file_6_name + '.mid', trim_output)
+
+
+def test_get_array_of_notes_numpy_backend():
+    for name in ['ABF', 'ABT', 'AVF', 'AVT']:
+        array = np.load(file_polyphony_folder + name + '.npy', allow_pickle=True)
+        out_array = get_array_of_notes(file_polyphony_folder + file_2_name + '.mid',
+                                       name[1] == 'V', name[2] == 'T', 'numpy')
+
+        assert np.array_equal(array, out_array)
+        assert array.dtype == out_array.dtype
+
+
+def test_get_sequence_of_notes_numpy_backend():
+    for name in ['SBFF', 'SBTT', 'SVFT', 'SVTF']:
+        array = np.load(file_notes_folder + name + '.npy', allow_pickle=True)
+        out_array = get_sequence_of_notes(file_notes_folder + file_1_name + '.mid',
+                                          name[1] == 'V', name[2] == 'T', name[3] == 'T', 'numpy')
+
+        assert np.array_equal(array, out_array)
+
+
+def test_get_array_of_notes_sparse(tmpdir):
+    cache = DecodeCache(tmpdir)
+    for name in ['ABF', 'ABT', 'AVF', 'AVT']:
+        array = np.load(file_polyphony_folder + name + '.npy', allow_pickle=True)
+        for _ in range(2):
+            roll = get_array_of_notes(file_polyphony_folder + file_2_name + '.mid',
+                                      name[1] == 'V', name[2] == 'T', cache=cache, sparse=True)
+
+            assert isinstance(roll, SparseRoll)
+            assert roll.shape == array.shape
+            assert np.array_equal(array, roll.to_dense())
+            assert array.dtype == roll.dtype
+
+    assert cache.hits == 4
+
+
+def test_get_array_of_notes_packed():
+    for name in ['ABF', 'ABT']:
+        array = np.load(file_polyphony_folder + name + '.npy', allow_pickle=True)
+        packed = get_array_of_notes(file_polyphony_folder + file_2_name + '.mid', False, name[2] == 'T', packed=True)
+
+        assert isinstance(packed, np.ndarray)
+        assert packed.dtype == np.uint8
+        assert packed.shape == array.shape[:-1] + (16,)
+        assert np.array_equal(np.unpackbits(packed, axis=-1).astype(np.bool_), array)
+
+    with pytest.raises(ValueError):
+        _ = get_array_of_notes(file_polyphony_folder + file_2_name + '.mid', True, True, packed=True)
+
+
+def test_get_sequence_arrays():
+    for name in ['SBFF', 'SBFT', 'SVFF', 'SVFT']:
+        output_list = get_sequence_of_notes(file_polyphony_folder + file_2_name + '.mid',
+                                            name[1] == 'V', False, name[3] == 'T')
+        arrays = get_sequence_arrays(output_list, name[1] == 'V', name[3] == 'T')
+
+        assert get_sequence_from_arrays(arrays, name[1] == 'V', name[3] == 'T') == output_list
+
+
+def test_get_sequence_arrays_from_event_sequences():
+    for name in ['SBFF', 'SBFT', 'SVFF', 'SVFT']:
+        output_list = get_sequence_of_notes(file_polyphony_folder + file_2_name + '.mid',
+                                            name[1] == 'V', False, name[3] == 'T')
+        _, _, _, sequences = initialise_event_sequences(file_polyphony_folder + file_2_name + '.mid',
+                                                        name[1] == 'V', False)
+        arrays = get_sequence_arrays_from_event_sequences(sequences, name[1] == 'V')
+
+        assert 'notes' not in arrays
+        assert get_sequence_from_arrays(arrays, name[1] == 'V', name[3] == 'T') == output_list
+
+
+def test_get_notes_matrix():
+    sequence = EventSequence.from_events(expected_events_t[1], 1, True)
+    expected_notes = np.array([event.all_notes for event in expected_events_t[1]])
+
+    assert np.array_equal(get_notes_matrix(sequence, np.dtype(np.bool_)), sequence.active)
+    assert np.array_equal(get_notes_matrix(sequence, np.dtype(np.float16)), expected_notes.astype(np.float16))
+    assert get_notes_matrix(sequence, np.dtype(np.uint8)).dtype == np.uint8
+
+
+def test_get_sequence_of_notes_matrices():
+    for name in ['SBFF', 'SBTF', 'SVFF', 'SVTF']:
+        use_velocities, join_tracks = name[1] == 'V', name[2] == 'T'
+        output_list = get_sequence_of_notes(file_polyphony_folder + file_2_name + '.mid',
+                                            use_velocities, join_tracks, False)
+        output = get_sequence_of_notes(file_polyphony_folder + file_2_name + '.mid',
+                                       use_velocities, join_tracks, False, dtype=np.float16)
+        if join_tracks:
+            output_list, output = [output_list], [output]
+
+        for (lengths, notes), track_list in zip(output, output_list):
+            assert lengths.tolist() == [length for length, _ in track_list]
+            assert notes.dtype == np.float16
+            assert np.array_equal(notes, np.array([notes for _, notes in track_list], dtype=np.float16))
+
+
+def test_get_sequence_of_notes_matrices_incorrect():
+    with pytest.raises(ValueError):
+        _ = get_sequence_of_notes(file_polyphony_folder + file_2_name + '.mid', False, True, True, dtype=np.bool_)
+    with pytest.raises(ValueError):
+        _ = get_notes_matrices(file_polyphony_folder + file_2_name + '.mid', False, True, np.float64)
+
+
+def test_get_notes_matrices_cached(tmpdir):
+    cache = DecodeCache(tmpdir)
+    lengths, notes = get_notes_matrices(file_polyphony_folder + file_2_name + '.mid', True, True, np.uint8,
+                                        cache=cache)
+    cached_lengths, cached_notes = get_notes_matrices(file_polyphony_folder + file_2_name + '.mid', True, True,
+                                                      np.uint8, cache=cache)
+
+    assert cache.hits == 1
+    assert np.array_equal(lengths, cached_lengths)
+    assert np.array_equal(notes, cached_notes)
+    assert cached_notes.dtype == np.uint8
+
+
+def test_validate_file():
+    validate_file(file_polyphony_folder + file_2_name + '.mid')
+    with open(file_types_folder + file_6_name + '.mid', 'rb') as file:
+        validate_file(file)
+
+    with pytest.raises(ImportError):
+        _ = validate_file(file_types_folder + file_4_name + '.mid')
+    for name in [file_3_name, file_5_name, file_7_name]:
+        with pytest.raises(ValueError):
+            _ = validate_file(file_types_folder + name + '.mid')
+
+
+def test_prepare_tick_events():
+    path = file_polyphony_folder + file_2_name + '.mid'
+    for join_tracks in [False, True]:
+        tick_events = prepare_tick_events(path, join_tracks)
+        tracks, filename, accuracy, length, tempos = prepare_events(path, join_tracks)
+        tick_accuracy, tick_length, tempo_map = quantise_tick_events(tick_events)
+
+        assert tick_events.filename == filename == file_2_name
+        assert (tick_accuracy, tick_length, tempo_map.to_list()) == (accuracy, length, tempos)
+        assert all(np.array_equal(track, expected_track) for track, expected_track in zip(tick_events.tracks, tracks))
+
+
+def test_tick_events_arrays():
+    tick_events = prepare_tick_events(file_polyphony_folder + file_2_name + '.mid', False)
+    out_events = TickEvents.from_arrays(tick_events.get_arrays())
+
+    assert len(out_events.tracks) == len(tick_events.tracks)
+    assert all(np.array_equal(track, expected_track) for track, expected_track in zip(out_events.tracks,
+                                                                                       tick_events.tracks))
+    assert np.array_equal(out_events.tempo_events, tick_events.tempo_events)
+    assert quantise_tick_events(out_events, 32) == quantise_tick_events(tick_events, 32)
+
+
+def test_get_arrays_of_notes():
+    path = file_polyphony_folder + file_2_name + '.mid'
+    arrays = get_arrays_of_notes(path, True, False, [32, 64, 128])
+
+    assert sorted(arrays.keys()) == [32, 64, 128]
+    assert np.array_equal(arrays[64], get_array_of_notes(path, True, False))
+    assert arrays[32].shape[1] < arrays[64].shape[1] < arrays[128].shape[1]
+    assert arrays[128].shape[1] - 2 * arrays[64].shape[1] in [-1, 0, 1]
+
+    with pytest.raises(ValueError):
+        _ = get_arrays_of_notes(path, True, False, [0])
+
+
+def test_get_arrays_of_notes_cached(tmpdir):
+    cache = DecodeCache(tmpdir)
+    path = file_polyphony_folder + file_2_name + '.mid'
+    arrays = get_arrays_of_notes(path, False, True, [32, 64], True, cache)
+    cached_arrays = get_arrays_of_notes(path, False, True, [32, 64, 128], True, cache)
+
+    assert cache.hits == 3  # both arrays and the parsed events
+    assert all(np.array_equal(arrays[grid_accuracy], cached_arrays[grid_accuracy]) for grid_accuracy in [32, 64])
+    assert np.array_equal(get_array_of_notes(path, False, True, cache=cache, packed=True), arrays[64])
+    assert cache.hits == 4
+
+
+def test_iterate_windows_of_notes():
+    path = file_polyphony_folder + file_2_name + '.mid'
+    for use_velocities, join_tracks, packed in [(False, False, False), (False, True, True), (True, False, False),
+                                                (True, True, False)]:
+        array = get_array_of_notes(path, use_velocities, join_tracks, packed=packed)
+        length = array.shape[-2]
+        for window_length, step in [(5, None), (12, 7), (3, 4), (length + 10, 1)]:
+            for backend in ['mido', 'numpy']:
+                windows = list(iterate_windows_of_notes(path, use_velocities, join_tracks, window_length, step,
+                                                        backend, packed))
+                begins = range(0, length, step or window_length)
+
+                assert len(windows) == len(begins)
+                for begin, window in zip(begins, windows):
+                    part = array[..., begin:begin + window_length, :]
+                    assert window.shape[-2] == window_length
+                    assert window.dtype == array.dtype
+                    assert np.array_equal(window[..., :part.shape[-2], :], part)
+                    assert not window[..., part.shape[-2]:, :].any()
+
+
+def test_iterate_windows_of_notes_drop_incomplete():
+    path = file_polyphony_folder + file_2_name + '.mid'
+    length = get_array_of_notes(path, False, True).shape[0]
+    windows = list(iterate_windows_of_notes(path, False, True, 4, 3, drop_incomplete=True))
+
+    assert len(windows) == len(range(0, length - 3, 3))
+    assert not list(iterate_windows_of_notes(path, False, True, length + 1, drop_incomplete=True))
+
+
+def test_iterate_windows_of_notes_incorrect():
+    path = file_polyphony_folder + file_2_name + '.mid'
+    with pytest.raises(ValueError):
+        _ = next(iterate_windows_of_notes(path, False, True, 0))
+    with pytest.raises(ValueError):
+        _ = next(iterate_windows_of_notes(path, False, True, 4, -1))
+    with pytest.raises(ValueError):
+        _ = next(iterate_windows_of_notes(path, True, True, 4, packed=True))
+
+
+def test_get_range_of_notes():
+    path = file_polyphony_folder + file_2_name + '.mid'
+    for use_velocities, join_tracks, packed in [(False, False, False), (False, True, True), (True, False, False),
+                                                (True, True, False)]:
+        array = get_array_of_notes(path, use_velocities, join_tracks, packed=packed)
+        length = array.shape[-2]
+        for start, end in [(0, 0), (0, 1), (0, 10), (5, 60), (100, length), (length - 3, length + 7)]:
+            for backend in ['mido', 'numpy']:
+                out_array = get_range_of_notes(path, use_velocities, join_tracks, start, end, backend, packed)
+                part = array[..., start:end, :]
+
+                assert out_array.shape[-2] == end - start
+                assert out_array.dtype == array.dtype
+                assert np.array_equal(out_array[..., :part.shape[-2], :], part)
+                assert not out_array[..., part.shape[-2]:, :].any()
+
+
+def test_get_range_of_notes_truncated():
+    path = file_polyphony_folder + file_2_name + '.mid'
+    tick_events = prepare_tick_events(path, False, end=10)
+    full_tick_events = prepare_tick_events(path, False)
+
+    assert tick_events.truncated.tolist() == [True, True, True, False]
+    assert not full_tick_events.truncated.any()
+    assert all(len(track) < len(full_track) for track, full_track in zip(tick_events.tracks[:3],
+                                                                          full_tick_events.tracks[:3]))
+    assert prepare_tick_events(path, True, end=10).truncated.tolist() == [False]
+
+    sequences = get_event_sequences_until(tick_events, False, 10)
+    assert sequences is not None
+    assert np.array_equal(get_range_of_notes(path, False, False, 0, 10, 'numpy'),
+                          get_array_of_notes(path, False, False)[:, :10])
+
+
+def test_get_range_of_notes_incorrect():
+    path = file_polyphony_folder + file_2_name + '.mid'
+    with pytest.raises(ValueError):
+        _ = get_range_of_notes(path, False, True, 5, 4)
+    with pytest.raises(ValueError):
+        _ = get_range_of_notes(path, False, True, -1, 4)
+    with pytest.raises(ValueError):
+        _ = get_range_of_notes(path, True, True, 0, 4, packed=True)
+    with pytest.raises(ValueError):
+        _ = get_array_of_notes(path, False, True, start=4)
+    with pytest.raises(ValueError):
+        _ = get_array_of_notes(path, False, True, sparse=True, end=4)
+
+
+def test_get_array_of_notes_range_cached(tmpdir):
+    cache = DecodeCache(tmpdir)
+    path = file_polyphony_folder + file_2_name + '.mid'
+    array = get_array_of_notes(path, True, False)
+
+    for _ in range(2):
+        out_array = get_array_of_notes(path, True, False, cache=cache, start=20, end=50)
+        assert np.array_equal(array[:, 20:50], out_array)
+
+    assert not np.array_equal(get_array_of_notes(path, True, False, cache=cache, start=20, end=40), out_array)
+    assert cache.misses == 2
+    assert cache.hits == 1
+
+
+def test_get_array_of_notes_cached(tmpdir):
+    cache = DecodeCache(tmpdir)
+    path = file_polyphony_folder + file_2_name + '.mid'
+    array = get_array_of_notes(path, True, False)
+
+    for _ in range(2):
+        out_array = get_array_of_notes(path, True, False, cache=cache)
+        assert np.array_equal(array, out_array)
+        assert array.dtype == out_array.dtype
+
+    assert cache.misses == 1
+    assert cache.hits == 1
+
+
+def test_get_sequence_of_notes_cached(tmpdir):
+    cache = DecodeCache(tmpdir)
+    for name in ['SBFF', 'SBTT', 'SVFT', 'SVTF']:
+        array = np.load(file_notes_folder + name + '.npy', allow_pickle=True)
+        for _ in range(2):
+            with open(file_notes_folder + file_1_name + '.mid', 'rb') as file:
+                out_array = get_sequence_of_notes(file, name[1] == 'V', name[2] == 'T', name[3] == 'T', cache=cache)
+            assert np.array_equal(array, out_array)
+
+    assert cache.misses == 4
+    assert cache.hits == 4
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        _ = get_array_of_notes(file_polyphony_folder + file_2_name + '.mid', False, True, 'pandas')
+
+
 def test_initialise_sequences_booleans_f_mode():
     file, filename, length, initial_sequences = initialise_sequences(file_polyphony_folder + file_2_name + '.mid',
                                                                      False, False, False)
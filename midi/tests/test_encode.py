@@ -1,9 +1,11 @@
 import filecmp
+import io
 import numpy as np
 import os
 import pytest
 
 from midi.encode import *
+from midi.roll import get_sparse_roll
 
 # one-time setup
 encode_file_folder = 'test_files/test_outputs'
@@ -554,6 +556,19 @@ expected_meta_file = MidiFile(type=1, ticks_per_beat=240, tracks=[
 ])
 
 
+def test_get_midi_velocities():
+    velocities = get_midi_velocities(np.array([0, 0.25, 0.5, 1.0]))
+
+    assert velocities.dtype == np.int64
+    assert velocities.tolist() == [0, 32, 64, 127]
+    assert get_midi_velocities([True, False]).tolist() == [127, 0]
+
+
+def test_get_encode_accuracy():
+    assert get_encode_accuracy(64) == float(4 * TICKS_PER_BEAT / 64)
+    assert get_encode_accuracy(16, 480) == float(120)
+
+
 def test_get_tempo_meta_messages():
     meta_track = get_tempo_meta_messages(input_array_tempos, float(15))
 
@@ -561,6 +576,20 @@ def test_get_tempo_meta_messages():
     assert meta_track == expected_meta_track
 
 
+def test_get_tempo_meta_messages_from_tempo_map():
+    meta_track = get_tempo_meta_messages(TempoMap.from_array(input_array_tempos), float(15))
+
+    assert meta_track == expected_meta_track
+
+
+def test_get_tempo_map_from_tempos():
+    tempo_map = get_tempo_map_from_tempos(input_sequence_tempos, expected_sequence_lengths)
+
+    assert isinstance(tempo_map, TempoMap)
+    assert tempo_map.to_list() == input_array_tempos
+    assert get_tempo_map_from_tempos(input_array_tempos).to_list() == input_array_tempos
+
+
 def test_get_tempo_array_from_tempo_sequences():
     tempos = get_tempo_array_from_tempo_sequences(input_sequence_tempos, expected_sequence_lengths)
 
@@ -578,6 +607,43 @@ def test_get_sequences_from_array():
     assert event_lengths == expected_array_lengths
 
 
+def test_get_event_boundaries():
+    input_array = np.load(input_array_ABT_path, allow_pickle=True)
+    starts, event_lengths = get_event_boundaries(input_array)
+
+    assert starts.tolist() == np.cumsum([0] + expected_array_lengths[:-1]).tolist()
+    assert event_lengths.tolist() == expected_array_lengths
+
+    with pytest.raises(IndexError):
+        _ = get_event_boundaries(input_array[:0])
+
+
+def test_get_tuples_from_array():
+    input_array = np.load(input_array_ABT_path, allow_pickle=True)
+    tuples, event_lengths = get_tuples_from_array(input_array, True)
+
+    assert tuples == expected_array_tuples
+    assert event_lengths == expected_array_lengths
+
+    tuples, event_lengths = get_tuples_from_array(expected_sequences, False)
+
+    assert tuples == expected_sequence_tuples
+    assert event_lengths == [1] * len(expected_sequences)
+
+
+def test_get_tuples_from_sparse_roll():
+    input_array = np.load(input_array_ABT_path, allow_pickle=True)
+    tuples, event_lengths = get_tuples_from_sparse_roll(get_sparse_roll(input_array), True)
+
+    assert tuples == expected_array_tuples
+    assert event_lengths == expected_array_lengths
+
+    tuples, event_lengths = get_tuples_from_sparse_roll(get_sparse_roll(expected_sequences), False)
+
+    assert tuples == expected_sequence_tuples
+    assert event_lengths == [1] * len(expected_sequences)
+
+
 def test_get_tuples_from_sequences_boolean_mode():
     tuples = get_tuples_from_sequences(expected_array)
 
@@ -617,6 +683,46 @@ def test_get_messages_from_tuples_with_default_velocities():
     assert track == expected_custom_array_track
 
 
+def test_get_note_changes():
+    active = np.zeros((3, 128), dtype=np.bool_)
+    active[0, [60, 64]] = active[1, [60, 64]] = active[2, 64] = True
+    velocities = np.where(active, 64, 0)
+    velocities[1, 64] = 32
+
+    ended, begun = get_note_changes(active, velocities, True)
+
+    assert ended.shape == begun.shape == (4, 128)
+    assert [np.flatnonzero(row).tolist() for row in ended] == [[], [64], [60, 64], [64]]
+    assert [np.flatnonzero(row).tolist() for row in begun] == [[60, 64], [64], [64], []]
+
+    ended, begun = get_note_changes(active, velocities, False)
+
+    assert np.array_equal(ended[1:], active) and not ended[0].any()
+    assert np.array_equal(begun[:-1], active) and not begun[-1].any()
+
+
+def test_get_messages_from_arrays():
+    for tuples, lengths, join_notes, use_default_velocity, expected_track in [
+            (expected_sequence_tuples, expected_sequence_lengths, False, False, expected_sequence_track),
+            (expected_array_tuples, expected_array_lengths, True, True, expected_array_track)]:
+        active = np.zeros((len(tuples), 128), dtype=np.bool_)
+        velocities = np.zeros((len(tuples), 128), dtype=np.int64)
+        for index, event in enumerate(tuples):
+            for note, velocity in event:
+                active[index, note] = True
+                velocities[index, note] = velocity
+
+        track = get_messages_from_arrays(active, velocities, 0, lengths, float(15), join_notes, use_default_velocity)
+
+        assert isinstance(track, MidiTrack)
+        assert track == expected_track
+
+    with pytest.raises(IndexError):
+        _ = get_messages_from_arrays(active, velocities, 0, lengths[1:], float(15), True, False)
+    with pytest.raises(ValueError):
+        _ = get_messages_from_arrays(active, velocities, 16, lengths, float(15), True, False)
+
+
 def test_prepare_meta_file_with_event_lengths():
     tempos, accuracy, midi_file = prepare_meta_file(input_sequence_tempos, 64,
                                                     expected_sequence_lengths, 240)
@@ -736,6 +842,132 @@ def test_get_file_from_standard_features_3d_input():
     os.rmdir(encode_file_folder)
 
 
+def test_get_file_from_standard_features_sparse_input():
+    for path, expected_path in [(input_array_ABT_path, 'test_files/test_encoder/test_2d_array.mid'),
+                                (input_array_ABF_path, 'test_files/test_encoder/test_3d_array.mid')]:
+        input_roll = get_sparse_roll(np.load(path, allow_pickle=True))
+        get_file_from_standard_features(input_roll, input_array_tempos, encode_file_path,
+                                        True, False, False)
+
+        assert filecmp.cmp(encode_file_path, expected_path)
+
+    os.remove(encode_file_path)
+    os.rmdir(encode_file_folder)
+
+
+def test_get_bytes_from_standard_features():
+    cases = [(input_array_ABT_path, input_array_tempos, True, False, False, None, GRID_ACCURACY,
+              'test_files/test_encoder/test_2d_array.mid'),
+             (input_array_ABF_path, input_array_tempos, True, False, False, None, GRID_ACCURACY,
+              'test_files/test_encoder/test_3d_array.mid'),
+             (input_array_ABT_path, input_array_tempos, True, False, False, None, 32,
+              'test_files/test_encoder/test_custom_grid.mid'),
+             (input_array_SVTF_path, input_sequence_tempos, False, True, False,
+              [8, 8, 8, 8, 8, 8, 8, 8, 8, 8, 24, 8, 8, 8, 8, 8, 8, 4, 4, 8, 8, 8, 4, 4, 0], GRID_ACCURACY,
+              'test_files/test_encoder/test_sequences.mid')]
+    for path, tempos, join_notes, use_sequences, use_velocities, event_lengths, grid_accuracy, expected_path in cases:
+        with open(expected_path, 'rb') as file:
+            expected = file.read()
+        input_array = np.load(path, allow_pickle=True)
+        for data in [input_array, get_sparse_roll(input_array)]:
+            for backend in ENCODE_BACKENDS:
+                assert get_bytes_from_standard_features(data, tempos, join_notes, use_sequences, use_velocities,
+                                                        event_lengths, grid_accuracy, backend) == expected
+
+
+def test_get_bytes_from_standard_features_velocities():
+    input_array = np.zeros((3, 12, 128))
+    input_array[0, 2:6, 60] = 0.5
+    input_array[1, :, 64] = np.linspace(0, 1, 12)
+    input_array[2, 5:, 67] = 1.0
+    tempos = [500000] * 6 + [300000] * 6
+
+    for join_notes in [False, True]:
+        midi_file = get_midi_file_from_standard_features(input_array, tempos, join_notes, False, True)
+        buffer = io.BytesIO()
+        midi_file.save(file=buffer)
+        assert get_bytes_from_standard_features(input_array, tempos, join_notes, False, True) == buffer.getvalue()
+
+    with pytest.raises(ValueError):
+        get_bytes_from_standard_features(input_array, 500000, False, False, False, backend='music21')
+    with pytest.raises(ValueError):
+        get_bytes_from_standard_features(input_array, 2 ** 24, False, False, False)
+
+
+def test_get_bytes_from_batch():
+    input_array = np.load(input_array_ABT_path, allow_pickle=True)
+    batch = np.stack([input_array, input_array[::-1], np.zeros_like(input_array)])
+    item_tempos = [input_array_tempos, input_array_tempos[::-1], input_array_tempos]
+
+    for tempos, expected_tempos in [(500000, [500000] * 3), (input_array_tempos, [input_array_tempos] * 3),
+                                    (item_tempos, item_tempos), (np.array(item_tempos), item_tempos)]:
+        expected = [get_bytes_from_standard_features(array, array_tempos, True, False, False)
+                    for array, array_tempos in zip(batch, expected_tempos)]
+        for workers in [1, 2]:
+            assert get_bytes_from_batch(batch, tempos, True, False, False, workers=workers) == expected
+
+    with pytest.raises(IndexError):
+        get_bytes_from_batch(batch, item_tempos[:2], True, False, False)
+    with pytest.raises(TypeError):
+        get_bytes_from_batch(input_array, 500000, True, False, False)
+
+
+def test_get_bytes_from_batch_with_sequences():
+    input_array = np.load(input_array_SVTF_path, allow_pickle=True)
+    event_lengths = [8, 8, 8, 8, 8, 8, 8, 8, 8, 8, 24, 8, 8, 8, 8, 8, 8, 4, 4, 8, 8, 8, 4, 4, 0]
+    with open('test_files/test_encoder/test_sequences.mid', 'rb') as file:
+        expected = file.read()
+
+    contents = get_bytes_from_batch(np.stack([input_array] * 2), input_sequence_tempos, False, True, False,
+                                    [event_lengths, [4] * len(event_lengths)], workers=1)
+
+    assert contents[0] == expected
+    assert contents[1] == get_bytes_from_standard_features(input_array, input_sequence_tempos, False, True, False,
+                                                           [4] * len(event_lengths))
+
+
+def test_streaming_midi_writer_events():
+    input_array = np.load(input_array_SVTF_path, allow_pickle=True)
+    event_lengths = [8, 8, 8, 8, 8, 8, 8, 8, 8, 8, 24, 8, 8, 8, 8, 8, 8, 4, 4, 8, 8, 8, 4, 4, 0]
+    with open('test_files/test_encoder/test_sequences.mid', 'rb') as file:
+        expected = file.read()
+
+    writer = StreamingMidiWriter(input_sequence_tempos[0], False, False)
+    chunks = [writer.write_event(notes, length, tempo)
+              for notes, length, tempo in zip(input_array, event_lengths, input_sequence_tempos)]
+    chunks.append(writer.close())
+
+    assert chunks[0] != b''
+    assert writer.get_file() == expected
+    assert expected.endswith(b''.join(chunks))
+    with pytest.raises(ValueError):
+        writer.write_event(input_array[0])
+
+
+def test_streaming_midi_writer_steps():
+    input_array = np.zeros((12, 128))
+    input_array[2:6, 60] = 0.5
+    input_array[:, 64] = np.repeat([0.25, 1.0], 6)
+    input_array[5:, 67] = 1.0
+    tempos = [500000] * 6 + [300000] * 6
+
+    for join_notes in [False, True]:
+        for use_velocities in [False, True]:
+            writer = StreamingMidiWriter(500000, join_notes, use_velocities)
+            for notes, tempo in zip(input_array, tempos):
+                writer.write_step(notes, tempo)
+            writer.close()
+
+            assert writer.get_file() == get_bytes_from_standard_features(input_array, tempos, join_notes,
+                                                                         False, use_velocities)
+
+    writer = StreamingMidiWriter(500000, False, False)
+    with pytest.raises(IndexError):
+        writer.write_step(np.zeros(64))
+    with pytest.raises(ValueError):
+        writer.get_file()
+
+
 def test_get_file_from_music21_features_midi_mode():
     input_array = np.load(input_array_midi_path, allow_pickle=True)
     get_file_from_music21_features(input_array, encode_file_path, False, True)
@@ -0,0 +1,59 @@
+import numpy as np
+
+from midi.decode import get_array_of_notes
+from midi.encode import get_file_from_standard_features
+from midi.instrument import *
+
+# one-time setup
+file_polyphony_folder = 'test_files/test_polyphony/'
+file_2_name = 'test_tempos_velocities_and_polyphony'
+
+
+def test_instrumentation_report():
+    path = file_polyphony_folder + file_2_name + '.mid'
+    with Instrumentation() as instrumentation:
+        _ = get_array_of_notes(path, False, True, backend='mido')
+        _ = get_array_of_notes(path, True, False, backend='numpy')
+    report = instrumentation.get_report()
+
+    assert report['get_array_of_notes']['calls'] == 2
+    for stage in ['open_file', 'combine_and_clean_tracks', 'get_event_sequences', 'normalise',
+                  'get_dense_array_of_notes', 'open_events', 'get_event_sequences_from_arrays']:
+        assert report[stage]['calls'] >= 1
+        assert 0 < report[stage]['time'] <= report['get_array_of_notes']['time']
+        assert report[stage]['peak'] <= report['get_array_of_notes']['peak']
+    assert report['get_array_of_notes']['peak'] > 0
+    assert not active_instrumentations
+
+
+def test_instrumentation_traces(tmpdir):
+    path = file_polyphony_folder + file_2_name + '.mid'
+    with Instrumentation(trace_memory=False) as instrumentation:
+        array = get_array_of_notes(path, False, True)
+        with open(path, 'rb') as file:
+            _ = get_array_of_notes(file.read(), False, True)
+        get_file_from_standard_features(array, 500000, tmpdir / 'output.mid', False, False, False)
+    traces = instrumentation.get_traces()
+
+    assert [trace['name'] for trace in traces] == [file_2_name, '', 'output']
+    assert [trace['index'] for trace in traces] == [0, 1, 2]
+    assert traces[0]['stages'][-1] == 'get_array_of_notes' and traces[0]['depths'][-1] == 0
+    assert all(depth > 0 for depth in traces[0]['depths'][:-1])
+    assert 'save' in traces[2]['stages']
+    assert all(peak == 0 for trace in traces for peak in trace['peaks'])
+    assert traces[0]['starts'][-1] == min(traces[0]['starts'])  # the outermost stage begins first
+
+
+def test_record_stage():
+    with record_stage('inactive'):
+        pass
+
+    with Instrumentation() as instrumentation:
+        with record_stage('outer', 'file'):
+            with record_stage('inner'):
+                _ = np.zeros(10 ** 6, dtype=np.uint8)
+
+    assert instrumentation.calls == {'inner': 1, 'outer': 1}
+    assert instrumentation.peaks['outer'] >= instrumentation.peaks['inner'] >= 10 ** 6
+    assert [record.stage for record in instrumentation.traces[0].records] == ['inner', 'outer']
+    assert [record.depth for record in instrumentation.traces[0].records] == [1, 0]
@@ -187,3 +187,12 @@ def test_get_tonal_features_file_2():
 
     assert isinstance(out_array, np.ndarray)
     assert np.array_equal(out_array, tonal_array)
+
+
+def test_get_tonal_features_from_stream():
+    with open(file2_path, 'rb') as file:
+        out_array = get_tonal_features(file)
+    tonal_array = np.load(output_2_tonal_path, allow_pickle=True)
+
+    assert isinstance(out_array, np.ndarray)
+    assert np.array_equal(out_array, tonal_array)
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from midi.roll import *
+
+# one-time setup
+input_array_ABF_path = 'test_files/test_polyphony/ABF.npy'
+input_array_AVT_path = 'test_files/test_polyphony/AVT.npy'
+
+
+def test_get_sparse_roll():
+    array = np.zeros((3, 128), dtype=np.float_)
+    array[0, 60] = 0.5
+    array[0, 64] = 0.25
+    array[2, 67] = 1.0
+    roll = get_sparse_roll(array)
+
+    assert isinstance(roll, SparseRoll)
+    assert roll.shape == (3, 128)
+    assert roll.dtype == np.float_
+    assert roll.indptr.tolist() == [0, 2, 2, 3]
+    assert roll.indices.tolist() == [60, 64, 67]
+    assert roll.data.tolist() == [0.5, 0.25, 1.0]
+
+
+def test_get_sparse_roll_incorrect():
+    with pytest.raises(TypeError):
+        _ = get_sparse_roll(np.zeros(128))
+
+
+def test_class_sparse_roll_init_incorrect():
+    with pytest.raises(ValueError):
+        _ = SparseRoll((2, 128), np.zeros(2, dtype=np.int64), np.zeros(0, dtype=np.uint8), np.zeros(0))
+
+
+def test_class_sparse_roll_to_dense():
+    for path in [input_array_ABF_path, input_array_AVT_path]:
+        array = np.load(path, allow_pickle=True)
+        roll = get_sparse_roll(array)
+        out_array = roll.to_dense()
+
+        assert np.array_equal(array, out_array)
+        assert array.dtype == out_array.dtype
+        assert roll.nbytes < array.nbytes
+
+
+def test_class_sparse_roll_get_track():
+    array = np.load(input_array_ABF_path, allow_pickle=True)
+    roll = get_sparse_roll(array)
+
+    for i in range(array.shape[0]):
+        assert np.array_equal(roll.get_track(i).to_dense(), array[i])
+
+    with pytest.raises(TypeError):
+        _ = roll.get_track(0).get_track(0)
+
+
+def test_class_sparse_roll_arrays():
+    roll = get_sparse_roll(np.load(input_array_AVT_path, allow_pickle=True))
+    out_roll = SparseRoll.from_arrays(roll.get_arrays())
+
+    assert out_roll.shape == roll.shape
+    assert np.array_equal(out_roll.to_dense(), roll.to_dense())
+
+
+def test_pack_roll():
+    array = np.load(input_array_ABF_path, allow_pickle=True)
+    packed = pack_roll(array)
+
+    assert packed.shape == array.shape[:-1] + (PACKED_NOTES,)
+    assert packed.dtype == np.uint8
+    assert packed.nbytes * 8 == array.nbytes
+    assert np.array_equal(unpack_roll(packed), array)
+
+    with pytest.raises(TypeError):
+        _ = pack_roll(array.astype(np.float_))
@@ -0,0 +1,168 @@
+import io
+import pytest
+import numpy as np
+
+from midi.smf import *
+from mido import Message, MidiFile, MidiTrack
+
+# one-time setup
+file_polyphony_folder = 'test_files/test_polyphony/'
+file_types_folder = 'test_files/test_types/'
+
+file_2_name = 'test_tempos_velocities_and_polyphony'
+file_4_name = 'test_type_1_corrupt'
+file_6_name = 'test_type_1_untrimmed'
+
+
+def test_read_variable_int():
+    value, position = read_variable_int(bytes([0x00, 0x81, 0x80, 0x00, 0x7f]), 1)
+
+    assert value == 16384
+    assert position == 4
+
+
+def test_read_smf_matches_mido():
+    path = file_polyphony_folder + file_2_name + '.mid'
+    smf_file = read_smf_file(path)
+    mido_file = MidiFile(path)
+
+    assert isinstance(smf_file, SmfFile)
+    assert smf_file.type == mido_file.type
+    assert smf_file.ticks_per_beat == mido_file.ticks_per_beat
+    assert smf_file.notated_32nd_notes_per_beat == 8
+    assert smf_file.track_sizes.tolist() == [len(track) for track in mido_file.tracks]
+    assert smf_file.track_ticks.tolist() == [sum(msg.time for msg in track) for track in mido_file.tracks]
+
+    for index, track in enumerate(mido_file.tracks):
+        expected = list[tuple[int, int, int, int]]()
+        ticks = 0
+        for msg in track:
+            ticks += msg.time
+            if msg.type == 'note_on':
+                expected.append((ticks, EVENT_NOTE_ON, msg.note, msg.velocity))
+            elif msg.type == 'note_off':
+                expected.append((ticks, EVENT_NOTE_OFF, msg.note, msg.velocity))
+            elif msg.type == 'set_tempo':
+                expected.append((ticks, EVENT_SET_TEMPO, 0, 0))
+
+        events = smf_file.get_track(index)
+        assert list(zip(events['abs_tick'].tolist(), events['type'].tolist(),
+                        events['note'].tolist(), events['velocity'].tolist())) == expected
+
+    tempo_events = smf_file.events[smf_file.events['type'] == EVENT_SET_TEMPO]
+    assert tempo_events['tempo'].tolist() == [500000, 555555, 500000]
+
+
+def test_read_smf_running_status():
+    data = bytes.fromhex('4d546864000000060001000100c0'
+                         '4d54726b0000000b' '00903c40' '10' '3c00' '00ff2f00')
+    smf_file = read_smf(data)
+
+    assert smf_file.track_sizes.tolist() == [3]
+    assert smf_file.events['abs_tick'].tolist() == [0, 16]
+    assert smf_file.events['velocity'].tolist() == [64, 0]
+
+
+def test_read_smf_corrupt():
+    with pytest.raises(OSError):
+        _ = read_smf_file(file_types_folder + file_4_name + '.mid')
+
+
+def test_read_smf_truncated():
+    with open(file_types_folder + file_6_name + '.mid', 'rb') as file:
+        data = file.read()
+
+    with pytest.raises(EOFError):
+        _ = read_smf(data[:-5])
+
+
+def test_scan_smf():
+    with open(file_polyphony_folder + file_2_name + '.mid', 'rb') as file:
+        data = file.read()
+    smf_file = read_smf(data)
+    scanned_file, readers = scan_smf(data)
+
+    assert len(scanned_file.events) == 0
+    assert scanned_file.track_sizes.tolist() == smf_file.track_sizes.tolist()
+    assert scanned_file.track_ticks.tolist() == smf_file.track_ticks.tolist()
+    assert scanned_file.notated_32nd_notes_per_beat == smf_file.notated_32nd_notes_per_beat
+    assert all(reader.finished for reader in readers)
+
+    # tracks read again in parts give the same events
+    for reader in readers:
+        reader = reader.rewound()
+        rows = list[Tuple[int, int, int, int, int, int, int]]()
+        tick_limit = 0
+        while not reader.finished:
+            reader.read(rows, tick_limit)
+            tick_limit += 50
+        assert np.array_equal(np.array(rows, dtype=EVENT_DTYPE), smf_file.get_track(reader.track))
+
+
+def test_read_smf_limited():
+    with open(file_polyphony_folder + file_2_name + '.mid', 'rb') as file:
+        data = file.read()
+    smf_file = read_smf(data)
+    limited_file = read_smf(data, 8, 5)
+
+    assert limited_file.truncated.tolist() == [False, True, True, True, False]
+    assert not smf_file.truncated.any()
+    assert np.all(limited_file.track_sizes >= 5)
+    for index in range(len(smf_file.track_sizes)):
+        events = smf_file.get_track(index)
+        limited_events = limited_file.get_track(index)
+        assert np.array_equal(events[:len(limited_events)], limited_events)
+        assert len(limited_events) < len(events) if limited_file.truncated[index] else \
+            np.array_equal(events, limited_events)
+
+
+def test_read_smf_limited_note_off():
+    data = list[bytes]()
+    for late_note_off in [False, True]:
+        track = MidiTrack()
+        for _ in range(20):
+            track.append(Message('note_on', note=60, velocity=64, time=10))
+            track.append(Message('note_on', note=60, velocity=0, time=10))
+        track.append(Message('note_off' if late_note_off else 'note_on', note=60, velocity=0, time=10))
+
+        file = io.BytesIO()
+        MidiFile(type=1, tracks=[MidiTrack(), track]).save(file=file)
+        data.append(file.getvalue())
+
+    # with 'note_on' messages only, velocity == 0 marks 'note_off' unless a track has 'note_off' messages
+    assert read_smf(data[0], 1).truncated.tolist() == [False, True]
+    assert read_smf(data[1], 1).truncated.tolist() == [False, False]
+    assert len(read_smf(data[1], 1).get_track(1)) == 41
+
+
+def test_write_variable_int():
+    for value in [0, 1, 127, 128, 16383, 16384, 2 ** 28]:
+        data = write_variable_int(value)
+        assert read_variable_int(data, 0) == (value, len(data))
+
+    with pytest.raises(ValueError):
+        write_variable_int(-1)
+
+
+def test_write_smf_matches_mido():
+    messages = [Message('note_on', note=60, velocity=64, time=0), Message('note_on', note=64, velocity=80, time=0),
+                Message('note_off', note=60, velocity=0, time=200), Message('note_on', note=60, velocity=0, time=20000),
+                Message('note_on', note=62, channel=3, velocity=1, time=2 ** 21)]
+    mido_file = MidiFile()
+    mido_file.tracks.append(MidiTrack(messages))
+    mido_file.tracks.append(MidiTrack())
+    buffer = io.BytesIO()
+    mido_file.save(file=buffer)
+
+    track = write_channel_messages(np.array([message.time for message in messages]),
+                                   np.array([message.bytes()[0] for message in messages]),
+                                   np.array([message.note for message in messages]),
+                                   np.array([message.velocity for message in messages]))
+    end_of_track = write_meta_message(0, META_END_OF_TRACK, b'')
+    data = write_smf(1, mido_file.ticks_per_beat, [track + end_of_track, end_of_track])
+
+    assert data == buffer.getvalue()
+    assert read_smf(data).track_sizes.tolist() == [6, 1]
+    assert write_channel_messages(np.zeros(0, dtype=np.int64), *[np.zeros(0, dtype=np.uint8)] * 3) == b''
+    assert write_channel_messages(np.array([0]), np.array([0x90]), np.array([60]), np.array([0]), 0x90) == \
+        bytes([0x00, 60, 0])
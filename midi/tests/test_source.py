@@ -0,0 +1,19 @@
+import io
+import pathlib
+
+from midi.source import *
+
+
+def test_is_path():
+    assert is_path('test/relative/path/file.mid')
+    assert is_path(pathlib.Path('file.mid'))
+    assert not is_path(b'MThd')
+    assert not is_path(io.BytesIO(b'MThd'))
+
+
+def test_get_source_name():
+    assert get_source_name('test_files/test_polyphony/test_tempos_velocities_and_polyphony.mid') == \
+        'test_tempos_velocities_and_polyphony'
+    assert get_source_name(pathlib.Path('output/sample.midi')) == 'sample'
+    assert get_source_name(b'MThd') == ''
+    assert get_source_name(io.BytesIO(b'MThd')) == ''
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from functools import partial
+from midi.decode import get_array_of_notes, get_notes_matrices, prepare_file_with_offsets
+from midi.store import *
+
+# one-time setup
+file_polyphony_folder = 'test_files/test_polyphony/'
+file_types_folder = 'test_files/test_types/'
+
+file_2_name = 'test_tempos_velocities_and_polyphony'
+file_4_name = 'test_type_1_corrupt'
+file_6_name = 'test_type_1_untrimmed'
+
+paths = [file_polyphony_folder + file_2_name + '.mid',
+         file_types_folder + file_4_name + '.mid',
+         file_types_folder + file_6_name + '.mid']
+
+
+def test_decode_notes():
+    for use_velocities, join_tracks, packed in [(False, False, False), (False, True, True), (True, False, False)]:
+        for backend in ['mido', 'numpy']:
+            array, tempo_map = decode_notes(paths[0], use_velocities, join_tracks, backend, packed)
+            assert np.array_equal(array, get_array_of_notes(paths[0], use_velocities, join_tracks, packed=packed))
+            assert tempo_map == prepare_file_with_offsets(paths[0], join_tracks)[4]
+
+    matrix, tempo_map = decode_notes(paths[0], True, True, dtype=np.float16)
+    _, expected_matrix = get_notes_matrices(paths[0], True, True, np.float16)
+
+    assert np.array_equal(matrix, expected_matrix)
+    assert matrix.dtype == np.float16
+    assert tempo_map == prepare_file_with_offsets(paths[0], True)[4]
+
+    with pytest.raises(ValueError):
+        _ = decode_notes(paths[0], True, False, dtype=np.float16)
+    with pytest.raises(ValueError):
+        _ = decode_notes(paths[0], True, True, packed=True)
+
+
+def test_build_corpus_store(tmpdir):
+    for join_tracks in [False, True]:
+        decoder = partial(decode_notes, use_velocities=False, join_tracks=join_tracks, packed=True)
+        store = build_corpus_store(paths, tmpdir, decoder, 1, lambda i, path, ex: None)
+        opened_store = CorpusStore(tmpdir)
+
+        for current_store in [store, opened_store]:
+            assert len(current_store) == 2
+            assert current_store.sources.tolist() == [0, 2]
+            assert current_store.names.tolist() == [file_2_name, file_6_name]
+            assert current_store.decoder == get_decoder_name(decoder)
+
+            for index, source in zip(range(len(current_store)), [0, 2]):
+                array, tempo_map = decoder(paths[source])
+                assert np.array_equal(current_store[index], array)
+                assert current_store[index].dtype == np.uint8
+                assert current_store.get_tempo_map(index) == tempo_map
+
+
+def test_corpus_store_views(tmpdir):
+    decoder = partial(decode_notes, use_velocities=False, join_tracks=True)
+    store = build_corpus_store(paths, tmpdir, decoder, 1, lambda i, path, ex: None)
+
+    assert isinstance(store.rows, np.memmap)
+    assert np.shares_memory(store[0], store.rows)
+    assert not store[0].flags.writeable
+    with pytest.raises(IndexError):
+        _ = store[2]
+
+
+def test_corpus_store_empty(tmpdir):
+    decoder = partial(decode_notes, use_velocities=False, join_tracks=True)
+    store = build_corpus_store(paths[1:2], tmpdir, decoder, 1, lambda i, path, ex: None)
+
+    assert len(store) == 0
+    assert list(store) == []
+
+
+def test_corpus_store_corrupted(tmpdir):
+    decoder = partial(decode_notes, use_velocities=False, join_tracks=True)
+    _ = build_corpus_store(paths, tmpdir, decoder, 1)
+    with open(tmpdir / STORE_ROWS_NAME, 'ab') as file:
+        file.write(b'\x00')
+
+    with pytest.raises(ValueError):
+        _ = CorpusStore(tmpdir)
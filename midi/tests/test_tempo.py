@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from midi.tempo import *
+
+# one-time setup
+expected_tempos = [500000] * 80
+expected_tempos.extend([555555] * 64)
+expected_tempos.extend([500000] * 49)
+
+
+def test_tempo_map():
+    tempo_map = TempoMap(np.array([0, 80, 80, 144, 150, 200]), np.array([500000, 400000, 555555, 500000, 500000, 1]),
+                         193)
+
+    assert tempo_map.offsets.tolist() == [0, 80, 144]
+    assert tempo_map.tempos.tolist() == [500000, 555555, 500000]
+    assert len(tempo_map) == 193
+    assert tempo_map.to_list() == expected_tempos
+
+
+def test_tempo_map_indexing():
+    tempo_map = TempoMap.from_array(expected_tempos)
+
+    assert tempo_map[0] == 500000
+    assert tempo_map[80] == 555555
+    assert tempo_map[192] == 500000
+    assert tempo_map.get_tempos(np.array([79, 80, 143, 144])).tolist() == [500000, 555555, 555555, 500000]
+    with pytest.raises(IndexError):
+        _ = tempo_map[193]
+    with pytest.raises(IndexError):
+        _ = tempo_map[-1]
+
+
+def test_tempo_map_from_array():
+    tempo_map = TempoMap.from_array(expected_tempos)
+
+    assert tempo_map == TempoMap(np.array([0, 80, 144]), np.array([500000, 555555, 500000]), 193)
+    assert np.array_equal(tempo_map.to_array(), expected_tempos)
+    assert TempoMap.from_array([]).to_list() == []
+
+
+def test_tempo_map_from_changes():
+    tempo_map = TempoMap.from_changes(np.array([-5, 80, 144, 300]), np.array([500000, 555555, 500000, 1]), 193,
+                                      initial_tempo=1)
+
+    assert tempo_map.to_list() == expected_tempos
+
+
+def test_tempo_map_from_event_lengths():
+    tempo_map = TempoMap.from_event_lengths([500000, 555555, 500000, 1], [80, 64, 49, -2])
+
+    assert tempo_map.to_list() == expected_tempos
+
+
+def test_get_accumulated_time():
+    for accuracy in [float(15), 4 * 480 / 36, 4 * 96 / 7]:
+        for time in [float(0), 0.3, 1e6 + 0.1]:
+            expected_time = time
+            for units in range(200):
+                assert get_accumulated_time(time, accuracy, units) == expected_time
+                expected_time += accuracy
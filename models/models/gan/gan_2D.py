@@ -1,5 +1,6 @@
 import os
 import random
+from functools import partial
 from pathlib import Path
 from typing import Any
 
@@ -10,8 +11,11 @@ from keras.layers import (Activation, BatchNormalization, Conv1D,
                           GaussianNoise, LeakyReLU, Reshape)
 from keras.models import Sequential, load_model
 from keras.optimizers import Adam
+from midi.corpus import Decoder
 from midi.decode import get_array_of_notes
-from midi.encode import get_file_from_standard_features
+from midi.encode import get_bytes_from_standard_features
+from midi.roll import PACKED_NOTES, unpack_roll
+from midi.store import StoreDecoder, decode_notes
 from sklearn.utils import shuffle
 
 from models.music_model import MusicModel, ProgressCallback, ProgressMetadata
@@ -47,25 +51,31 @@ class GAN(MusicModel):
     data: np.ndarray
 
     def __init__(self) -> None:
-        self.data = np.zeros((0, AVG, 128), dtype=np.float16)
+        self.data = np.zeros((0, AVG, PACKED_NOTES), dtype=np.uint8)  # bit-packed samples, see midi.roll.pack_roll
         self.discriminator = self.define_discriminator()
         self.generator = self.define_generator(LATENT_DIM)
         self.model = self.define_gan(self.generator, self.discriminator)
 
-    def prepare_data(self, midi_file: Path) -> tuple[Any, Any]:
-        data_lines = get_array_of_notes(midi_file, False, True)
-        assert data_lines.shape[1] == 128, "Incorrect number of notes (expected: 128)"
+    def get_decoder(self) -> Decoder:
+        return partial(get_array_of_notes, use_velocities=False, join_tracks=True, packed=True)
+
+    def get_store_decoder(self) -> StoreDecoder:
+        return partial(decode_notes, use_velocities=False, join_tracks=True, packed=True)
+
+    def prepare_decoded(self, decoded: Any) -> tuple[Any, Any]:
+        data_lines: np.ndarray = decoded
+        assert data_lines.shape[1] == PACKED_NOTES, "Incorrect number of packed notes (expected: 16 bytes)"
 
         for i in range(data_lines.shape[0]//OFFSET - 1):
             # maximum number of samples
             if (self.data.shape[0] > 5000):
                 break
-            data_processed = np.zeros((1, AVG, 128))
-            # divide data into chunks (AVG x 128)
+            data_processed = np.zeros((1, AVG, PACKED_NOTES), dtype=np.uint8)
+            # divide data into chunks (AVG x 128 notes, packed into AVG x 16 bytes)
             if (data_lines.shape[0]) > AVG*(i+1):
                 data_processed[0] = data_lines[AVG*i: AVG*(i+1), ]
 
-            self.data = np.array(np.append(self.data, data_processed, axis=0), dtype=np.float16)
+            self.data = np.append(self.data, data_processed, axis=0)
 
         # y: 1 - the image is real, 0 - the image is fake
         return data_lines, 1
@@ -181,9 +191,7 @@ class GAN(MusicModel):
 
     def generate_real_samples(self, dataset: np.ndarray, n_samples: int) -> tuple[Any, Any]:
         ix = np.random.randint(0, len(dataset), n_samples)
-        x = np.array(dataset)[ix]
-        for i in range(ix.shape[0]):
-            x[i] = np.asarray(x[i], dtype=np.float16)
+        x = np.asarray(unpack_roll(dataset[ix]), dtype=np.float16)
 
         y = np.ones((n_samples, 1))
 
@@ -257,14 +265,14 @@ class GAN(MusicModel):
                 # if checkpoint_path is not None:
                 #     self.save_models(checkpoint_path, self.model, step)
 
-    def generate(self, path: Path, seed: int | None = None) -> None:
+    def generate_bytes(self, seed: int | None = None) -> bytes:
         if (isinstance(seed, int)):
             x_fake, y_fake = self.generate_fake_samples(self.generator, LATENT_DIM, 1, seed)
         else:
             x_fake, y_fake = self.generate_fake_samples(self.generator, LATENT_DIM, 1, GLOBAL_SEED)
 
         x_array = self.postprocess_array(x_fake[0])
-        get_file_from_standard_features(x_array, 500000, path, True, False, False)
+        return get_bytes_from_standard_features(x_array, 500000, True, False, False)
 
     @staticmethod
     def get_progress_metadata() -> ProgressMetadata:
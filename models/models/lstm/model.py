@@ -1,5 +1,6 @@
+from functools import partial
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
 
 import numpy as np
 from keras import Model
@@ -9,8 +10,10 @@ from keras.layers import (LSTM, Activation, BatchNormalization, Dense, Dropout,
                           RepeatVector)
 from keras.models import load_model
 from midi.bach import download_clean_dataset
+from midi.corpus import Decoder
 from midi.decode import get_sequence_of_notes
-from midi.encode import get_file_from_standard_features
+from midi.encode import StreamingMidiWriter
+from midi.store import StoreDecoder, decode_notes
 
 from models.loss_callback import LossCallback
 
@@ -116,10 +119,20 @@ class MusicLstm(MusicModel):
         return np.asarray(notes_input), np.asarray(notes_output)
         # return [x for (x, y) in dataset], [y for (x, y) in dataset]
 
-    def prepare_data(self, midi_file: Path) -> tuple[Any, Any]:
-        midi_input: list[tuple[int, list[bool]]] = get_sequence_of_notes(str(midi_file), False, True, False)
+    def get_decoder(self) -> Decoder:
+        # notes come as a float16 matrix (events x 128), without lists of 128 booleans for each event
+        return partial(get_sequence_of_notes, use_velocities=False, join_tracks=True, only_active_notes=False,
+                       dtype=np.float16)
 
-        notes_matrix = np.array([notes for (_, notes) in midi_input], dtype='float')
+    def get_store_decoder(self) -> StoreDecoder:
+        return partial(decode_notes, use_velocities=False, join_tracks=True, dtype=np.float16)
+
+    def prepare_stored(self, stored: np.ndarray) -> tuple[Any, Any]:
+        # a stored notes matrix comes without event lengths, which are not used
+        return self.prepare_decoded((None, stored))
+
+    def prepare_decoded(self, decoded: Any) -> tuple[Any, Any]:
+        _, notes_matrix = decoded
 
         notes_sequences = np.lib.stride_tricks.sliding_window_view(
             notes_matrix[:-1], (self.sequence_length, self._NOTES_SPAN)).squeeze()
@@ -152,11 +165,13 @@ class MusicLstm(MusicModel):
     def load(self, path: Path) -> None:
         self.model = load_model(path)
 
-    def generate(self, path: Path, seed: int | None = None) -> None:
+    def generate_stream(self, writer: StreamingMidiWriter, seed: int | None = None) -> Iterator[bytes]:
+        """
+        Generates a sample event by event with `writer`, yielding bytes of its track as soon as
+        each event is generated (see StreamingMidiWriter).
+        """
         np.random.seed(seed)
 
-        gen = []
-
         # we need some initial sequence, so we just generate a scale
         x = np.zeros((1, self.sequence_length, self._NOTES_SPAN))
         for i in range(self.sequence_length):
@@ -165,13 +180,12 @@ class MusicLstm(MusicModel):
         for _ in range(100):
             o = self.model(x)[0]
             thresh = np.random.random(len(o))
-            o = o > thresh
-            gen.append(o)
+            o = np.asarray(o > thresh)
+            yield writer.write_event(o, 8)
             a = np.array(o, dtype='float').reshape((1, 1, self._NOTES_SPAN))
             x = np.concatenate((x[:, 1:, :], a), axis=1)
 
-        lens = [8 for _ in gen]
-        get_file_from_standard_features(np.array(gen), 1000000, path, False, True, False, lens)
+        yield writer.close()
 
 
 if __name__ == '__main__':
@@ -1,11 +1,15 @@
 import random
 import time
+from functools import partial
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
 
 import numpy as np
+from midi.corpus import Decoder
 from midi.decode import get_array_of_notes
-from midi.encode import get_file_from_standard_features
+from midi.encode import StreamingMidiWriter
+from midi.roll import unpack_roll
+from midi.store import StoreDecoder, decode_notes
 
 from models.music_model import MusicModel, ProgressCallback, ProgressMetadata
 
@@ -73,19 +77,23 @@ class MarkovChain(MusicModel):
     def generate_tokens(self) -> None:
 
         for i in range(len(self.data)):
-            for j in range(len(self.data[i])):
-                notes = []
-                for k in range(128):
-                    if self.data[i][j][k]:
-                        notes.append(k)
-
-                self.data[i][j] = tuple(notes)
-                self.tokens.add(tuple(notes))
-
-    def prepare_data(self, midi_file: Path) -> tuple[Any, Any]:
-        data_lines = get_array_of_notes(midi_file, False, False)
-        for i in range(len(data_lines)):  # serialize tracks
-            self.data.append(data_lines[i].tolist())
+            # equal steps are found by their packed bytes, each distinct step is unpacked only once
+            steps, step_indices = np.unique(self.data[i], axis=0, return_inverse=True)
+            step_tokens = [tuple(np.flatnonzero(notes).tolist()) for notes in unpack_roll(steps)]
+
+            self.data[i] = [step_tokens[j] for j in step_indices.reshape(-1).tolist()]
+            self.tokens.update(step_tokens)
+
+    def get_decoder(self) -> Decoder:
+        return partial(get_array_of_notes, use_velocities=False, join_tracks=False, packed=True)
+
+    def get_store_decoder(self) -> StoreDecoder:
+        return partial(decode_notes, use_velocities=False, join_tracks=False, packed=True)
+
+    def prepare_decoded(self, decoded: Any) -> tuple[Any, Any]:
+        data_lines: np.ndarray = decoded
+        for i in range(len(data_lines)):  # serialize tracks, kept bit-packed (16 bytes per step) until tokenized
+            self.data.append(data_lines[i])
         return 0, 0
 
     def save(self, path: Path) -> None:
@@ -115,28 +123,37 @@ class MarkovChain(MusicModel):
                 str(len(self.n_grams_list)) + " n_grams\n" +
                 str(len(self.data)) + " files")
 
-    def generate(self, path: Path, seed: int | None = None) -> None:
-
+    def generate_stream(self, writer: StreamingMidiWriter, seed: int | None = None) -> Iterator[bytes]:
+        """
+        Generates a sample token by token with `writer`, yielding bytes of its track as soon as
+        each token is predicted (see StreamingMidiWriter).
+        """
         assert len(self.tokens_list) > 0, "Model was not initiated with data"
 
         if seed is not None:
             random.seed(seed)
 
-        result = self.predict(random.choice(self.tokens_list), 512, False, 0)
-        get_file_from_standard_features(
-            result, 1000000, path, False, True, False, [8 for _ in result])
+        for step in self.predict_steps(random.choice(self.tokens_list), 512, False, 0):
+            yield writer.write_event(step, 8)
+
+        yield writer.close()
 
     def predict(self, initial_notes: tuple, length: int, deterministic: bool, rand: int) -> np.ndarray:
+        steps = list(self.predict_steps(initial_notes, length, deterministic, rand))
+        return np.array(steps, dtype=np.bool_).reshape(len(steps), 128)
+
+    def predict_steps(self, initial_notes: tuple, length: int, deterministic: bool,
+                      rand: int) -> Iterator[np.ndarray]:
 
         # deterministic - if True, next note will be always note with maximum probability
         #               - if False, next note will be sampled according to all notes probability
         # rand - % chance of selecting random token next (int [0;100])
+        # steps (128 notes each) are yielded as soon as they are predicted
 
-        prediction = []
         previous_n_gram = initial_notes
 
         for i in range(len(initial_notes)):
-            prediction.append(initial_notes[i])
+            yield self.get_step(initial_notes[i])
 
         # generating length - initial_token
         for i in range(length - len(self.tokens_list[0])):
@@ -160,20 +177,20 @@ class MarkovChain(MusicModel):
                 next_note = random.choices(
                     list(probs.keys()), weights=probs.values(), k=1)[0]
 
-            prediction.append(next_note)
+            yield self.get_step(next_note)
             if next_note is not None:
                 previous_n_gram = next_note
 
-        result = np.full((len(prediction), 128), False)
-        for i in range(len(prediction)):
-            if isinstance(prediction[i], int):
-                result[i][prediction[i]] = True
-            else:
-                for j in range(len(prediction[i])):
-                    note = prediction[i][j]
-                    result[i][note] = True
-
-        return result
+    @staticmethod
+    def get_step(token: Any) -> np.ndarray:
+        step = np.full(128, False)
+        if isinstance(token, int):
+            step[token] = True
+        else:
+            for j in range(len(token)):
+                step[token[j]] = True
+
+        return step
 
     @staticmethod
     def get_progress_metadata() -> ProgressMetadata:
@@ -1,9 +1,14 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Callable, TypeAlias
+from typing import Any, Callable, Iterator, Sequence, TypeAlias
 
+import numpy as np
 from dataclasses_json import dataclass_json
+from midi.corpus import Decoder, decode_corpus
+from midi.decode import MidiSource
+from midi.encode import StreamingMidiWriter
+from midi.store import CorpusStore, StoreDecoder, build_corpus_store, get_decoder_name
 
 
 @dataclass(frozen=True)
@@ -44,13 +49,45 @@ class MusicModel(ABC):
         """
         raise NotImplementedError
 
-    def train_on_files(self, midi_files: list[Path], epochs: int | None, progress_callback: CompleteProgressCallback,
-                       checkpoint_path: Path | None = None) -> None:
+    def train_on_files(self, midi_files: Sequence[MidiSource], epochs: int | None,
+                       progress_callback: CompleteProgressCallback, checkpoint_path: Path | None = None,
+                       workers: int = 1) -> None:
         """
-        Trains the model on a given set of files.
+        Trains the model on a given set of files. Files can be given as paths or as in-memory midi content.
+        With `workers` > 1 files are decoded in parallel processes. Files that cannot be decoded are skipped.
         """
 
-        dataset = [self.prepare_data(f) for f in midi_files]
+        dataset = [self.prepare_decoded(decoded)
+                   for _, decoded in decode_corpus(midi_files, self.get_decoder(), workers)]
+        self.train_on_dataset(dataset, epochs, progress_callback, checkpoint_path)
+
+    def build_store(self, midi_files: Sequence[MidiSource], directory: Path, workers: int = 1) -> CorpusStore:
+        """
+        Decodes a given set of files once into a corpus store in `directory`, which can be used by `train_on_store`
+        of any number of training processes instead of decoding the files again.
+        """
+        return build_corpus_store(midi_files, directory, self.get_store_decoder(), workers)
+
+    def train_on_store(self, store: CorpusStore | Path, epochs: int | None,
+                       progress_callback: CompleteProgressCallback, checkpoint_path: Path | None = None) -> None:
+        """
+        Trains the model on files of a corpus store built by `build_store`. Decoded files are read-only views
+        of the memory-mapped store, shared by all processes using it.
+        """
+        store = store if isinstance(store, CorpusStore) else CorpusStore(store)
+        if store.decoder != get_decoder_name(self.get_store_decoder()):
+            raise ValueError(f'Corpus store was built with a different decoder: {store.decoder}')
+
+        dataset = [self.prepare_stored(stored) for stored in store]
+        self.train_on_dataset(dataset, epochs, progress_callback, checkpoint_path)
+
+    def train_on_dataset(self, dataset: list[tuple[Any, Any]], epochs: int | None,
+                         progress_callback: CompleteProgressCallback, checkpoint_path: Path | None = None) -> None:
+        """
+        Trains the model on outputs of `prepare_decoded` of a set of files.
+        """
+        if not dataset:
+            raise ValueError('None of the given midi files could be decoded')
         x_train, y_train = self.create_dataset(dataset)
 
         self.train(epochs, x_train, y_train, lambda x: progress_callback(TrainingProgress(finished=False, series=x)),
@@ -74,12 +111,41 @@ class MusicModel(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    def prepare_data(self, midi_file: Path) -> tuple[Any, Any]:
+    def get_decoder(self) -> Decoder:
+        """
+        Returns a function decoding a single midi file. It is run in worker processes, so it has to be picklable
+        (e.g. a `functools.partial` of a `midi.decode` function).
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_store_decoder(self) -> StoreDecoder:
+        """
+        Returns a function decoding a single midi file into an array together with its tempo map, stored by
+        `build_store` (e.g. a `functools.partial` of `midi.store.decode_notes`).
+        """
+        raise NotImplementedError
+
+    def prepare_stored(self, stored: np.ndarray) -> tuple[Any, Any]:
+        """
+        Given an array of a single file read from a corpus store returns prepared input/output.
+        By default, the array is prepared as an output of the `get_decoder` function.
+        """
+        return self.prepare_decoded(stored)
+
+    @abstractmethod
+    def prepare_decoded(self, decoded: Any) -> tuple[Any, Any]:
         """
-        Given a path to a midi file returns prepared input/output.
+        Given an output of the `get_decoder` function returns prepared input/output.
         """
         raise NotImplementedError
 
+    def prepare_data(self, midi_file: MidiSource) -> tuple[Any, Any]:
+        """
+        Given a path to a midi file (or its in-memory content) returns prepared input/output.
+        """
+        return self.prepare_decoded(self.get_decoder()(midi_file))
+
     @abstractmethod
     def model_summary(self) -> str:
         """
@@ -101,9 +167,34 @@ class MusicModel(ABC):
         """
         raise NotImplementedError
 
-    @abstractmethod
+    def create_writer(self) -> StreamingMidiWriter:
+        """
+        Returns a writer encoding a sample generated by `generate_stream`.
+        """
+        return StreamingMidiWriter(1000000, False, False)
+
+    def generate_stream(self, writer: StreamingMidiWriter, seed: int | None = None) -> Iterator[bytes]:
+        """
+        Generates a sample step by step with `writer`, returning an iterator of bytes of its track, each yielded
+        as soon as its step is generated; `writer.get_file()` returns the whole '.mid' file once it is exhausted.
+        Models generating whole samples at once do not override it.
+        """
+        raise NotImplementedError
+
+    def generate_bytes(self, seed: int | None = None) -> bytes:
+        """
+        Generates a sample and returns the content of its '.mid' file, without using the file system.
+        By default, the sample is generated by `generate_stream`.
+        """
+        writer = self.create_writer()
+        for _ in self.generate_stream(writer, seed):  # the writer keeps all chunks of the track
+            pass
+        return writer.get_file()
+
     def generate(self, path: Path, seed: int | None = None) -> None:
         """
         Generates a sample and saves it as a '.mid' file as `path`.
         """
-        raise NotImplementedError
+        path = Path(path)
+        path.parent.mkdir(exist_ok=True, parents=True)
+        path.write_bytes(self.generate_bytes(seed))
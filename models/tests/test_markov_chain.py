@@ -50,6 +50,27 @@ def test_multiple_tracks():
     assert len(model.data) > 1
 
 
+def test_parallel_loading_skips_corrupt_files():
+    model = MarkovChain()
+    model.train_on_files(sample_file + ['../midi/tests/test_files/test_types/test_type_1_corrupt.mid'] + all_notes,
+                         0, lambda epoch: None, workers=2)
+    serial_model = MarkovChain()
+    serial_model.train_on_files(sample_file + all_notes, 0, lambda epoch: None)
+    assert model.data == serial_model.data
+
+
+def test_training_on_store(tmpdir):
+    store_model = MarkovChain()
+    store = store_model.build_store(sample_file + all_notes, Path(tmpdir))
+    store_model.train_on_store(Path(tmpdir), 0, lambda epoch: None)
+    model = MarkovChain()
+    model.train_on_files(sample_file + all_notes, 0, lambda epoch: None)
+
+    assert len(store) == 2
+    assert store_model.data == model.data
+    assert store_model.tokens == model.tokens
+
+
 def test_model_saving_and_loading(tmpdir):
     dir = Path(tmpdir)
     dir.mkdir(exist_ok=True)
@@ -78,3 +99,27 @@ def test_loaded_model_generate(tmpdir):
     model2.load(path)
     res = model2.predict(model2.tokens_list[0], 100, False, 0)
     assert res.shape == (100, 128)
+
+
+def test_generate_bytes(tmpdir):
+    path = Path(tmpdir).joinpath('samples', 'markov_sample.mid')
+
+    model = MarkovChain()
+    model.train_on_files(all_notes, 10, lambda epoch: None)
+    data = model.generate_bytes(0)
+    model.generate(path, 0)
+
+    assert data.startswith(b'MThd')
+    assert path.read_bytes() == data
+
+
+def test_generate_stream():
+    model = MarkovChain()
+    model.train_on_files(all_notes, 10, lambda epoch: None)
+    writer = model.create_writer()
+    chunks = list(model.generate_stream(writer, 0))
+    data = writer.get_file()
+
+    assert len(chunks) > 1
+    assert data == model.generate_bytes(0)
+    assert data.endswith(b''.join(chunks))